@@ -1,4 +1,214 @@
 import mmh3
+import numpy as np
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+# default number of items hashed per call when streaming through hash_many
+BATCH_SIZE = 1 << 16
+
+# rows hashed per vectorized pass (keeps temporaries cache-resident)
+_ROW_BLOCK = 1 << 14
+
+# MurmurHash3 x64_128 constants
+_C1 = np.uint64(0x87C37B91114253D5)
+_C2 = np.uint64(0x4CF5AD432745937F)
+_F1 = np.uint64(0xFF51AFD7ED558CCD)
+_F2 = np.uint64(0xC4CEB9FE1A85EC53)
+_N1 = np.uint64(0x52DCE729)
+_N2 = np.uint64(0x38495AB5)
+_FIVE = np.uint64(5)
+_S = {r: (np.uint64(r), np.uint64(64 - r)) for r in (27, 31, 33)}
+
 
 def get_mmh3_hash(value: str, seed: int = 42) -> int:
-    return mmh3.hash64(value, signed=False, seed=seed)[0]
\ No newline at end of file
+    return mmh3.hash64(value, signed=False, seed=seed)[0]
+
+
+def hash_many(items: Any, seed: int = 42, width: Optional[int] = None) -> np.ndarray:
+    """
+    Hash many items in one call.
+
+    Parameters
+    ----------
+    items : iterable of str/bytes, or a bytes-like buffer
+        Either a collection of items (str is hashed as its UTF-8 encoding,
+        exactly like mmh3 does), or, when `width` is given, a contiguous
+        buffer holding fixed-width records of `width` bytes each.
+    seed : int, default 42
+        Seed passed to MurmurHash3.
+    width : int, optional
+        Record width in bytes when `items` is a flat buffer.
+
+    Returns
+    -------
+    np.ndarray of uint64, one hash per item, bit-identical to
+    get_mmh3_hash(item, seed) (i.e. mmh3.hash64(item, signed=False)[0]).
+
+    Raises
+    ------
+    TypeError
+        If an item is neither str nor bytes-like.
+    ValueError
+        If seed is outside [0, 2^32), like mmh3.
+    """
+    if not 0 <= seed < 1 << 32:
+        raise ValueError("seed is out of range")
+    if width is not None:
+        if width < 0:
+            raise ValueError("width must be non-negative")
+        buf = np.frombuffer(items, dtype=np.uint8)
+        if width == 0 or buf.size % width != 0:
+            raise ValueError("buffer size must be a positive multiple of width")
+        return _murmur3_h1(buf.reshape(-1, width), seed)
+
+    if not isinstance(items, list):
+        items = list(items)
+    n = len(items)
+    if n == 0:
+        return np.empty(0, dtype=np.uint64)
+
+    try:
+        joined = "".join(items)
+    except TypeError:  # not all str
+        joined = None
+    if joined is not None and joined.isascii():
+        # one UTF-8 byte per character: skip per-item encoding
+        lengths = np.fromiter(map(len, items), dtype=np.int64, count=n)
+        flat = np.frombuffer(joined.encode("ascii"), dtype=np.uint8)
+    else:
+        encoded = [_encode(z) for z in items]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=n)
+        flat = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    first = int(lengths[0])
+    if (lengths == first).all():
+        # common case (e.g. k-mers): every record has the same length
+        return _murmur3_h1(flat.reshape(n, first), seed)
+
+    # variable lengths: hash each group of equal-length records together
+    out = np.empty(n, dtype=np.uint64)
+    offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    for length in np.unique(lengths):
+        idx = np.nonzero(lengths == length)[0]
+        rows = flat[offsets[idx][:, None] + np.arange(length)]
+        out[idx] = _murmur3_h1(rows, seed)
+    return out
+
+
+def iter_hash_batches(stream: Iterable[Any], seed: int = 42,
+                      batch_size: int = BATCH_SIZE) -> Iterator[Tuple[List[Any], np.ndarray]]:
+    """Yield (items, hashes) for consecutive batches of `stream`, hashed with hash_many."""
+    it = iter(stream)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch, hash_many(batch, seed=seed)
+
+
+def bit_length_many(values: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length() for an array of uint64 values (returns int64)."""
+    x = np.asarray(values, dtype=np.uint64)
+    n = np.zeros(x.shape, dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        shifted = x >> np.uint64(s)
+        big = shifted != 0
+        x = np.where(big, shifted, x)
+        n += big * s
+    n += x != 0
+    return n
+
+
+# ---------- Internals ----------
+
+def _encode(item: Any) -> bytes:
+    if isinstance(item, str):
+        return item.encode("utf-8")
+    if isinstance(item, (bytes, bytearray, memoryview)):
+        return bytes(item)
+    raise TypeError(f"hash_many expects str or bytes-like items, not '{type(item).__name__}'")
+
+
+def _rotl(x: np.ndarray, r: int) -> np.ndarray:
+    left, right = _S[r]
+    return (x << left) | (x >> right)
+
+
+def _fmix(k: np.ndarray) -> np.ndarray:
+    s = np.uint64(33)
+    k ^= k >> s
+    k *= _F1
+    k ^= k >> s
+    k *= _F2
+    k ^= k >> s
+    return k
+
+
+def _murmur3_h1(records: np.ndarray, seed: int) -> np.ndarray:
+    """
+    Vectorized MurmurHash3 x64_128 over the rows of a (n, length) uint8 matrix.
+    Returns the first 64-bit half of each digest.
+    """
+    n = records.shape[0]
+    if n <= _ROW_BLOCK:
+        return _murmur3_h1_block(records, seed)
+    out = np.empty(n, dtype=np.uint64)
+    for start in range(0, n, _ROW_BLOCK):
+        out[start:start + _ROW_BLOCK] = _murmur3_h1_block(records[start:start + _ROW_BLOCK], seed)
+    return out
+
+
+def _murmur3_h1_block(records: np.ndarray, seed: int) -> np.ndarray:
+    n, length = records.shape
+    nblocks = length // 16
+    h1 = np.full(n, seed, dtype=np.uint64)
+    h2 = h1.copy()
+
+    if nblocks:
+        body = np.ascontiguousarray(records[:, : nblocks * 16]).view("<u8")
+        for b in range(nblocks):
+            k1 = body[:, 2 * b].astype(np.uint64)
+            k2 = body[:, 2 * b + 1].astype(np.uint64)
+
+            k1 *= _C1
+            k1 = _rotl(k1, 31)
+            k1 *= _C2
+            h1 ^= k1
+            h1 = _rotl(h1, 27)
+            h1 += h2
+            h1 = h1 * _FIVE + _N1
+
+            k2 *= _C2
+            k2 = _rotl(k2, 33)
+            k2 *= _C1
+            h2 ^= k2
+            h2 = _rotl(h2, 31)
+            h2 += h1
+            h2 = h2 * _FIVE + _N2
+
+    rem = length - nblocks * 16
+    if rem:
+        tail = np.zeros((n, 16), dtype=np.uint8)
+        tail[:, :rem] = records[:, nblocks * 16:]
+        tail = tail.view("<u8").astype(np.uint64)
+        if rem > 8:
+            k2 = tail[:, 1]
+            k2 *= _C2
+            k2 = _rotl(k2, 33)
+            k2 *= _C1
+            h2 ^= k2
+        k1 = tail[:, 0]
+        k1 *= _C1
+        k1 = _rotl(k1, 31)
+        k1 *= _C2
+        h1 ^= k1
+
+    h1 ^= np.uint64(length)
+    h2 ^= np.uint64(length)
+    h1 += h2
+    h2 += h1
+    h1 = _fmix(h1)
+    h2 = _fmix(h2)
+    h1 += h2
+    return h1
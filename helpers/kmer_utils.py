@@ -0,0 +1,394 @@
+"""
+Streaming k-mer extraction from FASTA/FASTQ files (optionally gzip-compressed).
+
+Files are read in blocks of BLOCK_SIZE bytes. Sequence data is uppercased;
+any base other than A/C/G/T breaks the sequence, and k-mers never span a
+break or a record boundary. Only the last k-1 bases of a block are carried
+over to the next one, so memory is bounded by the block size, not by the
+length of a chromosome.
+
+Canonical k-mers follow the usual convention (as in `sketch --canonical`):
+the lexicographically smaller of a k-mer and its reverse complement.
+
+For k <= 32, iter_kmer_hash_batches skips Python strings altogether: bases
+are 2-bit encoded (A=0, C=1, G=2, T=3), k-mers are packed into uint64
+values with vectorized shifts, and the 8-byte little-endian packed values
+are hashed with hash_many. These hashes differ from the hashes of k-mer
+strings, so sketches built this way should only be compared with each other.
+"""
+
+import gzip
+import os
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from hashes.hash_utils import hash_many
+
+BLOCK_SIZE = 1 << 20
+BATCH_SIZE = 1 << 16
+
+# FASTA header lines are assumed to be shorter than this when sharding a file
+_MAX_HEADER = 1 << 16
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# uppercase A/C/G/T, turn every other byte into N (whitespace is deleted separately)
+_CLEAN = bytes(
+    b if b in b"ACGT" else (b - 32 if b in b"acgt" else ord("N"))
+    for b in range(256)
+)
+_WHITESPACE = b"\r\n\t "
+
+_COMPLEMENT = str.maketrans("ACGT", "TGCA")
+
+# ASCII -> 2-bit code (only A/C/G/T occur in fragments)
+_CODE = np.zeros(256, dtype=np.uint64)
+_CODE[[ord("A"), ord("C"), ord("G"), ord("T")]] = [0, 1, 2, 3]
+_THREE = np.uint64(3)
+
+
+def open_sequence_file(path: str) -> BinaryIO:
+    """Open a sequence file for binary reading, decompressing it if it is gzip."""
+    with open(path, "rb") as fh:
+        magic = fh.read(2)
+    if magic == _GZIP_MAGIC:
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def reverse_complement(seq: str) -> str:
+    """Reverse complement of an uppercase A/C/G/T string."""
+    return seq.translate(_COMPLEMENT)[::-1]
+
+
+def is_shardable(path: str) -> bool:
+    """True if `path` is an uncompressed FASTA file, which shard_ranges can split."""
+    with open(path, "rb") as fh:
+        head = fh.read(_MAX_HEADER)
+    return not head.startswith(_GZIP_MAGIC) and head.lstrip()[:1] == b">"
+
+
+def shard_ranges(path: str, n_shards: int) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split a FASTA file into about n_shards byte ranges (start, end) of
+    similar size, each starting at the beginning of a line where possible.
+    Gzip and FASTQ files cannot be split and give the single range (0, None).
+
+    Every k-mer belongs to the range holding its last base, so sketching each
+    range with iter_fragments(path, k, start=start, end=end) and merging the
+    sketches gives the sketch of the whole file.
+    """
+    if n_shards <= 1 or not is_shardable(path):
+        return [(0, None)]
+    size = os.path.getsize(path)
+    cuts = [0]
+    with open(path, "rb") as fh:
+        for j in range(1, n_shards):
+            pos = size * j // n_shards
+            fh.seek(pos)
+            nl = fh.read(_MAX_HEADER).find(b"\n")
+            if nl >= 0:
+                pos += nl + 1
+            if cuts[-1] < pos < size:
+                cuts.append(pos)
+    cuts.append(size)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def iter_fragments(path: str, k: int, block_size: int = BLOCK_SIZE,
+                   start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the A/C/G/T runs of every record in a FASTA or FASTQ file, as
+    uppercase strings of length >= k.
+
+    A run longer than a block is yielded in pieces that overlap by k-1
+    bases, so every k-mer of the file occurs in exactly one fragment.
+
+    With a byte range [start, end) (uncompressed FASTA only, see
+    shard_ranges), only the k-mers whose last base lies in the range are
+    covered; up to k-1 preceding bases are read from before `start`.
+    """
+    if k <= 0:
+        raise ValueError("k must be positive")
+    if start or end is not None:
+        yield from _fasta_range_fragments(path, k, block_size, start, end)
+        return
+    with open_sequence_file(path) as fh:
+        first = fh.read(block_size)
+        head = first.lstrip()[:1]
+        if head == b">":
+            yield from _fasta_fragments(chain([first], _blocks(fh, block_size)), k)
+        elif head == b"@":
+            yield from _fastq_fragments(chain([first], _blocks(fh, block_size)), k)
+        elif head:
+            raise ValueError(f"{path}: not a FASTA or FASTQ file")
+
+
+def kmers_of(fragment: str, k: int, canonical: bool = True) -> List[str]:
+    """All k-mers of an A/C/G/T string, in order (canonical if requested)."""
+    n = len(fragment) - k + 1
+    if n <= 0:
+        return []
+    fw = [fragment[i:i + k] for i in range(n)]
+    if not canonical:
+        return fw
+    rc = reverse_complement(fragment)
+    L = len(fragment)
+    return list(map(min, fw, [rc[L - k - i:L - i] for i in range(n)]))
+
+
+def iter_kmer_batches(path: str, k: int, canonical: bool = True,
+                      batch_size: int = BATCH_SIZE, block_size: int = BLOCK_SIZE,
+                      start: int = 0, end: Optional[int] = None) -> Iterator[List[str]]:
+    """
+    Yield the k-mers of a FASTA/FASTQ file (or of the byte range
+    [start, end), see iter_fragments) in lists of about batch_size, ready
+    for a sampler's add_many_items.
+    """
+    batch: List[str] = []
+    for fragment in iter_fragments(path, k, block_size=block_size, start=start, end=end):
+        # cut long fragments so that a batch never holds much more than batch_size k-mers
+        step = max(batch_size, 1)
+        for offset in range(0, len(fragment) - k + 1, step):
+            batch.extend(kmers_of(fragment[offset:offset + step + k - 1], k, canonical))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def pack_kmers(fragments: List[str], k: int, canonical: bool = True) -> np.ndarray:
+    """
+    2-bit packed k-mers (k <= 32) of A/C/G/T fragments, as a uint64 array in
+    the same order as kmers_of. Packed values compare like the k-mer strings,
+    so the canonical k-mer is the minimum of the forward and reverse-complement
+    values.
+    """
+    if not (1 <= k <= 32):
+        raise ValueError("packed k-mers need 1 <= k <= 32")
+    fragments = [f for f in fragments if len(f) >= k]
+    if not fragments:
+        return np.empty(0, dtype=np.uint64)
+    codes = _CODE[np.frombuffer("".join(fragments).encode("ascii"), dtype=np.uint8)]
+    packed = _pack_windows(codes, k)
+    if canonical:
+        np.minimum(packed, _pack_windows(_THREE - codes[::-1], k)[::-1], out=packed)
+
+    # keep only the windows lying inside a single fragment
+    lengths = np.array([len(f) for f in fragments], dtype=np.int64)
+    counts = lengths - k + 1
+    starts = np.cumsum(lengths) - lengths
+    first = np.cumsum(counts) - counts
+    idx = np.arange(int(counts.sum())) + np.repeat(starts - first, counts)
+    return packed[idx]
+
+
+def iter_kmer_hash_batches(path: str, k: int, canonical: bool = True, seed: int = 42,
+                           batch_size: int = BATCH_SIZE, block_size: int = BLOCK_SIZE,
+                           start: int = 0, end: Optional[int] = None) -> Iterator[np.ndarray]:
+    """
+    Yield uint64 hashes of the packed k-mers of a FASTA/FASTQ file (k <= 32),
+    or of the byte range [start, end), in arrays of about batch_size, ready
+    for a sampler's add_hashes.
+    """
+    pending: List[str] = []
+    n = 0
+    for fragment in iter_fragments(path, k, block_size=block_size, start=start, end=end):
+        pending.append(fragment)
+        n += len(fragment) - k + 1
+        if n >= batch_size:
+            yield hash_many(pack_kmers(pending, k, canonical), seed=seed, width=8)
+            pending = []
+            n = 0
+    if pending:
+        yield hash_many(pack_kmers(pending, k, canonical), seed=seed, width=8)
+
+
+def iter_kmers(path: str, k: int, canonical: bool = True) -> Iterator[str]:
+    """Yield the k-mers of a FASTA/FASTQ file one at a time."""
+    for batch in iter_kmer_batches(path, k, canonical):
+        yield from batch
+
+
+def sketch_file(sketch, path: str, k: int, canonical: bool = True,
+                batch_size: int = BATCH_SIZE, start: int = 0, end: Optional[int] = None) -> int:
+    """
+    Add every k-mer of a FASTA/FASTQ file (or of the byte range [start, end))
+    to `sketch`; returns the number of k-mers.
+    """
+    n = 0
+    for batch in iter_kmer_batches(path, k, canonical, batch_size=batch_size,
+                                   start=start, end=end):
+        sketch.add_many_items(batch)
+        n += len(batch)
+    return n
+
+
+def sketch_file_packed(sketch, path: str, k: int, canonical: bool = True,
+                       batch_size: int = BATCH_SIZE, start: int = 0,
+                       end: Optional[int] = None) -> int:
+    """
+    Add the hashes of every packed k-mer of a FASTA/FASTQ file (k <= 32), or
+    of the byte range [start, end), to `sketch` through add_hashes; returns
+    the number of k-mers.
+    """
+    n = 0
+    for hashes in iter_kmer_hash_batches(path, k, canonical, seed=sketch.seed,
+                                         batch_size=batch_size, start=start, end=end):
+        sketch.add_hashes(hashes)
+        n += len(hashes)
+    return n
+
+
+# ---------- Internals ----------
+
+def _pack_windows(codes: np.ndarray, k: int) -> np.ndarray:
+    """
+    Pack every window of k consecutive 2-bit codes into one uint64 (first
+    base in the most significant bits). Windows of length 2^j are built by
+    doubling and combined along the binary expansion of k, so this takes
+    O(log k) vector passes instead of k.
+    """
+    result = None
+    done = 0                    # length of the windows in result
+    power = codes               # windows of length p
+    p = 1
+    while True:
+        if k & p:
+            if result is None:
+                result = power
+            else:
+                m = len(codes) - done - p + 1
+                result = (result[:m] << np.uint64(2 * p)) | power[done:done + m]
+            done += p
+        if 2 * p > k:
+            return result
+        m = len(codes) - 2 * p + 1
+        power = (power[:m] << np.uint64(2 * p)) | power[p:p + m]
+        p *= 2
+
+
+class _RunSplitter:
+    """
+    Turns the raw sequence bytes of one record, fed in pieces, into A/C/G/T
+    runs of length >= k, carrying the last k-1 bases of an open run.
+    """
+
+    def __init__(self, k: int, carry: str = "") -> None:
+        self.k = k
+        self.carry = carry
+
+    def reset(self) -> None:
+        self.carry = ""
+
+    def feed(self, data: bytes) -> List[str]:
+        seq = self.carry + data.translate(_CLEAN, _WHITESPACE).decode("ascii")
+        if not seq:
+            return []
+        runs = seq.split("N")
+        last = runs.pop()
+        out = [r for r in runs if len(r) >= self.k]
+        if len(last) >= self.k:
+            out.append(last)
+        # the last run may continue in the next piece
+        self.carry = last[-(self.k - 1):] if self.k > 1 else ""
+        return out
+
+
+def _blocks(fh: BinaryIO, block_size: int, limit: Optional[int] = None) -> Iterator[bytes]:
+    """Read `fh` in blocks, stopping after `limit` bytes if given."""
+    while limit is None or limit > 0:
+        block = fh.read(block_size if limit is None else min(block_size, limit))
+        if not block:
+            return
+        if limit is not None:
+            limit -= len(block)
+        yield block
+
+
+def _fasta_fragments(blocks: Iterable[bytes], k: int, carry: str = "",
+                     in_header: bool = False) -> Iterator[str]:
+    runs = _RunSplitter(k, carry)
+    for block in blocks:
+        pos = 0
+        n = len(block)
+        while pos < n:
+            if in_header:
+                nl = block.find(b"\n", pos)
+                if nl < 0:
+                    break
+                in_header = False
+                pos = nl + 1
+                continue
+            # in valid FASTA, '>' only occurs at the start of a header line
+            h = block.find(b">", pos)
+            end = h if h >= 0 else n
+            yield from runs.feed(block[pos:end])
+            if h < 0:
+                break
+            runs.reset()
+            in_header = True
+            pos = h + 1
+
+
+def _fasta_range_fragments(path: str, k: int, block_size: int, start: int,
+                           end: Optional[int]) -> Iterator[str]:
+    if not is_shardable(path):
+        raise ValueError(f"{path}: byte ranges need an uncompressed FASTA file")
+    with open(path, "rb") as fh:
+        carry, in_header = _range_context(fh, start, k)
+        fh.seek(start)
+        limit = None if end is None else max(end - start, 0)
+        yield from _fasta_fragments(_blocks(fh, block_size, limit), k, carry, in_header)
+
+
+def _range_context(fh: BinaryIO, start: int, k: int) -> Tuple[str, bool]:
+    """
+    State of the FASTA parser at byte `start`: the A/C/G/T bases (at most
+    k-1) immediately before it in the same record, and whether `start` lies
+    inside a header line.
+    """
+    if start == 0:
+        return "", False
+    lo = max(0, start - _MAX_HEADER - 4 * k)
+    fh.seek(lo)
+    lines = fh.read(start - lo).split(b"\n")
+    last = len(lines) - 1
+    taken: List[bytes] = []
+    n = 0
+    for j in range(last, -1, -1):
+        line = lines[j]
+        # the first piece is a full line only at the start of the file; otherwise it is
+        # the tail of a line too long to be a header
+        if (j > 0 or lo == 0) and line.startswith(b">"):
+            if j == last:
+                return "", True
+            break
+        taken.append(line)
+        n += len(line)
+        if n >= 2 * k:
+            break
+    seq = b"".join(reversed(taken)).translate(_CLEAN, _WHITESPACE).decode("ascii")
+    return (seq.split("N")[-1][-(k - 1):] if k > 1 else ""), False
+
+
+def _fastq_fragments(blocks: Iterable[bytes], k: int) -> Iterator[str]:
+    runs = _RunSplitter(k)
+    line_no = 0
+    partial = b""
+    for block in blocks:
+        lines = (partial + block).split(b"\n")
+        partial = lines.pop()
+        for line in lines:
+            if line_no % 4 == 0 and not line.strip():
+                continue  # blank line between records
+            if line_no % 4 == 1:
+                runs.reset()
+                yield from runs.feed(line)
+            line_no += 1
+    if partial.strip() and line_no % 4 == 1:
+        runs.reset()
+        yield from runs.feed(partial)
@@ -3,4 +3,5 @@ from .maxgeomsampling.MaxGeomSampling import MaxGeomSample
 from .alphamaxgeomsampling.AlphaMaxGeomSampling import AlphaMaxGeomSample
 from .minhash.MinHash import MinHashSketch
 from .affirmativesampling.AffirmativeSampling import AffirmativeSketch
-from .alphaaffirmativesampling.AlphaAffirmativeSampling import AlphaAffirmativeSketch
\ No newline at end of file
+from .alphaaffirmativesampling.AlphaAffirmativeSampling import AlphaAffirmativeSketch
+from .serialization import load_sketch, sketch_from_bytes
@@ -2,12 +2,16 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from bisect import bisect_left, insort
-from typing import Any, Iterable, List, Optional, Sequence, Set
+from typing import Any, Iterable, List, Optional, Sequence, Set, Tuple
 
-from hashes.hash_utils import get_mmh3_hash
+import numpy as np
 
+from hashes.hash_utils import get_mmh3_hash, iter_hash_batches
+from ..serialization import (SerializableSketch, SketchHeader, AFFIRMATIVE, FLAG_THRESHOLD1,
+                             FLAG_THRESHOLD2, as_u64)
 
-class AffirmativeSketch:
+
+class AffirmativeSketch(SerializableSketch):
     """
     Stores *hash values* in ascending order (smallest first), and maintains two thresholds:
 
@@ -58,8 +62,14 @@ class AffirmativeSketch:
         self.add_hash(h)
 
     def add_many_items(self, stream: Iterable[Any]) -> None:
-        for z in stream:
-            self.add_item(z)
+        """Hash `stream` in batches (see hash_many) and feed every hash to add_hash."""
+        for _, hashes in iter_hash_batches(stream, seed=self.seed):
+            self.add_hashes(hashes)
+
+    def add_hashes(self, hashes: Iterable[int]) -> None:
+        """Feed precomputed hash values (e.g. a uint64 array) to add_hash."""
+        for h in np.asarray(hashes, dtype=np.uint64).tolist():
+            self.add_hash(h)
 
     def add_hash(self, value: int) -> None:
         """Feed a precomputed hash value (int) to the affirmative sampling rule."""
@@ -173,6 +183,28 @@ class AffirmativeSketch:
 
     # ---------------- Internals ----------------
 
+    _ALGORITHM = AFFIRMATIVE
+
+    def _serial_state(self) -> Tuple[SketchHeader, List[Any]]:
+        flags = 0
+        if self.threshold1 is not None:
+            flags |= FLAG_THRESHOLD1
+        if self.threshold2 is not None:
+            flags |= FLAG_THRESHOLD2
+        thresholds = [self.threshold1 or 0, self.threshold2 or 0]
+        header = SketchHeader(algorithm=AFFIRMATIVE, flags=flags, k=self.k, seed=self.seed)
+        return header, [np.array(self._data, dtype=np.uint64), np.array(thresholds, dtype=np.uint64)]
+
+    @classmethod
+    def _from_serial(cls, header: SketchHeader, sections: List[Any]) -> AffirmativeSketch:
+        sketch = cls(k=header.k, seed=header.seed)
+        sketch._data = as_u64(sections[0]).tolist()
+        sketch._seen = set(sketch._data)
+        t1, t2 = as_u64(sections[1]).tolist()
+        sketch.threshold1 = t1 if header.flags & FLAG_THRESHOLD1 else None
+        sketch.threshold2 = t2 if header.flags & FLAG_THRESHOLD2 else None
+        return sketch
+
     def _insert(self, value: int) -> None:
         """Insert into sorted list + membership set."""
         insort(self._data, value)
@@ -209,6 +241,15 @@ class AffirmativeSketch:
         """Total number of stored unique hashes (size of sketch)."""
         return len(self._data)
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, AffirmativeSketch):
+            return False
+        return (self.k == other.k and self.seed == other.seed and self._data == other._data
+                and self.threshold1 == other.threshold1 and self.threshold2 == other.threshold2)
+
+    # compared by value and mutable, so not hashable (like MaxGeomSample)
+    __hash__ = None
+
     def __repr__(self) -> str:
         return (
             f"AffirmativeSketch(k={self.k}, size={len(self._data)}, "
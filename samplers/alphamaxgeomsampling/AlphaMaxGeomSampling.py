@@ -1,15 +1,21 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from hashes.hash_utils import get_mmh3_hash
+from hashes.hash_utils import get_mmh3_hash, iter_hash_batches
+from ..serialization import (SerializableSketch, SketchHeader, ALPHAMAXGEOM, FLAG_HASH_ONLY,
+                             pack_buckets, unpack_buckets)
+from ..similarity import (comparison_view, containment_from_stats, containment_stats, cosine_from_stats,
+                          jaccard_from_stats, merge_stats, weighted_containment_from_stats)
 import heapq
-from typing import Any, Dict, Iterable, List, Tuple
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 @dataclass
 class _Entry:
+    __slots__ = ("hprime", "freq")
     hprime: int
     freq: int
 
-class AlphaMaxGeomSample:
+class AlphaMaxGeomSample(SerializableSketch):
     """
     AlphaMaxGeomSampling(Z : hash stream; S : sample)
 
@@ -22,6 +28,14 @@ class AlphaMaxGeomSample:
         Must satisfy 1 <= w <= 64 for 64-bit hash function.
     seed : int, default 0
         Salt for the internal 64-bit hash (deterministic across runs).
+    keep_items : bool, default True
+        If False, the original items are not retained: buckets are keyed by
+        the 64-bit hash h instead of the item, and sample() reports h in
+        place of the item. Frequencies and all similarity methods work unchanged.
+
+    Samples can be written with save(path) and read back with
+    AlphaMaxGeomSample.load(path, mmap=False); see samplers.serialization.
+    The dict buckets are rebuilt from the loaded arrays.
 
     Notes
     -----
@@ -36,7 +50,7 @@ class AlphaMaxGeomSample:
       the current minimum h' in that bucket; then the smallest is evicted.
     """
 
-    def __init__(self, alpha: float, w: int = 64, seed: int = 42) -> None:
+    def __init__(self, alpha: float, w: int = 64, seed: int = 42, keep_items: bool = True) -> None:
         if not (1 <= w <= 64):
             raise ValueError("w must be in [1, 64]")
         if not (0 < alpha < 1):
@@ -45,11 +59,12 @@ class AlphaMaxGeomSample:
         self.alpha = alpha
         self.w = w
         self.seed = seed
+        self.keep_items = keep_items
 
-        # S: bucket_index -> { item -> _Entry(hprime, freq) }
+        # S: bucket_index -> { item (or h) -> _Entry(hprime, freq) }
         self._buckets: Dict[int, Dict[Any, _Entry]] = {}
         
-        # Min-heaps per bucket for quick eviction: bucket_index -> [(hprime, item), ...]
+        # Min-heaps per bucket for quick eviction: bucket_index -> [(hprime, item or h), ...]
         self._heaps: Dict[int, List[Tuple[int, Any]]] = {}
         
         # k sizes per bucket
@@ -63,13 +78,36 @@ class AlphaMaxGeomSample:
             else:
                 self._k_sizes[i] = int(ksize_here) + 1
 
+        # Cached comparison view (see samplers.similarity); reset on every update
+        self._view: Optional[Dict[int, Any]] = None
+
     # ---------- Public API ----------
 
     def add_item(self, z: Any) -> None:
         """Process a single element."""
-        h = get_mmh3_hash(z, seed=self.seed)
+        self._add_hash(z, get_mmh3_hash(z, seed=self.seed))
+
+    def add_many_items(self, stream: Iterable[Any]) -> None:
+        """Process an iterable of elements (hashed in batches, see hash_many)."""
+        for items, hashes in iter_hash_batches(stream, seed=self.seed):
+            for z, h in zip(items, hashes.tolist()):
+                self._add_hash(z, h)
+
+    def add_hashes(self, hashes: Iterable[int]) -> None:
+        """
+        Process precomputed 64-bit hashes without hashing items. The hash
+        stands in for the item, so sample() reports it in the item slot.
+        """
+        for h in np.asarray(hashes, dtype=np.uint64).tolist():
+            self._add_hash(h, h)
+
+    def _add_hash(self, z: Any, h: int) -> None:
+        """Update the sample with element z whose 64-bit hash is h."""
+        self._view = None
         i = self._zpl_plus_one(h)           # 1..w
         hprime = self._tail_after_leftmost_one(h, i)
+        if not self.keep_items:
+            z = h
 
         if i not in self._buckets:
             self._buckets[i] = {}
@@ -98,11 +136,6 @@ class AlphaMaxGeomSample:
             # else: drop z (not among k largest)
         # done
 
-    def add_many_items(self, stream: Iterable[Any]) -> None:
-        """Process an iterable of elements."""
-        for z in stream:
-            self.add_item(z)
-
 
     def update(self, stream: Iterable[Any]) -> None:
         """Alias for add_many_items."""
@@ -117,12 +150,7 @@ class AlphaMaxGeomSample:
         -------
         dict: i -> list of (item, hprime, freq), sorted by h' descending.
         """
-        out: Dict[int, List[Tuple[Any, int, int]]] = {}
-        for i, bucket in self._buckets.items():
-            rows = [(z, ent.hprime, ent.freq) for z, ent in bucket.items()]
-            rows.sort(key=lambda r: r[1], reverse=True)
-            out[i] = rows
-        return out
+        return {i: self._bucket_rows(i) for i in self._buckets}
 
     def bucket(self, i: int) -> List[Tuple[Any, int, int]]:
         """Return the contents of bucket i as (item, hprime, freq), sorted by h' descending."""
@@ -132,8 +160,82 @@ class AlphaMaxGeomSample:
         """Return the total number of unique items in the sample across all buckets."""
         return sum(len(bucket) for bucket in self._buckets.values())
 
+    def union(self, other: AlphaMaxGeomSample) -> AlphaMaxGeomSample:
+        """Merge another AlphaMaxGeomSample into this one and return a new AlphaMaxGeomSample."""
+        self._check_mergeable(other)
+        merged = AlphaMaxGeomSample(alpha=self.alpha, w=self.w, seed=self.seed,
+                                    keep_items=self.keep_items)
+        merged.merge_from(self)
+        merged.merge_from(other)
+        return merged
+
+    def merge_from(self, other: AlphaMaxGeomSample) -> None:
+        """
+        Merge another AlphaMaxGeomSample into this one, in place.
+
+        Per bucket i, the _k_sizes[i] largest h' of both samples are kept and
+        frequencies of entries present in both (same h', as in
+        MaxGeomSample.merge_from) are summed. The result equals
+        the sample of the concatenated streams, so merging is associative and
+        commutative and partial sketches of shards can be tree-reduced.
+        """
+        self._check_mergeable(other)
+        self._view = None
+        for i in other._buckets:
+            combined: Dict[int, List[Any]] = {}
+            rows = other._bucket_rows(i)
+            if i in self._buckets:
+                rows += self._bucket_rows(i)
+            for z, hprime, freq in rows:
+                ent = combined.get(hprime)
+                if ent is None:
+                    combined[hprime] = [z, freq]
+                else:
+                    ent[1] += freq
+            top = heapq.nlargest(self._k_sizes[i], combined.items(), key=lambda kv: kv[0])
+            self._buckets[i] = {z: _Entry(hprime=hprime, freq=freq) for hprime, (z, freq) in top}
+            heap = [(hprime, z) for hprime, (z, _) in top]
+            heapq.heapify(heap)
+            self._heaps[i] = heap
+
     # ---------- Internals ----------
 
+    _ALGORITHM = ALPHAMAXGEOM
+
+    def _serial_state(self) -> Tuple[SketchHeader, List[Any]]:
+        rows = {i: self._bucket_rows(i)[::-1] for i in self._buckets}
+        flags, sections = pack_buckets(rows, self.keep_items)
+        header = SketchHeader(algorithm=ALPHAMAXGEOM, flags=flags, alpha=self.alpha, w=self.w,
+                              seed=self.seed)
+        return header, sections
+
+    @classmethod
+    def _from_serial(cls, header: SketchHeader, sections: List[Any]) -> AlphaMaxGeomSample:
+        sample = cls(alpha=header.alpha, w=header.w, seed=header.seed,
+                     keep_items=not header.flags & FLAG_HASH_ONLY)
+        for i, hprimes, freqs, items in unpack_buckets(header.flags, sections):
+            hprimes = hprimes.tolist()
+            sample._buckets[i] = {z: _Entry(hprime=hp, freq=f)
+                                  for z, hp, f in zip(items, hprimes, freqs.tolist())}
+            heap = list(zip(hprimes, items))
+            heapq.heapify(heap)
+            sample._heaps[i] = heap
+        return sample
+
+    def _check_mergeable(self, other: AlphaMaxGeomSample) -> None:
+        if not isinstance(other, AlphaMaxGeomSample):
+            raise ValueError("Can only merge with another AlphaMaxGeomSample")
+        if self.alpha != other.alpha or self.w != other.w or self.seed != other.seed:
+            raise ValueError("Can only merge samples with the same alpha, w and seed")
+        if self.keep_items != other.keep_items:
+            raise ValueError("Cannot merge a hash-only sample with one that keeps items")
+
+    def _bucket_rows(self, i: int) -> List[Tuple[Any, int, int]]:
+        """Bucket i as (item, hprime, freq), sorted by h' descending."""
+        rows = [(z, ent.hprime, ent.freq) for z, ent in self._buckets[i].items()]
+        rows.sort(key=lambda r: r[1], reverse=True)
+        return rows
+
     def _evict_smallest(self, i: int) -> None:
         """Evict elements with smallest h' until bucket size is k."""
         bucket = self._buckets[i]
@@ -184,7 +286,7 @@ class AlphaMaxGeomSample:
         return sum(len(bucket) for bucket in self._buckets.values())
 
     def __repr__(self) -> str:
-        repr_str = f"MaxGeomSample(alpha={self.alpha}, w={self.w}, buckets={len(self._buckets)})"
+        repr_str = f"AlphaMaxGeomSample(alpha={self.alpha}, w={self.w}, buckets={len(self._buckets)})"
         return repr_str
     
     # check if empty
@@ -212,35 +314,39 @@ class AlphaMaxGeomSample:
         if self.alpha != other.alpha or self.w != other.w:
             raise ValueError("Cannot compute Jaccard index between samples with different alpha or w")
         
-        union_size = 0
-        intersection_size = 0
-
-        # get all i values that are in both buckets
-        self_valid_i = set(self._buckets.keys())
-        other_valid_i = set(other._buckets.keys())
-        common_i = self_valid_i.intersection(other_valid_i)
-
-        # go over all buckets
-        for i in common_i:
-            # compute union and intersection of h' values in bucket i
-            self_hprimes = set(ent.hprime for ent in self._buckets[i].values())
-            other_hprimes = set(ent.hprime for ent in other._buckets[i].values())
-            union_hprimes = self_hprimes.union(other_hprimes)
-            k_for_this_bucket = self._k_sizes[i]
-            union_hprimes = heapq.nlargest(k_for_this_bucket, union_hprimes)
-            intersection_hprimes = self_hprimes.intersection(other_hprimes)
-            intersection_hprimes = intersection_hprimes.intersection(set(union_hprimes))
-
-            # update union and intersection sizes
-            union_size += len(union_hprimes)
-            intersection_size += len(intersection_hprimes)
-
-        if union_size == 0:
-            return 1.0  # both are empty
-
-        return intersection_size / union_size
+        intersection_size, union_size, _, _, _ = merge_stats(
+            comparison_view(self), comparison_view(other), self._k_sizes.__getitem__)
+        return jaccard_from_stats(intersection_size, union_size)
 
     
+    def containment_index(self, other: AlphaMaxGeomSample) -> float:
+        """
+        Estimate |A ∩ B| / |A|, the fraction of this sample's set contained in
+        other's. In every bucket of this sample, the largest h' of the union
+        of both buckets are kept as in jaccard_index(); the estimate is the
+        fraction of this sample's kept elements that other also holds.
+        """
+        if not isinstance(other, AlphaMaxGeomSample):
+            raise ValueError("Can only compute containment index with another AlphaMaxGeomSample")
+        if self.alpha != other.alpha or self.w != other.w:
+            raise ValueError("Cannot compute containment index between samples with different alpha or w")
+        intersection_size, self_size, _, _ = containment_stats(
+            comparison_view(self), comparison_view(other), self._k_sizes.__getitem__)
+        return containment_from_stats(intersection_size, self_size)
+
+    def weighted_containment(self, other: AlphaMaxGeomSample) -> float:
+        """
+        Frequency-weighted containment index: over the same elements as
+        containment_index(), sum(min(freq_self, freq_other)) / sum(freq_self).
+        """
+        if not isinstance(other, AlphaMaxGeomSample):
+            raise ValueError("Can only compute weighted containment with another AlphaMaxGeomSample")
+        if self.alpha != other.alpha or self.w != other.w:
+            raise ValueError("Cannot compute weighted containment between samples with different alpha or w")
+        _, _, min_sum, self_weight = containment_stats(
+            comparison_view(self), comparison_view(other), self._k_sizes.__getitem__)
+        return weighted_containment_from_stats(min_sum, self_weight)
+
     def cosine_similarity(self, other: AlphaMaxGeomSample) -> float:
         """Compute Cosine similarity between two samples."""
         if not isinstance(other, AlphaMaxGeomSample):
@@ -250,37 +356,9 @@ class AlphaMaxGeomSample:
         if self.alpha != other.alpha or self.w != other.w:
             raise ValueError("Cannot compute Cosine similarity between samples with different alpha or w")
         
-        dot_product = 0
-        self_norm_sq = 0
-        other_norm_sq = 0
-
-        # get all i values that are in both buckets
-        self_valid_i = set(self._buckets.keys())
-        other_valid_i = set(other._buckets.keys())
-        common_i = self_valid_i.intersection(other_valid_i)
-
-        # go over all buckets
-        for i in common_i:
-            self_hprime_freq = {ent.hprime: ent.freq for ent in self._buckets[i].values()}
-            other_hprime_freq = {ent.hprime: ent.freq for ent in other._buckets[i].values()}
-            union_hprimes = set(self_hprime_freq.keys()).union(set(other_hprime_freq.keys()))
-            k_for_this_bucket = self._k_sizes[i]
-            union_hprimes = heapq.nlargest(k_for_this_bucket, union_hprimes)
-            intersection_hprimes = set(self_hprime_freq.keys()).intersection(set(other_hprime_freq.keys()))
-            intersection_hprimes = intersection_hprimes.intersection(set(union_hprimes))
-
-            # compute dot product and norms
-            for hprime in union_hprimes:
-                f1 = self_hprime_freq.get(hprime, 0)
-                f2 = other_hprime_freq.get(hprime, 0)
-                self_norm_sq += f1 * f1
-                other_norm_sq += f2 * f2
-                if hprime in intersection_hprimes:
-                    dot_product += f1 * f2
-        if self_norm_sq == 0 or other_norm_sq == 0:
-            return 0.0  # one is empty
-
-        return dot_product / ((self_norm_sq ** 0.5) * (other_norm_sq ** 0.5))
+        _, _, dot_product, self_norm_sq, other_norm_sq = merge_stats(
+            comparison_view(self), comparison_view(other), self._k_sizes.__getitem__)
+        return cosine_from_stats(dot_product, self_norm_sq, other_norm_sq)
     
 
     def sample_size(self) -> int:
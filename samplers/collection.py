@@ -0,0 +1,265 @@
+"""
+A directory holding many named sketches:
+
+    <dir>/sketches.bin    serialized sketches (see samplers.serialization), back to back,
+                          each starting at a multiple of 8 bytes
+    <dir>/manifest.tsv    one row per sketch: name, algorithm, k, alpha, scale, w, seed,
+                          mode, storage, size, offset, length
+
+mode is "one_permutation" or "k_permutation" for MinHash sketches and "-"
+otherwise; storage is "array", "dict" (MaxGeomSample) or "set"
+(FracMinHashSketch), and "-" for samplers with a single storage.
+
+Opening a collection only reads the manifest (its rows are parsed on first
+use); sketch bodies are read on access from a memory map of sketches.bin,
+so loading does not copy them.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .serialization import (ALGORITHM_NAMES, FLAG_ARRAY_STORAGE, FLAG_ONE_PERMUTATION, FRACMINHASH,
+                            MAXGEOM, MINHASH, SketchHeader, loads, sketch_from_bytes)
+
+MANIFEST = "manifest.tsv"
+DATA = "sketches.bin"
+
+_COLUMNS = ("name", "algorithm", "k", "alpha", "scale", "w", "seed", "mode", "storage",
+            "size", "offset", "length")
+
+
+class SketchRecord(NamedTuple):
+    """Manifest row of one sketch."""
+    name: str
+    algorithm: str
+    k: int
+    alpha: float
+    scale: float
+    w: int
+    seed: int
+    mode: str
+    storage: str
+    size: int
+    offset: int
+    length: int
+
+    def params(self) -> Tuple[str, int, float, float, int, int, str]:
+        """
+        Parameters that must agree for two sketches to be compared. The
+        storage is not one of them: sketches of either storage compare and
+        merge with each other.
+        """
+        return (self.algorithm, self.k, self.alpha, self.scale, self.w, self.seed, self.mode)
+
+
+class SketchCollection:
+    """
+    Named sketches stored in one directory.
+
+    Parameters
+    ----------
+    path : str
+        Collection directory.
+    mode : {"r", "a", "w"}, default "r"
+        "r" opens an existing collection read-only, "a" opens (or creates) it
+        for appending, "w" creates it, discarding any previous contents.
+
+    Examples
+    --------
+    >>> with SketchCollection("db", mode="w") as db:
+    ...     db.add("genome1", sketch1)
+    >>> db = SketchCollection("db")
+    >>> db["genome1"].jaccard(db["genome2"])
+    """
+
+    def __init__(self, path: str, mode: str = "r") -> None:
+        if mode not in ("r", "a", "w"):
+            raise ValueError("mode must be 'r', 'a' or 'w'")
+        self.path = path
+        self.mode = mode
+        # manifest rows; raw lines are parsed into SketchRecords on first access
+        self._records: List[Union[str, SketchRecord]] = []
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._data: Optional[np.ndarray] = None
+        self._end = 0
+
+        manifest = os.path.join(path, MANIFEST)
+        if mode == "w" or (mode == "a" and not os.path.exists(manifest)):
+            os.makedirs(path, exist_ok=True)
+            with open(manifest, "w") as fh:
+                fh.write("\t".join(_COLUMNS) + "\n")
+            open(os.path.join(path, DATA), "wb").close()
+        else:
+            self._read_manifest(manifest)
+            self._end = os.path.getsize(os.path.join(path, DATA))
+
+    # ---------- Reading ----------
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __getitem__(self, key: Union[str, int]) -> Any:
+        return self.get(key)
+
+    def names(self) -> List[str]:
+        """Sketch names in insertion order."""
+        return list(self._names)
+
+    def records(self) -> List[SketchRecord]:
+        """All manifest rows in insertion order."""
+        return [self.info(j) for j in range(len(self))]
+
+    def info(self, key: Union[str, int]) -> SketchRecord:
+        """Manifest row of a sketch, by name or position."""
+        if isinstance(key, str):
+            if key not in self._index:
+                raise KeyError(key)
+            key = self._index[key]
+        rec = self._records[key]
+        if isinstance(rec, str):
+            rec = self._records[key] = _parse_row(rec)
+        return rec
+
+    def get(self, key: Union[str, int]) -> Any:
+        """
+        Load one sketch, by name or position. Its arrays are views of the
+        memory-mapped data file where the sampler supports it.
+        """
+        return sketch_from_bytes(self.raw(key))
+
+    def raw(self, key: Union[str, int]) -> np.ndarray:
+        """Serialized bytes of one sketch, as a uint8 view of the data file."""
+        rec = self.info(key)
+        return self._mapped()[rec.offset:rec.offset + rec.length]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Yield (name, sketch) for every sketch, loading them one at a time."""
+        for name in self._names:
+            yield name, self.get(name)
+
+    def compatible(self, a: Union[str, int], b: Union[str, int]) -> bool:
+        """True if the two sketches can be compared (same algorithm and parameters)."""
+        return self.info(a).params() == self.info(b).params()
+
+    def check_compatible(self, keys: Optional[Iterable[Union[str, int]]] = None) -> None:
+        """Raise ValueError unless all the given sketches (default: all) share their parameters."""
+        records = self.records() if keys is None else [self.info(key) for key in keys]
+        params = {r.params() for r in records}
+        if len(params) > 1:
+            raise ValueError(f"sketches have different parameters: {sorted(params)}")
+
+    # ---------- Writing ----------
+
+    def add(self, name: str, sketch: Any) -> SketchRecord:
+        """Append a sketch under `name`."""
+        return self.add_bytes(name, sketch.to_bytes(), size=sketch.sample_size())
+
+    def add_bytes(self, name: str, blob: bytes, size: Optional[int] = None) -> SketchRecord:
+        """
+        Append an already serialized sketch (e.g. to_bytes() output) under
+        `name`. `size` (its sample_size()) is computed from the blob if omitted.
+        """
+        if self.mode == "r":
+            raise ValueError("collection is opened read-only")
+        if "\t" in name or "\n" in name:
+            raise ValueError("sketch names cannot contain tabs or newlines")
+        if name in self._index:
+            raise ValueError(f"duplicate sketch name: {name}")
+
+        header, _ = loads(blob)
+        if size is None:
+            size = sketch_from_bytes(blob).sample_size()
+        rec = SketchRecord(name=name, algorithm=ALGORITHM_NAMES[header.algorithm], k=header.k,
+                           alpha=header.alpha, scale=header.scale, w=header.w, seed=header.seed,
+                           mode=_mode(header), storage=_storage(header), size=size, offset=self._end, length=len(blob))
+        with open(os.path.join(self.path, DATA), "ab") as fh:
+            fh.write(blob)
+            fh.write(b"\0" * (-len(blob) % 8))
+        with open(os.path.join(self.path, MANIFEST), "a") as fh:
+            fh.write("\t".join(_format(v) for v in rec) + "\n")
+
+        self._end += len(blob) + (-len(blob) % 8)
+        self._index[name] = len(self._records)
+        self._records.append(rec)
+        self._names.append(name)
+        self._data = None  # remap on next read
+        return rec
+
+    def add_file(self, path: str, name: Optional[str] = None) -> SketchRecord:
+        """
+        Append a sketch file written by save(). The name defaults to the file
+        name up to its first '.', e.g. "GCF_000005845.maxgeom.sketch" -> "GCF_000005845".
+        """
+        if name is None:
+            name = os.path.basename(path).split(".")[0]
+        with open(path, "rb") as fh:
+            return self.add_bytes(name, fh.read())
+
+    def close(self) -> None:
+        self._data = None
+
+    def __enter__(self) -> SketchCollection:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"SketchCollection(path={self.path!r}, sketches={len(self)})"
+
+    # ---------- Internals ----------
+
+    def _read_manifest(self, manifest: str) -> None:
+        with open(manifest) as fh:
+            lines = fh.read().splitlines()
+        if not lines or tuple(lines[0].split("\t")) != _COLUMNS:
+            raise ValueError(f"{manifest} is not a sketch collection manifest")
+        self._records = lines[1:]
+        self._names = [line[:line.find("\t")] for line in self._records]
+        self._index = dict(zip(self._names, range(len(self._names))))
+        if len(self._index) != len(self._names):
+            raise ValueError(f"{manifest} has duplicate sketch names")
+
+    def _mapped(self) -> np.ndarray:
+        if self._data is None:
+            data_path = os.path.join(self.path, DATA)
+            if os.path.getsize(data_path) == 0:
+                self._data = np.empty(0, dtype=np.uint8)
+            else:
+                self._data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        return self._data
+
+
+def _parse_row(line: str) -> SketchRecord:
+    name, algorithm, k, alpha, scale, w, seed, mode, storage, size, offset, length = line.split("\t")
+    return SketchRecord(name, algorithm, int(k), float(alpha), float(scale), int(w), int(seed),
+                        mode, storage, int(size), int(offset), int(length))
+
+
+def _mode(header: SketchHeader) -> str:
+    if header.algorithm == MINHASH:
+        return "one_permutation" if header.flags & FLAG_ONE_PERMUTATION else "k_permutation"
+    return "-"
+
+
+def _storage(header: SketchHeader) -> str:
+    if header.algorithm not in (MAXGEOM, FRACMINHASH):
+        return "-"
+    if header.flags & FLAG_ARRAY_STORAGE:
+        return "array"
+    return "dict" if header.algorithm == MAXGEOM else "set"
+
+
+def _format(value: Any) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
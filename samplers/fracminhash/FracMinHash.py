@@ -1,26 +1,96 @@
-from hashes.hash_utils import get_mmh3_hash
+from hashes.hash_utils import get_mmh3_hash, iter_hash_batches
+from ..serialization import SerializableSketch, SketchHeader, FRACMINHASH, FLAG_ARRAY_STORAGE, as_u64
 from typing import Iterable
+import numpy as np
 
-class FracMinHashSketch:
-    
-    def __init__(self, scale: float, seed: int = 42):
+class FracMinHashSketch(SerializableSketch):
+    """
+    FracMinHash: keeps every 64-bit hash h <= scale * (2^64 - 1).
+
+    Parameters
+    ----------
+    scale : float
+        Fraction of the hash space that is kept.
+    seed : int, default 42
+        Seed of the mmh3 hash.
+    storage : {"set", "array"}, default "set"
+        "set" keeps the hashes in the Python set `hashes` (~70+ bytes per
+        hash). "array" appends them to a growable uint64 buffer (8 bytes
+        per hash) that is deduplicated and sorted lazily, on the first
+        query after an update; `hashes` is then None and get_hashes()
+        builds a set on demand.
+
+    hash_array() gives the kept hashes as a sorted uint64 array for either
+    storage. Similarities only count the intersection (a sorted merge when
+    either sketch uses the array storage) and derive the union size from
+    it, so no union set is built.
+
+    With storage="array", load(path, mmap=True) keeps the hashes as a view
+    of the file until the sketch is updated.
+    """
+
+    def __init__(self, scale: float, seed: int = 42, storage: str = "set"):
+        if storage not in ("set", "array"):
+            raise ValueError("storage must be 'set' or 'array'")
         self.scale = scale
         self.max_hash_value = 2**64 - 1
         self.threshold = int(scale * self.max_hash_value)
-        self.hashes = set()
         self.seed = seed
+        self.storage = storage
+        self.hashes = set() if storage == "set" else None
+        # storage="array": hashes are _buf[:_n]; sorted and unique when _sorted
+        self._buf = np.empty(0, dtype=np.uint64)
+        self._n = 0
+        self._sorted = True
         
     def add_item(self, item: str):
         hash_value = get_mmh3_hash(item, seed=self.seed)
         if hash_value <= self.threshold:
-            self.hashes.add(hash_value)
+            if self.hashes is not None:
+                self.hashes.add(hash_value)
+            else:
+                self._append(np.array([hash_value], dtype=np.uint64))
             
     def add_many_items(self, items: Iterable[str]):
-        for item in items:
-            self.add_item(item)
+        """
+        Add many items: str or bytes items are hashed in batches (hash_many)
+        and only the hashes below the threshold are kept, the same result as
+        add_item on every item. An integer NumPy array is taken as
+        precomputed 64-bit hashes, as in add_hashes.
+        """
+        if isinstance(items, np.ndarray) and items.dtype.kind in "ui":
+            self.add_hashes(items)
+            return
+        for _, hashes in iter_hash_batches(items, seed=self.seed):
+            self.add_hashes(hashes)
+
+    def add_hashes(self, hashes):
+        """Add precomputed 64-bit hashes (e.g. packed k-mer hashes), keeping those below the threshold."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        threshold = np.uint64(min(self.threshold, self.max_hash_value))
+        kept = hashes[hashes <= threshold]
+        if self.hashes is not None:
+            self.hashes.update(kept.tolist())
+        else:
+            self._append(kept)
             
     def get_hashes(self):
-        return self.hashes
+        if self.hashes is not None:
+            return self.hashes
+        return set(self.hash_array().tolist())
+
+    def hash_array(self) -> np.ndarray:
+        """The kept hashes as a sorted uint64 array (a read-only view with storage="array")."""
+        if self.hashes is not None:
+            return np.array(sorted(self.hashes), dtype=np.uint64)
+        if not self._sorted:
+            unique = np.unique(self._buf[:self._n])
+            self._n = len(unique)
+            self._buf[:self._n] = unique
+            self._sorted = True
+        view = self._buf[:self._n]
+        view.flags.writeable = False
+        return view
     
     def get_scale(self):
         return self.scale
@@ -32,13 +102,45 @@ class FracMinHashSketch:
         return self.threshold
     
     def __len__(self):
-        return len(self.hashes)
+        return self.sample_size()
+
+    def merge_from(self, other: 'FracMinHashSketch'):
+        """Add the hashes of another sketch with the same scale and seed, in place."""
+        if not isinstance(other, FracMinHashSketch):
+            raise ValueError("Can only merge with another FracMinHashSketch")
+        if self.scale != other.scale or self.seed != other.seed:
+            raise ValueError("Can only merge sketches with the same scale and seed")
+        if self.hashes is None:
+            self._append(other.hash_array())
+        elif other.hashes is None:
+            self.hashes.update(other.hash_array().tolist())
+        else:
+            self.hashes |= other.hashes
+
+    def union(self, other: 'FracMinHashSketch') -> 'FracMinHashSketch':
+        """Return a new sketch holding the hashes of both sketches."""
+        merged = FracMinHashSketch(scale=self.scale, seed=self.seed, storage=self.storage)
+        merged.merge_from(self)
+        merged.merge_from(other)
+        return merged
+
+    def __eq__(self, other):
+        if not isinstance(other, FracMinHashSketch):
+            return False
+        if self.scale != other.scale or self.seed != other.seed:
+            return False
+        if self.hashes is not None and other.hashes is not None:
+            return self.hashes == other.hashes
+        return np.array_equal(self.hash_array(), other.hash_array())
+
+    # compared by value and mutable, so not hashable (like MaxGeomSample)
+    __hash__ = None
     
     def jaccard_index(self, other: 'FracMinHashSketch') -> float:
         if not isinstance(other, FracMinHashSketch):
             raise ValueError("Can only compute Jaccard index with another FracMinHashSketch")
-        intersection = len(self.hashes.intersection(other.hashes))
-        union = len(self.hashes.union(other.hashes))
+        intersection = self._intersection_size(other)
+        union = len(self) + len(other) - intersection
         if union == 0:
             return 1.0  # Both are empty
         return intersection / union
@@ -46,21 +148,67 @@ class FracMinHashSketch:
     def containment_index(self, other: 'FracMinHashSketch') -> float:
         if not isinstance(other, FracMinHashSketch):
             raise ValueError("Can only compute containment index with another FracMinHashSketch")
-        intersection = len(self.hashes.intersection(other.hashes))
-        if len(self.hashes) == 0:
+        intersection = self._intersection_size(other)
+        size = len(self)
+        if size == 0:
             return 1.0  # self is empty
-        return intersection / len(self.hashes)
+        return intersection / size
 
 
     def cosine_similarity(self, other: 'FracMinHashSketch') -> float:
         if not isinstance(other, FracMinHashSketch):
             raise ValueError("Can only compute Cosine similarity with another FracMinHashSketch")
-        intersection = len(self.hashes.intersection(other.hashes))
-        norm_self = len(self.hashes)
-        norm_other = len(other.hashes)
+        intersection = self._intersection_size(other)
+        norm_self = len(self)
+        norm_other = len(other)
         if norm_self == 0 or norm_other == 0:
             return 1.0  # One or both are empty
         return intersection / ((norm_self * norm_other) ** 0.5)
 
     def sample_size(self) -> int:
-        return len(self.hashes)
\ No newline at end of file
+        if self.hashes is not None:
+            return len(self.hashes)
+        return len(self.hash_array())
+
+    def _intersection_size(self, other: 'FracMinHashSketch') -> int:
+        if self.hashes is not None and other.hashes is not None:
+            return len(self.hashes.intersection(other.hashes))
+        small, large = sorted((self.hash_array(), other.hash_array()), key=len)
+        if not len(small):
+            return 0
+        # both sorted and unique: look up every hash of the smaller array in the larger one
+        pos = np.searchsorted(large, small)
+        pos[pos == len(large)] = 0
+        return int(np.count_nonzero(large[pos] == small))
+
+    def _append(self, hashes: np.ndarray) -> None:
+        """Append hashes to the array buffer, doubling it (or copying a loaded view) when needed."""
+        if not len(hashes):
+            return
+        need = self._n + len(hashes)
+        if need > len(self._buf) or not self._buf.flags.writeable:
+            buf = np.empty(max(need, 2 * len(self._buf), 16), dtype=np.uint64)
+            buf[:self._n] = self._buf[:self._n]
+            self._buf = buf
+        self._buf[self._n:need] = hashes
+        self._n = need
+        self._sorted = False
+
+    # serialization: the kept hashes as one sorted uint64 section
+    _ALGORITHM = FRACMINHASH
+
+    def _serial_state(self):
+        flags = FLAG_ARRAY_STORAGE if self.hashes is None else 0
+        header = SketchHeader(algorithm=FRACMINHASH, flags=flags, scale=self.scale, seed=self.seed)
+        return header, [self.hash_array()]
+
+    @classmethod
+    def _from_serial(cls, header, sections):
+        if header.flags & FLAG_ARRAY_STORAGE:
+            sketch = cls(scale=header.scale, seed=header.seed, storage="array")
+            sketch._buf = as_u64(sections[0])
+            sketch._n = len(sketch._buf)
+            return sketch
+        sketch = cls(scale=header.scale, seed=header.seed)
+        sketch.hashes = set(as_u64(sections[0]).tolist())
+        return sketch
@@ -0,0 +1,267 @@
+"""
+Inverted index over the (bucket, h') entries of MaxGeomSample / AlphaMaxGeomSample sketches.
+
+Every entry is stored as its packed key (1 << (64 - i)) | h' (see
+samplers.similarity). The index holds
+
+    keys, offsets   the keys of all sketches back to back; sketch j is
+                    keys[offsets[j]:offsets[j+1]]
+    postings        every (key, sketch id) pair, sorted by key then id
+
+Sketches added since the last query wait in a pending list and are merged
+into the postings by the next query. A query counts, for every indexed
+sketch, the entries it shares with the query sketch (S). Its Jaccard index
+is at most S / (sum of the query's bucket sizes over the buckets both
+sketches use), since every bucket of the union holds at least the query's
+elements; only sketches whose bound can still pass are re-scored exactly.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from hashes.hash_utils import bit_length_many
+from .alphamaxgeomsampling.AlphaMaxGeomSampling import AlphaMaxGeomSample
+from .maxgeomsampling.MaxGeomSampling import MaxGeomSample
+from .serialization import ALPHAMAXGEOM, MAXGEOM
+from .similarity import PackedSketch, bucket_capacities, check_compatible, pack_sketch, packed_scores
+
+# candidates re-scored together by top()
+_RESCORE_BLOCK = 256
+
+
+class SketchIndex:
+    """
+    Searchable set of named MaxGeomSample or AlphaMaxGeomSample sketches
+    (all with the same parameters).
+
+    Only the sample entries are indexed, so results are Jaccard indices as
+    computed by jaccard_index() of the query; sketches that share no entry
+    with the query are never returned.
+
+    Examples
+    --------
+    >>> index = SketchIndex()
+    >>> for name, sketch in SketchCollection("db").items():
+    ...     index.add(name, sketch)
+    >>> index.query(q, threshold=0.1)      # [(name, jaccard), ...], best first
+    >>> index.top(q, 10)
+    >>> index.save("db.index.npz")
+    """
+
+    def __init__(self) -> None:
+        self._template: Optional[Any] = None   # empty sketch with the indexed parameters
+        self._caps: Optional[np.ndarray] = None
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._masks = np.empty(0, dtype=np.uint64)
+        self._post_keys = np.empty(0, dtype=np.uint64)
+        self._post_ids = np.empty(0, dtype=np.int32)
+
+        # sketches added since the last consolidation: (keys, bucket mask)
+        self._pending: List[Tuple[np.ndarray, int]] = []
+
+    # ---------- Building ----------
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def names(self) -> List[str]:
+        """Indexed sketch names, by id."""
+        return list(self._names)
+
+    def add(self, name: str, sketch: Any) -> int:
+        """Index a sketch under `name` and return its id."""
+        if name in self._ids:
+            raise ValueError(f"duplicate sketch name: {name}")
+        if self._template is None:
+            self._set_template(_empty_like(sketch))
+        check_compatible([self._template, sketch])
+        packed = pack_sketch(sketch)
+        self._pending.append((packed.keys, packed.mask))
+        self._ids[name] = len(self._names)
+        self._names.append(name)
+        return self._ids[name]
+
+    def add_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        """Index every (name, sketch) pair, e.g. SketchCollection.items()."""
+        for name, sketch in items:
+            self.add(name, sketch)
+
+    @classmethod
+    def from_collection(cls, path: str) -> SketchIndex:
+        """Index every sketch of a SketchCollection directory."""
+        from .collection import SketchCollection
+
+        db = SketchCollection(path)
+        db.check_compatible()
+        index = cls()
+        index.add_many(db.items())
+        return index
+
+    # ---------- Queries ----------
+
+    def shared_counts(self, query: Any) -> np.ndarray:
+        """Number of entries every indexed sketch shares with `query` (int64 array by id)."""
+        return self._probe(self._pack_query(query))
+
+    def query(self, query: Any, threshold: float) -> List[Tuple[str, float]]:
+        """All sketches with jaccard_index >= threshold, as (name, score), best first."""
+        qp = self._pack_query(query)
+        cand, bound = self._candidates(qp)
+        cand = cand[bound >= threshold]
+        scores = self._rescore(qp, cand)
+        keep = scores >= threshold
+        return self._ranked(cand[keep], scores[keep])
+
+    def top(self, query: Any, n: int) -> List[Tuple[str, float]]:
+        """The n sketches with the largest jaccard_index, as (name, score), best first."""
+        if n <= 0:
+            return []
+        qp = self._pack_query(query)
+        cand, bound = self._candidates(qp)
+        order = np.argsort(-bound, kind="stable")
+        cand, bound = cand[order], bound[order]
+
+        ids: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        kth = -1.0
+        for start in range(0, len(cand), max(n, _RESCORE_BLOCK)):
+            # candidates are in decreasing bound order: stop once none can enter the top n
+            if kth > bound[start]:
+                break
+            block = cand[start:start + max(n, _RESCORE_BLOCK)]
+            ids.append(block)
+            scores.append(self._rescore(qp, block))
+            all_scores = np.concatenate(scores)
+            if len(all_scores) >= n:
+                kth = np.partition(all_scores, len(all_scores) - n)[len(all_scores) - n]
+        if not ids:
+            return []
+        return self._ranked(np.concatenate(ids), np.concatenate(scores))[:n]
+
+    # ---------- Persistence ----------
+
+    def save(self, path: str) -> None:
+        """Write the index to one .npz file (sketch bodies are not stored)."""
+        self._consolidate()
+        t = self._template
+        with open(path, "wb") as fh:
+            np.savez(
+                fh,
+                names=np.array(self._names, dtype=str),
+                keys=self._keys, offsets=self._offsets, masks=self._masks,
+                post_keys=self._post_keys, post_ids=self._post_ids,
+                # algorithm code (0: empty index), k, w, seed; alpha separately
+                params=np.array([0 if t is None else t._ALGORITHM, getattr(t, "k", 0),
+                                 getattr(t, "w", 0), getattr(t, "seed", 0)], dtype=np.int64),
+                alpha=np.float64(getattr(t, "alpha", 0.0)),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> SketchIndex:
+        """Read an index written by save()."""
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            algorithm, k, w, seed = data["params"].tolist()
+            if algorithm == MAXGEOM:
+                index._set_template(MaxGeomSample(k=k, w=w, seed=seed))
+            elif algorithm == ALPHAMAXGEOM:
+                index._set_template(AlphaMaxGeomSample(alpha=float(data["alpha"]), w=w, seed=seed))
+            index._names = data["names"].tolist()
+            index._keys = data["keys"]
+            index._offsets = data["offsets"]
+            index._masks = data["masks"]
+            index._post_keys = data["post_keys"]
+            index._post_ids = data["post_ids"]
+        index._ids = dict(zip(index._names, range(len(index._names))))
+        return index
+
+    def __repr__(self) -> str:
+        self._consolidate()
+        return f"SketchIndex(sketches={len(self)}, entries={len(self._keys)})"
+
+    # ---------- Internals ----------
+
+    def _set_template(self, template: Any) -> None:
+        self._template = template
+        self._caps = bucket_capacities(template)
+
+    def _pack_query(self, query: Any) -> PackedSketch:
+        if self._template is not None:
+            check_compatible([self._template, query])
+        self._consolidate()
+        return pack_sketch(query)
+
+    def _consolidate(self) -> None:
+        """Merge the pending sketches into the key arrays and the postings."""
+        if not self._pending:
+            return
+        first_id = len(self._offsets) - 1
+        lens = np.array([len(keys) for keys, _ in self._pending], dtype=np.int64)
+        flat = np.concatenate([keys for keys, _ in self._pending])
+        ids = np.repeat(np.arange(first_id, first_id + len(lens), dtype=np.int32), lens)
+
+        self._keys = np.concatenate([self._keys, flat])
+        self._offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum(lens)])
+        self._masks = np.concatenate([self._masks,
+                                      np.array([mask for _, mask in self._pending], dtype=np.uint64)])
+        # new ids are larger than all indexed ones, so a stable sort by key keeps (key, id) order
+        post_keys = np.concatenate([self._post_keys, flat])
+        post_ids = np.concatenate([self._post_ids, ids])
+        order = np.argsort(post_keys, kind="stable")
+        self._post_keys = post_keys[order]
+        self._post_ids = post_ids[order]
+        self._pending = []
+
+    def _probe(self, qp: PackedSketch) -> np.ndarray:
+        lo = np.searchsorted(self._post_keys, qp.keys, side="left")
+        hi = np.searchsorted(self._post_keys, qp.keys, side="right")
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(len(self), dtype=np.int64)
+        # positions lo[t] .. hi[t]-1 of every query key t, flattened
+        pos = np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        return np.bincount(self._post_ids[pos], minlength=len(self)).astype(np.int64)
+
+    def _candidates(self, qp: PackedSketch) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids sharing at least one entry with the query, and their upper bounds on the Jaccard index."""
+        shared = self._probe(qp)
+        cand = np.nonzero(shared)[0]
+        masks = self._masks[cand]
+        bucket_sizes = np.bincount(64 - bit_length_many(qp.keys), minlength=64)
+        common_size = np.zeros(len(cand), dtype=np.int64)
+        for b in np.nonzero(bucket_sizes)[0].tolist():
+            # bucket i = b + 1 is bit b of the masks
+            common_size += bucket_sizes[b] * ((masks >> np.uint64(b)) & np.uint64(1)).astype(np.int64)
+        return cand, shared[cand] / common_size
+
+    def _rescore(self, qp: PackedSketch, ids: np.ndarray) -> np.ndarray:
+        refs = []
+        for j in ids.tolist():
+            keys = self._keys[self._offsets[j]:self._offsets[j + 1]]
+            # frequencies are not indexed; the Jaccard index does not use them
+            refs.append(PackedSketch(keys, np.ones(len(keys), dtype=np.uint64), int(self._masks[j])))
+        return packed_scores(qp, refs, self._caps, "jaccard")
+
+    def _ranked(self, ids: np.ndarray, scores: np.ndarray) -> List[Tuple[str, float]]:
+        order = np.lexsort((ids, -scores))
+        return [(self._names[j], s) for j, s in zip(ids[order].tolist(), scores[order].tolist())]
+
+
+def _empty_like(sketch: Any) -> Any:
+    """An empty sketch with the parameters of `sketch`."""
+    if isinstance(sketch, MaxGeomSample):
+        return MaxGeomSample(k=sketch.k, w=sketch.w, seed=sketch.seed)
+    if isinstance(sketch, AlphaMaxGeomSample):
+        return AlphaMaxGeomSample(alpha=sketch.alpha, w=sketch.w, seed=sketch.seed)
+    raise ValueError("SketchIndex only holds MaxGeomSample or AlphaMaxGeomSample sketches")
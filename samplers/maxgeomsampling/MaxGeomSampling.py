@@ -1,15 +1,124 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from hashes.hash_utils import get_mmh3_hash
+from hashes.hash_utils import get_mmh3_hash, iter_hash_batches, bit_length_many, BATCH_SIZE
+from ..serialization import (SerializableSketch, SketchHeader, MAXGEOM, FLAG_ARRAY_STORAGE,
+                             FLAG_HASH_ONLY, pack_buckets, unpack_buckets)
+from ..similarity import (comparison_view, containment_from_stats, containment_stats, cosine_from_stats,
+                          jaccard_from_stats, merge_stats, weighted_containment_from_stats)
 import heapq
-from typing import Any, Dict, Iterable, List, Tuple
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 @dataclass
 class _Entry:
+    __slots__ = ("hprime", "freq")
     hprime: int
     freq: int
 
-class MaxGeomSample:
+
+class _ArrayBucket:
+    """
+    Fixed-capacity bucket for storage="array".
+
+    h' and freq live in two preallocated uint64 arrays of length `capacity`,
+    kept sorted by h' ascending, so the bucket minimum is at position 0.
+    Elements are identified by their h' (unique within a bucket unless two
+    64-bit hashes collide). An optional side-table keeps the original items
+    aligned with the arrays.
+
+    A bucket loaded from a serialized sketch holds read-only views of the
+    loaded buffer; they are copied into private arrays on the first write.
+    """
+
+    __slots__ = ("hprimes", "freqs", "items", "n", "capacity")
+
+    def __init__(self, capacity: int, keep_items: bool = True) -> None:
+        self.hprimes = np.empty(capacity, dtype=np.uint64)
+        self.freqs = np.empty(capacity, dtype=np.uint64)
+        self.items: Optional[List[Any]] = [] if keep_items else None
+        self.n = 0
+        self.capacity = capacity
+
+    @classmethod
+    def from_arrays(cls, capacity: int, hprimes: np.ndarray, freqs: np.ndarray,
+                    items: Optional[List[Any]]) -> _ArrayBucket:
+        """Wrap sorted h' and freq arrays (e.g. views of a loaded sketch) without copying."""
+        bucket = cls.__new__(cls)
+        bucket.hprimes = hprimes
+        bucket.freqs = freqs
+        bucket.items = items
+        bucket.n = len(hprimes)
+        bucket.capacity = capacity
+        return bucket
+
+    def __len__(self) -> int:
+        return self.n
+
+    def find(self, hprime: int) -> int:
+        """Position of h' in the bucket, or -1."""
+        j = int(np.searchsorted(self.hprimes[:self.n], np.uint64(hprime)))
+        if j < self.n and int(self.hprimes[j]) == hprime:
+            return j
+        return -1
+
+    def min_hprime(self) -> int:
+        return int(self.hprimes[0])
+
+    def increment(self, j: int) -> None:
+        """Add one to the frequency at position j."""
+        self._own()
+        self.freqs[j] += 1
+
+    def insert(self, z: Any, hprime: int, freq: int) -> None:
+        """Insert a new h' (the bucket must not be full)."""
+        self._own()
+        n = self.n
+        j = int(np.searchsorted(self.hprimes[:n], np.uint64(hprime)))
+        self.hprimes[j + 1:n + 1] = self.hprimes[j:n]
+        self.freqs[j + 1:n + 1] = self.freqs[j:n]
+        self.hprimes[j] = hprime
+        self.freqs[j] = freq
+        if self.items is not None:
+            self.items.insert(j, z)
+        self.n = n + 1
+
+    def replace_min(self, z: Any, hprime: int, freq: int) -> None:
+        """Evict the smallest h' and insert a larger one in a single shift."""
+        self._own()
+        n = self.n
+        j = int(np.searchsorted(self.hprimes[:n], np.uint64(hprime))) - 1
+        self.hprimes[:j] = self.hprimes[1:j + 1]
+        self.freqs[:j] = self.freqs[1:j + 1]
+        self.hprimes[j] = hprime
+        self.freqs[j] = freq
+        if self.items is not None:
+            self.items.pop(0)
+            self.items.insert(j, z)
+
+    def _own(self) -> None:
+        """Replace borrowed (read-only or short) arrays by private ones of full capacity."""
+        if len(self.hprimes) < self.capacity or not self.hprimes.flags.writeable:
+            n = self.n
+            hprimes = np.empty(self.capacity, dtype=np.uint64)
+            freqs = np.empty(self.capacity, dtype=np.uint64)
+            hprimes[:n] = self.hprimes[:n]
+            freqs[:n] = self.freqs[:n]
+            self.hprimes = hprimes
+            self.freqs = freqs
+
+    def rows(self, lead: int = 0) -> List[Tuple[Any, int, int]]:
+        """
+        (item, hprime, freq) sorted by h' descending. Without a side-table
+        the item slot holds lead | h', i.e. the 64-bit hash when `lead` is
+        the bucket's leading one-bit.
+        """
+        n = self.n
+        hprimes = self.hprimes[:n].tolist()
+        freqs = self.freqs[:n].tolist()
+        items = self.items if self.items is not None else [lead | hp for hp in hprimes]
+        return [(items[j], hprimes[j], freqs[j]) for j in range(n - 1, -1, -1)]
+
+class MaxGeomSample(SerializableSketch):
     """
     MaxGeomSampling(Z : hash stream; S : sample)
 
@@ -22,6 +131,21 @@ class MaxGeomSample:
         Must satisfy 1 <= w <= 64.
     seed : int, default 0
         Salt for the internal 64-bit hash (deterministic across runs).
+    storage : {"dict", "array"}, default "dict"
+        "dict" keeps S[i] as a dict item -> (h', freq) plus a min-heap.
+        "array" keeps S[i] as two preallocated uint64 arrays (h', freq) of
+        length k with an item side-table (~16 bytes per entry plus the item
+        reference); elements are then identified by their h'.
+    keep_items : bool, default True
+        If False, the original items are not retained: buckets are keyed by
+        the 64-bit hash h instead of the item (and the array storage drops
+        its side-table), and sample() reports h in place of the item.
+        Frequencies and all similarity methods work unchanged.
+
+    Samples can be written with save(path) and read back with
+    MaxGeomSample.load(path, mmap=False); see samplers.serialization.
+    With storage="array" the loaded buckets are views of the file (or of
+    the to_bytes() buffer) and are only copied when they are updated.
 
     Notes
     -----
@@ -35,29 +159,155 @@ class MaxGeomSample:
       the current minimum h' in that bucket; then the smallest is evicted.
     """
 
-    def __init__(self, k: int, w: int = 64, seed: int = 42) -> None:
+    def __init__(self, k: int, w: int = 64, seed: int = 42, storage: str = "dict",
+                 keep_items: bool = True) -> None:
         if not (1 <= w <= 64):
             raise ValueError("w must be in [1, 64]")
         if k <= 0:
             raise ValueError("k must be positive")
+        if storage not in ("dict", "array"):
+            raise ValueError("storage must be 'dict' or 'array'")
 
         self.k = k
         self.w = w
         self.seed = seed
+        self.storage = storage
+        self.keep_items = keep_items
 
-        # S: bucket_index -> { item -> _Entry(hprime, freq) }
-        self._buckets: Dict[int, Dict[Any, _Entry]] = {}
+        # S: bucket_index -> { item (or h) -> _Entry(hprime, freq) }, or an _ArrayBucket
+        self._buckets: Dict[int, Any] = {}
         
-        # Min-heaps per bucket for quick eviction: bucket_index -> [(hprime, item), ...]
+        # Min-heaps per bucket for quick eviction: bucket_index -> [(hprime, item or h), ...]
         self._heaps: Dict[int, List[Tuple[int, Any]]] = {}
 
+        # Early-reject cache: minimum h' of bucket i once it is full, else 0.
+        # An element with h' below it is rejected without touching the bucket.
+        self._thresholds: List[int] = [0] * (w + 1)
+
+        # Cached comparison view (see samplers.similarity); reset on every update
+        self._view: Optional[Dict[int, Any]] = None
+
+        # Counters of per-element decisions
+        self._n_accepted = 0
+        self._n_rejected = 0
+        self._n_duplicates = 0
+
     # ---------- Public API ----------
 
     def add_item(self, z: Any) -> None:
         """Process a single element."""
         h = get_mmh3_hash(z, seed=self.seed)
-        i = self._zpl_plus_one(h)           # 1..w
-        hprime = self._tail_after_leftmost_one(h, i)
+        i = min(65 - h.bit_length(), self.w)    # == self._zpl_plus_one(h), 1..w
+        hprime = h & ((1 << (64 - i)) - 1)      # == self._tail_after_leftmost_one(h, i)
+        self._add_hashed(z if self.keep_items else h, i, hprime)
+
+    def add_many_items(self, stream: Iterable[Any]) -> None:
+        """
+        Process an iterable of elements.
+
+        Elements are hashed in batches; only the ones that can still end up in
+        the sample are replayed through the per-item update, so the result is
+        the same as calling add_item on every element.
+        """
+        for items, hashes in iter_hash_batches(stream, seed=self.seed):
+            self._add_batch(items, hashes)
+
+    def add_hashes(self, hashes: Iterable[int]) -> None:
+        """
+        Process precomputed 64-bit hashes (e.g. from hash_many or packed
+        k-mers) without hashing items. The hash stands in for the item, so
+        sample() reports it in the item slot.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        for start in range(0, len(hashes), BATCH_SIZE):
+            self._add_batch(None, hashes[start:start + BATCH_SIZE])
+
+    def sample(self) -> Dict[int, List[Tuple[Any, int, int]]]:
+        """
+        Get the current sample.
+
+        Returns
+        -------
+        dict: i -> list of (item, hprime, freq), sorted by h' descending.
+        """
+        return {i: self._bucket_rows(i) for i in self._buckets}
+
+    def bucket(self, i: int) -> List[Tuple[Any, int, int]]:
+        """Return the contents of bucket i as (item, hprime, freq), sorted by h' descending."""
+        return self.sample().get(i, [])
+
+    def memory_usage(self) -> Dict[int, Dict[str, int]]:
+        """
+        Per-bucket bookkeeping sizes: i -> {"live": stored entries, "heap": heap tuples}.
+        Every eviction pops the entry it deletes, so the heap holds exactly the
+        live entries (at most k) between updates (array storage has no heap).
+        """
+        return {
+            i: {"live": len(bucket), "heap": len(self._heaps.get(i, ()))}
+            for i, bucket in self._buckets.items()
+        }
+
+    def counters(self) -> Dict[str, int]:
+        """
+        Counts of processed elements: inserted into the sample ("accepted"),
+        dropped ("rejected"), or already present ("duplicates").
+
+        The split depends on how the elements were ingested; only the total
+        (the number of elements processed) does not. add_item counts the
+        outcome of the per-item rule. add_many_items and add_hashes count
+        every element their batch prefilter drops as rejected, including
+        repeats of an element that is, or was, in the sample, and elements
+        the per-item rule would have inserted and then evicted again within
+        the batch. The sample itself is the same either way.
+        """
+        return {
+            "accepted": self._n_accepted,
+            "rejected": self._n_rejected,
+            "duplicates": self._n_duplicates,
+        }
+
+    # ---------- Internals ----------
+
+    _ALGORITHM = MAXGEOM
+
+    def _serial_state(self) -> Tuple[SketchHeader, List[Any]]:
+        rows = {i: self._bucket_rows(i)[::-1] for i in self._buckets}
+        array = self.storage == "array"
+        # hash-only array samples rebuild the hashes as lead | h', except in bucket w
+        flags, sections = pack_buckets(rows, self.keep_items, store_keys=not array or self.w in rows)
+        if array:
+            flags |= FLAG_ARRAY_STORAGE
+        return SketchHeader(algorithm=MAXGEOM, flags=flags, k=self.k, w=self.w, seed=self.seed), sections
+
+    @classmethod
+    def _from_serial(cls, header: SketchHeader, sections: List[np.ndarray]) -> MaxGeomSample:
+        storage = "array" if header.flags & FLAG_ARRAY_STORAGE else "dict"
+        sample = cls(k=header.k, w=header.w, seed=header.seed, storage=storage,
+                     keep_items=not header.flags & FLAG_HASH_ONLY)
+        for i, hprimes, freqs, items in unpack_buckets(header.flags, sections):
+            if storage == "array":
+                if not sample._side_table(i):
+                    items = None
+                sample._buckets[i] = _ArrayBucket.from_arrays(sample.k, hprimes, freqs, items)
+                if len(hprimes) >= sample.k:
+                    sample._thresholds[i] = int(hprimes[0])
+            else:
+                sample._set_bucket(i, list(zip(items, hprimes.tolist(), freqs.tolist())))
+        return sample
+
+    def _add_hashed(self, z: Any, i: int, hprime: int) -> None:
+        """
+        Update bucket i with element z whose tail is h' (the per-item update rule).
+        z is the item itself, or its 64-bit hash when keep_items is False.
+        """
+        self._view = None
+        if hprime < self._thresholds[i]:
+            self._n_rejected += 1
+            return
+
+        if self.storage == "array":
+            self._add_hashed_array(z, i, hprime)
+            return
 
         if i not in self._buckets:
             self._buckets[i] = {}
@@ -68,12 +318,16 @@ class MaxGeomSample:
 
         if z in bucket:
             bucket[z].freq += 1
+            self._n_duplicates += 1
             return
 
         # Not present: consider adding if capacity or h' among top-k
         if len(bucket) < self.k:
             bucket[z] = _Entry(hprime=hprime, freq=1)
             heapq.heappush(heap, (hprime, z))
+            self._n_accepted += 1
+            if len(bucket) == self.k:
+                self._thresholds[i] = heap[0][0]
         else:
             # Check smallest h' in current top-k
             min_hprime, _ = heap[0]
@@ -83,34 +337,120 @@ class MaxGeomSample:
                 heapq.heappush(heap, (hprime, z))
                 # Evict smallest to keep |S[i]| == k
                 self._evict_smallest(i)
-            # else: drop z (not among k largest)
+                self._thresholds[i] = heap[0][0]
+                self._n_accepted += 1
+            else:
+                # drop z (not among k largest)
+                self._n_rejected += 1
         # done
 
-    def add_many_items(self, stream: Iterable[Any]) -> None:
-        """Process an iterable of elements."""
-        for z in stream:
-            self.add_item(z)
+    def _add_hashed_array(self, z: Any, i: int, hprime: int) -> None:
+        """Same update rule as _add_hashed, on an _ArrayBucket."""
+        bucket = self._buckets.get(i)
+        if bucket is None:
+            bucket = self._buckets[i] = _ArrayBucket(self.k, keep_items=self._side_table(i))
 
-    def sample(self) -> Dict[int, List[Tuple[Any, int, int]]]:
-        """
-        Get the current sample.
+        j = bucket.find(hprime)
+        if j >= 0:
+            bucket.increment(j)
+            self._n_duplicates += 1
+            return
+        if len(bucket) < self.k:
+            bucket.insert(z, hprime, 1)
+        elif hprime > bucket.min_hprime():
+            bucket.replace_min(z, hprime, 1)
+        else:
+            self._n_rejected += 1
+            return
+        self._n_accepted += 1
+        if len(bucket) == self.k:
+            self._thresholds[i] = bucket.min_hprime()
 
-        Returns
-        -------
-        dict: i -> list of (item, hprime, freq), sorted by h' descending.
+    def _add_batch(self, items: Optional[List[Any]], hashes: np.ndarray) -> None:
+        """
+        Update the sample with a batch of elements and their 64-bit hashes
+        (items=None: the hashes are the elements).
+
+        Bucket indices and h' are computed for the whole batch at once. An
+        element is then dropped without touching the buckets if
+          - its bucket is full and its h' is below the bucket minimum, or
+          - at least k distinct larger h' of its bucket occur in the batch,
+        since the per-item rule would either reject it or evict it again
+        before the batch ends. The survivors are replayed in stream order;
+        dropped elements are counted as rejected (see counters()).
         """
-        out: Dict[int, List[Tuple[Any, int, int]]] = {}
-        for i, bucket in self._buckets.items():
-            rows = [(z, ent.hprime, ent.freq) for z, ent in bucket.items()]
-            rows.sort(key=lambda r: r[1], reverse=True)
-            out[i] = rows
-        return out
+        idx = self._zpl_plus_one_many(hashes)
+        hprimes = self._tail_after_leftmost_one_many(hashes, idx)
+
+        # minimum h' of every full bucket; elements strictly below are rejected
+        thresholds = np.array(self._thresholds, dtype=np.uint64)
+        cand = np.nonzero(hprimes >= thresholds[idx])[0]
+
+        # rank the distinct (i, h') pairs of each bucket from the top
+        order = cand[np.lexsort((hprimes[cand], idx[cand]))]
+        s_idx = idx[order]
+        s_hp = hprimes[order]
+        new_pair = np.ones(len(order), dtype=bool)
+        new_pair[1:] = (s_idx[1:] != s_idx[:-1]) | (s_hp[1:] != s_hp[:-1])
+        pair_id = np.cumsum(new_pair) - 1
+        pair_bucket = s_idx[new_pair]
+        last_in_bucket = np.nonzero(np.append(pair_bucket[1:] != pair_bucket[:-1], True))[0]
+        pair_pos = np.arange(len(pair_bucket))
+        rank_from_top = last_in_bucket[np.searchsorted(last_in_bucket, pair_pos)] - pair_pos
+
+        survivors = np.sort(order[rank_from_top[pair_id] < self.k])
+        self._n_rejected += len(hashes) - len(survivors)
+        if self.keep_items and items is not None:
+            keys = [items[j] for j in survivors.tolist()]
+        else:
+            keys = hashes[survivors].tolist()
+        for z, i, hprime in zip(keys, idx[survivors].tolist(), hprimes[survivors].tolist()):
+            self._add_hashed(z, i, hprime)
+
+    def _set_bucket(self, i: int, rows: List[Tuple[Any, int, int]]) -> None:
+        """Replace bucket i by at most k rows of (item, hprime, freq)."""
+        self._view = None
+        if self.storage == "array":
+            rows = sorted(rows, key=lambda r: r[1])
+            bucket = _ArrayBucket(self.k, keep_items=self._side_table(i))
+            bucket.n = len(rows)
+            bucket.hprimes[:bucket.n] = [r[1] for r in rows]
+            bucket.freqs[:bucket.n] = [r[2] for r in rows]
+            if bucket.items is not None:
+                bucket.items.extend(r[0] for r in rows)
+            self._buckets[i] = bucket
+        else:
+            self._buckets[i] = {z: _Entry(hprime=hprime, freq=freq) for z, hprime, freq in rows}
+            heap = [(hprime, z) for z, hprime, _ in rows]
+            heapq.heapify(heap)
+            self._heaps[i] = heap
+        self._thresholds[i] = min(r[1] for r in rows) if len(rows) >= self.k else 0
 
-    def bucket(self, i: int) -> List[Tuple[Any, int, int]]:
-        """Return the contents of bucket i as (item, hprime, freq), sorted by h' descending."""
-        return self.sample().get(i, [])
+    def _side_table(self, i: int) -> bool:
+        """
+        Whether array bucket i keeps a side-table. Without keep_items only
+        bucket w needs one, holding the 64-bit hashes: it also receives the
+        hashes whose top w bits are all zero, which have no leading one-bit,
+        so lead | h' would not give their hash back.
+        """
+        return self.keep_items or i == self.w
 
-    # ---------- Internals ----------
+    def _bucket_rows(self, i: int) -> List[Tuple[Any, int, int]]:
+        """Bucket i as (item, hprime, freq), sorted by h' descending."""
+        bucket = self._buckets[i]
+        if self.storage == "array":
+            return bucket.rows(lead=1 << (64 - i))
+        rows = [(z, ent.hprime, ent.freq) for z, ent in bucket.items()]
+        rows.sort(key=lambda r: r[1], reverse=True)
+        return rows
+
+    def _hprime_freqs(self, i: int) -> Dict[int, int]:
+        """Bucket i as a dict h' -> freq."""
+        bucket = self._buckets[i]
+        if self.storage == "array":
+            n = bucket.n
+            return dict(zip(bucket.hprimes[:n].tolist(), bucket.freqs[:n].tolist()))
+        return {ent.hprime: ent.freq for ent in bucket.values()}
 
     def _evict_smallest(self, i: int) -> None:
         """Evict elements with smallest h' until bucket size is k."""
@@ -155,6 +495,16 @@ class MaxGeomSample:
         low = h & ((1 << lower_bits) - 1)
         return (rem_top << lower_bits) | low
 
+    def _zpl_plus_one_many(self, h: np.ndarray) -> np.ndarray:
+        """Vectorized _zpl_plus_one over a uint64 array (returns int64 bucket indices)."""
+        # the left-most 1 of h is at position 65 - bit_length(h); no 1 in the top w bits -> w
+        return np.minimum(65 - bit_length_many(h), self.w)
+
+    def _tail_after_leftmost_one_many(self, h: np.ndarray, i: np.ndarray) -> np.ndarray:
+        """Vectorized _tail_after_leftmost_one: h' is h with its top i bits cleared."""
+        one = np.uint64(1)
+        return h & ((one << (64 - i).astype(np.uint64)) - one)
+
     # ---------- Convenience ----------
 
     def size(self) -> int:
@@ -187,92 +537,90 @@ class MaxGeomSample:
         if not isinstance(other, MaxGeomSample):
             raise ValueError("Can only compute Jaccard index with another MaxGeomSample")
         
-        union_size = 0
-        intersection_size = 0
-
-        # get all i values that are in both buckets
-        self_valid_i = set(self._buckets.keys())
-        other_valid_i = set(other._buckets.keys())
-        common_i = self_valid_i.intersection(other_valid_i)
-
-        # go over all buckets
-        for i in common_i:
-            # get the buckets
-            self_hprimes = {ent.hprime for ent in self._buckets[i].values()}
-            other_hprimes = {ent.hprime for ent in other._buckets[i].values()}
-            union_hprimes = self_hprimes.union(other_hprimes)
-            union_hprimes = heapq.nlargest(self.k, union_hprimes)
-            intersection_hprimes = self_hprimes.intersection(other_hprimes)
-            intersection_hprimes = intersection_hprimes.intersection(set(union_hprimes))
-
-            # compute union and intersection sizes
-            union_size += len(union_hprimes)
-            intersection_size += len(intersection_hprimes)
-
-        if union_size == 0:
-            return 1.0  # both are empty
-
-        return intersection_size / union_size
+        intersection_size, union_size, _, _, _ = merge_stats(
+            comparison_view(self), comparison_view(other), lambda i: self.k)
+        return jaccard_from_stats(intersection_size, union_size)
 
 
     def union(self, other: MaxGeomSample) -> MaxGeomSample:
         """Merge another MaxGeomSample into this one and return a new MaxGeomSample."""
-        if not isinstance(other, MaxGeomSample):
-            raise ValueError("Can only merge with another MaxGeomSample")
-        if self.k != other.k or self.w != other.w:
-            raise ValueError("Can only merge samples with the same k and w")
+        self._check_mergeable(other)
+        merged = MaxGeomSample(k=self.k, w=self.w, seed=self.seed, storage=self.storage,
+                               keep_items=self.keep_items)
+        merged.merge_from(self)
+        merged.merge_from(other)
+        return merged
 
-        merged = MaxGeomSample(k=self.k, w=self.w, seed=self.seed)
+    def merge_from(self, other: MaxGeomSample) -> None:
+        """
+        Merge another MaxGeomSample into this one, in place.
 
-        # Add items from self
-        for i, bucket in self._buckets.items():
-            for z, ent in bucket.items():
-                for _ in range(ent.freq):
-                    merged.add_item(z)
+        Works on the stored (h', freq) pairs: per bucket, the k largest h' of
+        both samples are kept and frequencies of entries present in both
+        (same h', which identifies an element in both storages) are summed.
+        The result equals the sample of the concatenated streams, at a cost
+        of O(buckets * k) regardless of how often items were seen.
+        """
+        self._check_mergeable(other)
+        for i in other._buckets:
+            combined: Dict[int, List[Any]] = {}
+            rows = other._bucket_rows(i)
+            if i in self._buckets:
+                rows += self._bucket_rows(i)
+            for z, hprime, freq in rows:
+                ent = combined.get(hprime)
+                if ent is None:
+                    combined[hprime] = [z, freq]
+                else:
+                    ent[1] += freq
+            top = heapq.nlargest(self.k, combined.items(), key=lambda kv: kv[0])
+            self._set_bucket(i, [(z, hprime, freq) for hprime, (z, freq) in top])
+
+        self._n_accepted += other._n_accepted
+        self._n_rejected += other._n_rejected
+        self._n_duplicates += other._n_duplicates
+
+    def _check_mergeable(self, other: MaxGeomSample) -> None:
+        if not isinstance(other, MaxGeomSample):
+            raise ValueError("Can only merge with another MaxGeomSample")
+        if self.k != other.k or self.w != other.w or self.seed != other.seed:
+            raise ValueError("Can only merge samples with the same k, w and seed")
+        if self.keep_items != other.keep_items:
+            raise ValueError("Cannot merge a hash-only sample with one that keeps items")
 
-        # Add items from other
-        for i, bucket in other._buckets.items():
-            for z, ent in bucket.items():
-                for _ in range(ent.freq):
-                    merged.add_item(z)
+    
+    def containment_index(self, other: MaxGeomSample) -> float:
+        """
+        Estimate |A ∩ B| / |A|, the fraction of this sample's set contained in
+        other's. In every bucket of this sample, the largest h' of the union
+        of both buckets are kept as in jaccard_index(); the estimate is the
+        fraction of this sample's kept elements that other also holds.
+        """
+        if not isinstance(other, MaxGeomSample):
+            raise ValueError("Can only compute containment index with another MaxGeomSample")
+        intersection_size, self_size, _, _ = containment_stats(
+            comparison_view(self), comparison_view(other), lambda i: self.k)
+        return containment_from_stats(intersection_size, self_size)
 
-        return merged
+    def weighted_containment(self, other: MaxGeomSample) -> float:
+        """
+        Frequency-weighted containment index: over the same elements as
+        containment_index(), sum(min(freq_self, freq_other)) / sum(freq_self).
+        """
+        if not isinstance(other, MaxGeomSample):
+            raise ValueError("Can only compute weighted containment with another MaxGeomSample")
+        _, _, min_sum, self_weight = containment_stats(
+            comparison_view(self), comparison_view(other), lambda i: self.k)
+        return weighted_containment_from_stats(min_sum, self_weight)
 
-    
     def cosine_similarity(self, other: MaxGeomSample) -> float:
         """Compute Cosine similarity between two samples."""
         if not isinstance(other, MaxGeomSample):
             raise ValueError("Can only compute Cosine similarity with another MaxGeomSample")
         
-        dot_product = 0
-        self_norm_sq = 0
-        other_norm_sq = 0
-
-        # get all i values that are in both buckets
-        self_valid_i = set(self._buckets.keys())
-        other_valid_i = set(other._buckets.keys())
-        common_i = self_valid_i.intersection(other_valid_i)
-
-        # go over all buckets
-        for i in common_i:
-            # get the buckets
-            self_hprimes = {ent.hprime: ent.freq for ent in self._buckets[i].values()}
-            other_hprimes = {ent.hprime: ent.freq for ent in other._buckets[i].values()}
-            union_hprimes = set(self_hprimes.keys()).union(set(other_hprimes.keys()))
-            union_hprimes = heapq.nlargest(self.k, union_hprimes)
-
-            # compute dot product and norms
-            for hprime in union_hprimes:
-                freq1 = self_hprimes.get(hprime, 0)
-                freq2 = other_hprimes.get(hprime, 0)
-                dot_product += freq1 * freq2
-                self_norm_sq += freq1 * freq1
-                other_norm_sq += freq2 * freq2
-
-        if self_norm_sq == 0 or other_norm_sq == 0:
-            return 0.0  # one is empty
-
-        return dot_product / ((self_norm_sq ** 0.5) * (other_norm_sq ** 0.5))
+        _, _, dot_product, self_norm_sq, other_norm_sq = merge_stats(
+            comparison_view(self), comparison_view(other), lambda i: self.k)
+        return cosine_from_stats(dot_product, self_norm_sq, other_norm_sq)
     
 
     def sample_size(self) -> int:
@@ -1,4 +1,6 @@
-from hashes.hash_utils import get_mmh3_hash
+from hashes.hash_utils import get_mmh3_hash, hash_many, BATCH_SIZE
+from ..serialization import SerializableSketch, SketchHeader, MINHASH, FLAG_ONE_PERMUTATION, as_u64
+from itertools import islice
 from typing import Iterable, Optional
 import random
 
@@ -8,25 +10,75 @@ try:
 except Exception:
     _HAS_NUMPY = False
 
+# items x permutations computed at once by the NumPy batch update (default
+# chunk = this // k); 32K elements keep the three uint64 work blocks in cache
+CHUNK_ELEMENTS = 1 << 15
 
-class MinHashSketch:
+if _HAS_NUMPY:
+    _1 = np.uint64(1)
+    _30 = np.uint64(30)
+    _31 = np.uint64(31)
+    _32 = np.uint64(32)
+    _61 = np.uint64(61)
+    _LO30 = np.uint64((1 << 30) - 1)
+    _LO31 = np.uint64((1 << 31) - 1)
+    _LO32 = np.uint64((1 << 32) - 1)
+    _P61 = np.uint64((1 << 61) - 1)
+    _EMPTY = np.uint64((1 << 64) - 1)
+    _M1 = np.uint64(0xBF58476D1CE4E5B9)
+    _M2 = np.uint64(0x94D049BB133111EB)
+
+# empty bin of a one-permutation sketch
+EMPTY_BIN = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+class MinHashSketch(SerializableSketch):
     """
     Fast MinHash:
       - Single mmh3 call per item (seed=0) to get base hash.
       - Derive k hashes via affine transforms mod a large prime p.
       - Vectorized across k with NumPy when available.
       - Incremental updates on add_item/add_many_items.
+
+    By default the distinct items are kept in `all_items`, which
+    create_minhash_sample() needs to rebuild the minimums from scratch. With
+    keep_items=False the sketch is streaming: only the k minimums are kept,
+    so its memory is O(k) however many items are added (adding an item
+    twice cannot change a minimum), and create_minhash_sample() raises
+    ValueError.
+
+    With one_permutation=True each item is hashed once (64-bit mmh3 with
+    `seed`) and goes to bin (h * k) >> 64, which keeps its smallest hash, so
+    an update costs O(1) instead of O(k). Empty bins are filled at query time
+    by optimal densification (Shrivastava, ICML 2017): empty bin i takes the
+    value of the first non-empty bin among j_1, j_2, ..., where j_t is a
+    seeded hash of (i, t) mod k. The densified signature (signature()) is
+    compared exactly like the k minimums, so jaccard_index stays an unbiased
+    estimate; both sketches must use the same mode.
+
+    Only the k minimums are serialized (save/load); a loaded sketch does not
+    keep items, which is harmless since re-adding an item cannot change a
+    minimum. With load(path, mmap=True) the minimums are a read-only view of
+    the file until the sketch is updated.
     """
 
     # Large 61-bit prime for modular arithmetic
     _P = (1 << 61) - 1  # 2^61 - 1
 
-    def __init__(self, k: int, seed: int = 42, use_numpy: Optional[bool] = None):
+    def __init__(self, k: int, seed: int = 42, use_numpy: Optional[bool] = None,
+                 keep_items: bool = True, chunk_size: Optional[int] = None,
+                 one_permutation: bool = False):
         self.k = int(k)
         self.seed = int(seed)
-        self.all_items = set()
+        self.keep_items = keep_items
+        self.one_permutation = bool(one_permutation)
+        # Items per block of the NumPy batch update; memory is O(chunk_size * k)
+        self.chunk_size = int(chunk_size) if chunk_size else max(1, CHUNK_ELEMENTS // max(self.k, 1))
+        self.all_items = set() if keep_items else None
         self._initialized = False
         self._minhashes = None  # internal storage (np.ndarray or list)
+        self._dense = None  # densified signature, one-permutation mode only
         # Choose whether to use NumPy
         self._use_numpy = _HAS_NUMPY if use_numpy is None else (use_numpy and _HAS_NUMPY)
         # Pre-generate affine parameters a, b for k hash functions
@@ -37,39 +89,54 @@ class MinHashSketch:
         if self._use_numpy:
             self._a = np.array(self._a, dtype=np.uint64)
             self._b = np.array(self._b, dtype=np.uint64)
+            # 31-bit halves of a (and b + 1) for the exact product mod p (see _min_affine_mod_p)
+            self._a_hi = self._a >> _31
+            self._a_lo = self._a & _LO31
+            self._b1 = self._b + _1
             self._p = np.uint64(self._P)
             self._max = np.uint64(self._P - 1)
         else:
             self._p = self._P
             self._max = self._P - 1
+        if self.one_permutation:
+            # bins hold raw 64-bit hashes; the largest one marks an empty bin
+            self._max = _EMPTY if self._use_numpy else EMPTY_BIN
 
     # ---- Public API ----
     def add_item(self, item: str):
-        # Add to set and incrementally update minhash state
-        if item in self.all_items:
-            return
-        self.all_items.add(item)
+        # Incrementally update the minhash state (and the item set if kept)
+        if self.keep_items:
+            if item in self.all_items:
+                return
+            self.all_items.add(item)
         self._ensure_state()
+        self._ensure_writable()
         self._update_with_item(item)
 
     def add_many_items(self, items: Iterable[str]):
-        # If many items, batch the updates for speed
-        batch = []
-        for it in items:
-            if it not in self.all_items:
-                self.all_items.add(it)
-                batch.append(it)
-        if not batch:
-            return
-        self._ensure_state()
-        if self._use_numpy:
-            self._update_batch_numpy(batch)
-        else:
-            for it in batch:
-                self._update_with_item_pure(it)
+        # Update in batches of BATCH_SIZE items, so memory stays O(k + batch)
+        it = iter(items)
+        while True:
+            batch = list(islice(it, BATCH_SIZE))
+            if not batch:
+                return
+            if self.keep_items:
+                batch = [x for x in dict.fromkeys(batch) if x not in self.all_items]
+                self.all_items.update(batch)
+                if not batch:
+                    continue
+            self._ensure_state()
+            self._ensure_writable()
+            if self._use_numpy:
+                self._update_batch_numpy(batch)
+            else:
+                for x in batch:
+                    self._update_with_item_pure(x)
 
     def create_minhash_sample(self):
-        # Rebuild from scratch (rarely needed now that updates are incremental)
+        # Rebuild from scratch from the kept items (only with keep_items=True)
+        if not self.keep_items:
+            raise ValueError("create_minhash_sample requires a MinHashSketch with keep_items=True")
         self._reset_state()
         if not self.all_items:
             return
@@ -81,18 +148,56 @@ class MinHashSketch:
     def __len__(self):
         return self.k
 
+    def __eq__(self, other):
+        if not isinstance(other, MinHashSketch):
+            return False
+        if self.k != other.k or self.seed != other.seed or self.one_permutation != other.one_permutation:
+            return False
+        if not (self._initialized and other._initialized):
+            return self._initialized == other._initialized
+        return list(self._iter_hashes()) == list(other._iter_hashes())
+
+    # compared by value and mutable, so not hashable (like MaxGeomSample)
+    __hash__ = None
+
     def jaccard_index(self, other: 'MinHashSketch') -> float:
         if self.k != other.k:
             raise ValueError("Both MinHashSketch instances must have the same k value for Jaccard index computation.")
-        self._ensure_state()
-        other._ensure_state()
+        if self.one_permutation != other.one_permutation:
+            raise ValueError("Cannot compare a one-permutation MinHashSketch with a k-permutation one.")
+        mine = self.signature()
+        theirs = other.signature()
 
-        if self._use_numpy and isinstance(self._minhashes, np.ndarray) and isinstance(other._minhashes, np.ndarray):
-            matches = int((self._minhashes == other._minhashes).sum())
+        if self._use_numpy and isinstance(mine, np.ndarray) and isinstance(theirs, np.ndarray):
+            matches = int((mine == theirs).sum())
         else:
-            matches = sum(int(a == b) for a, b in zip(self._iter_hashes(), other._iter_hashes()))
+            matches = sum(int(a == b) for a, b in zip(mine, theirs))
         return matches / self.k
 
+    def signature(self):
+        """
+        The k values compared by jaccard_index: the minimums, densified in
+        one-permutation mode (np.ndarray with NumPy, else a list).
+        """
+        self._ensure_state()
+        if not self.one_permutation:
+            return self._minhashes
+        if self._dense is None:
+            if self._use_numpy:
+                self._dense = _densify_numpy(np.asarray(self._minhashes, dtype=np.uint64), self.seed)
+            else:
+                self._dense = _densify_pure(list(self._minhashes), self.seed)
+        return self._dense
+
+    def bbit_signature(self, b: int):
+        """
+        The lowest b bits (b in 1, 2, 4, 8, 16) of every signature value,
+        packed into a uint8 array of ceil(k * b / 64) * 8 bytes; see
+        samplers.minhash.bbit.
+        """
+        from .bbit import pack_signatures
+        return pack_signatures(np.asarray(self.signature(), dtype=np.uint64), b).view(np.uint8)
+
     def sample_size(self) -> int:
         return self.k
 
@@ -106,9 +211,20 @@ class MinHashSketch:
                 self._minhashes = [self._max] * self.k
             self._initialized = True
 
+    def _ensure_writable(self):
+        # Minimums loaded from a file may be a read-only view; copy before updating
+        self._dense = None
+        if isinstance(self._minhashes, list):
+            return
+        if not self._use_numpy:
+            self._minhashes = [int(v) for v in self._minhashes]
+        elif not self._minhashes.flags.writeable:
+            self._minhashes = self._minhashes.copy()
+
     def _reset_state(self):
         self._initialized = False
         self._minhashes = None
+        self._dense = None
 
     def _base_hash(self, item: str) -> int:
         # Single mmh3 call per item; seed fixed to 0
@@ -121,26 +237,32 @@ class MinHashSketch:
 
     # ----- NumPy path -----
     def _build_numpy(self):
-        # Vectorized across k; loop over items
+        # Rebuild from the kept items in batches
         self._ensure_state()
-        for it in self.all_items:
-            self._update_with_item_numpy(it)
+        items = list(self.all_items)
+        for start in range(0, len(items), BATCH_SIZE):
+            self._update_batch_numpy(items[start:start + BATCH_SIZE])
 
     def _update_with_item_numpy(self, item: str):
-        h = np.uint64(self._base_hash(item))
-        # Compute k transformed hashes and take elementwise min
-        # (a*h + b) % p
-        vals = (self._a * h + self._b) % self._p
-        np.minimum(self._minhashes, vals, out=self._minhashes)
+        if self.one_permutation:
+            self._update_batch_numpy([item])
+            return
+        h = np.array([self._base_hash(item)], dtype=np.uint64)
+        self._update_hashes_numpy(h)
 
     def _update_batch_numpy(self, batch_items):
-        # Slightly faster than per-item loop for bigger batches
         # Build array of base hashes, shape (m,)
-        hs = np.fromiter((self._base_hash(it) for it in batch_items), dtype=np.uint64)
-        # For each h, update minhashes; keep memory bounded (still very fast)
-        for h in hs:
-            vals = (self._a * h + self._b) % self._p
-            np.minimum(self._minhashes, vals, out=self._minhashes)
+        if self.one_permutation:
+            hs = hash_many(batch_items, seed=self.seed)
+            np.minimum.at(self._minhashes, _bins_numpy(hs, self.k), hs)
+            return
+        self._update_hashes_numpy(hash_many(batch_items, seed=0))
+
+    def _update_hashes_numpy(self, hs):
+        # (a*h + b) mod p for blocks of items x k permutations at once, reduced
+        # with min along the item axis; same values as the pure path
+        mins = _min_affine_mod_p(hs % self._p, self._a_hi, self._a_lo, self._b1, self.chunk_size)
+        np.minimum(self._minhashes, mins, out=self._minhashes)
 
     # ----- Pure-Python path -----
     def _build_pure(self):
@@ -155,6 +277,12 @@ class MinHashSketch:
             self._update_with_item_pure(item)
 
     def _update_with_item_pure(self, item: str):
+        if self.one_permutation:
+            h = get_mmh3_hash(item, seed=self.seed)
+            b = (h * self.k) >> 64
+            if h < self._minhashes[b]:
+                self._minhashes[b] = h
+            return
         h = self._base_hash(item) % self._p
         a = self._a
         b = self._b
@@ -166,8 +294,133 @@ class MinHashSketch:
             if val < mh[i]:
                 mh[i] = val
 
+    # ----- Serialization -----
+    _ALGORITHM = MINHASH
+
+    def _serial_state(self):
+        flags = FLAG_ONE_PERMUTATION if self.one_permutation else 0
+        header = SketchHeader(algorithm=MINHASH, flags=flags, k=self.k, seed=self.seed)
+        mins = self._iter_hashes() if self._initialized else []
+        return header, [np.array(mins, dtype=np.uint64)]
+
+    @classmethod
+    def _from_serial(cls, header, sections):
+        sketch = cls(k=header.k, seed=header.seed, keep_items=False,
+                     one_permutation=bool(header.flags & FLAG_ONE_PERMUTATION))
+        mins = as_u64(sections[0])
+        if len(mins):
+            sketch._minhashes = mins if sketch._use_numpy else mins.tolist()
+            sketch._initialized = True
+        return sketch
+
     def _iter_hashes(self):
         # Helper to iterate regardless of backend
         if self._use_numpy and isinstance(self._minhashes, np.ndarray):
             return self._minhashes.tolist()
         return self._minhashes
+
+
+def _min_affine_mod_p(h, a_hi, a_lo, b1, chunk_size):
+    """
+    Minimum over the items h of (a*h + b) mod p, p = 2^61 - 1, for every
+    permutation (a, b), exactly and without overflowing uint64; h < p and
+    a = a_hi*2^31 + a_lo, b1 = b + 1 are rows of length k.
+
+    With h = h_hi*2^31 + h_lo (all halves < 2^31), and 2^61 = 1 mod p:
+
+        a*h = a_hi*h_hi*2^62 + mid*2^31 + a_lo*h_lo
+            = 2*a_hi*h_hi + (mid >> 30) + (mid & (2^30 - 1))*2^31 + a_lo*h_lo
+
+    where mid = a_hi*h_lo + a_lo*h_hi = (a_hi + a_lo)*(h_hi + h_lo) - a_hi*h_hi
+    - a_lo*h_lo < 2^62 takes one product instead of two. The sum plus b + 1
+    fits in 64 bits; one fold x = (x & p) + (x >> 61) leaves v + 1 with
+    v in [0, 2p), and a second fold turns that into (v mod p) + 1, so the
+    block minimum only needs a final - 1 on the k minimums.
+
+    The block is chunk_size items x k, computed in place in three buffers.
+    """
+    h_hi = h >> _31
+    h_lo = h & _LO31
+    h_sum = h_hi + h_lo
+    a_sum = a_hi + a_lo
+    rows = max(1, min(chunk_size, len(h)))
+    x = np.empty((rows, len(a_hi)), dtype=np.uint64)
+    mid = np.empty_like(x)
+    tmp = np.empty_like(x)
+    mins = np.full(len(a_hi), _P61, dtype=np.uint64)
+    for start in range(0, len(h), rows):
+        n = min(rows, len(h) - start)
+        X, M, T = x[:n], mid[:n], tmp[:n]
+        np.multiply(a_sum, h_sum[start:start + n, None], out=M)
+        np.multiply(a_lo, h_lo[start:start + n, None], out=X)
+        M -= X
+        np.multiply(a_hi, h_hi[start:start + n, None], out=T)
+        M -= T
+        X += T
+        X += T
+        np.right_shift(M, _30, out=T)
+        X += T
+        M &= _LO30
+        M <<= _31
+        X += M
+        X += b1
+        for _ in range(2):
+            np.right_shift(X, _61, out=T)
+            X &= _P61
+            X += T
+        np.minimum(mins, X.min(axis=0), out=mins)
+    return mins - _1
+
+
+def _bins_numpy(h, k):
+    """Bin (h * k) >> 64 of every uint64 hash (k < 2^32), without a 128-bit product."""
+    k = np.uint64(k)
+    return ((h >> _32) * k + (((h & _LO32) * k) >> _32)) >> _32
+
+
+def _mix_pure(x):
+    # splitmix64 finalizer
+    x &= EMPTY_BIN
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & EMPTY_BIN
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & EMPTY_BIN
+    return x ^ (x >> 31)
+
+
+def _mix_numpy(x):
+    x = (x ^ (x >> np.uint64(30))) * _M1
+    x = (x ^ (x >> np.uint64(27))) * _M2
+    return x ^ (x >> np.uint64(31))
+
+
+def _densify_pure(mins, seed):
+    """Optimal densification of one-permutation bins (list of ints), see MinHashSketch."""
+    k = len(mins)
+    if all(v == EMPTY_BIN for v in mins):
+        return mins
+    out = list(mins)
+    for i, v in enumerate(mins):
+        t = 1
+        while v == EMPTY_BIN:
+            v = mins[_mix_pure(seed * _GOLDEN + (i << 32) + t) % k]
+            t += 1
+        out[i] = v
+    return out
+
+
+def _densify_numpy(mins, seed):
+    """Same as _densify_pure for a uint64 array, all empty bins probed at once."""
+    k = np.uint64(len(mins))
+    todo = np.nonzero(mins == _EMPTY)[0]
+    if len(todo) == len(mins) or not len(todo):
+        return mins
+    out = mins.copy()
+    # wraps like the pure version, which masks to 64 bits before mixing
+    base = np.uint64((seed * _GOLDEN) & EMPTY_BIN) + (todo.astype(np.uint64) << _32)
+    t = np.uint64(1)
+    while len(todo):
+        v = mins[_mix_numpy(base + t) % k]
+        found = v != _EMPTY
+        out[todo[found]] = v[found]
+        todo, base = todo[~found], base[~found]
+        t += np.uint64(1)
+    return out
@@ -0,0 +1,246 @@
+"""
+b-bit MinHash signatures (Li and König, WWW 2010).
+
+Only the lowest b bits of each of the k signature values are kept, packed
+64 // b values per uint64 word, so a signature takes ceil(k * b / 64) * 8
+bytes instead of 8k (k=500: 64 bytes at b=1, 1000 bytes at b=16, 4000 bytes
+for the full values).
+
+Two values that are equal always agree on their b bits, and two different
+(random) values agree with probability 2^-b, so the fraction P of agreeing
+b-bit values has expectation J + (1 - J) 2^-b, and
+
+    J = (P - 2^-b) / (1 - 2^-b)
+
+is an unbiased estimate of the Jaccard index (it is not clipped to [0, 1],
+so averaging estimates stays unbiased). Its variance grows as b shrinks: at
+the same storage a b=1 signature holds 64x more values than the full one.
+
+For b <= 4, comparison XORs the packed words, ORs the bits of every b-bit
+field into its lowest bit and counts the set bits (np.bitwise_count, or a
+byte lookup table on NumPy < 2), which gives the number of disagreeing
+values; for b = 8 and 16 the uint8 / uint16 values are compared directly.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .MinHash import MinHashSketch
+
+BITS = (1, 2, 4, 8, 16)
+
+# lowest bit of every b-bit field of a word
+_FIELD_MASKS = {b: np.uint64(sum(1 << i for i in range(0, 64, b))) for b in BITS}
+_POPCOUNT = getattr(np, "bitwise_count", None)
+_BYTE_POPCOUNT = np.array([bin(x).count("1") for x in range(256)], dtype=np.uint8)
+
+# bytes of packed signatures compared at once by BBitSignatures.matches()
+_SCAN_BYTES = 1 << 21
+
+
+def words_per_signature(k: int, b: int) -> int:
+    """Number of uint64 words of one packed signature."""
+    return -(-k * b // 64)
+
+
+def pack_signatures(signatures: np.ndarray, b: int) -> np.ndarray:
+    """
+    Pack the lowest b bits of an (N, k) (or (k,)) array of signature values
+    into (N, words) (or (words,)) uint64; value j goes to bits
+    (j mod 64/b) * b of word j // (64/b), and unused bits are zero.
+    """
+    _check_bits(b)
+    sig = np.asarray(signatures, dtype=np.uint64)
+    single = sig.ndim == 1
+    sig = np.atleast_2d(sig)
+    n, k = sig.shape
+    per_word = 64 // b
+    words = words_per_signature(k, b)
+    vals = np.zeros((n, words * per_word), dtype=np.uint64)
+    vals[:, :k] = sig & np.uint64((1 << b) - 1)
+    vals = vals.reshape(n, words, per_word)
+    packed = np.zeros((n, words), dtype=np.uint64)
+    for t in range(per_word):
+        packed |= vals[:, :, t] << np.uint64(t * b)
+    return packed[0] if single else packed
+
+
+def count_matches(packed: np.ndarray, query: np.ndarray, k: int, b: int) -> np.ndarray:
+    """Number of agreeing b-bit values between every row of `packed` and the packed `query`."""
+    if b >= 8:
+        # whole bytes / uint16 per value: compare them directly (zero padding always agrees)
+        dt = np.uint8 if b == 8 else np.uint16
+        padding = packed.shape[-1] * (64 // b) - k
+        return (packed.view(dt) == query.view(dt)).sum(axis=-1, dtype=np.int64) - padding
+    x = np.bitwise_xor(packed, query)
+    # fold every field onto its lowest bit: the bit is set iff the values differ
+    s = 1
+    while s < b:
+        x |= x >> np.uint64(s)
+        s *= 2
+    if b > 1:
+        x &= _FIELD_MASKS[b]
+    if _POPCOUNT is not None:
+        mismatches = _POPCOUNT(x).sum(axis=-1, dtype=np.int64)
+    else:
+        mismatches = _BYTE_POPCOUNT[x.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+    return k - mismatches
+
+
+def bbit_jaccard(matches, k: int, b: int):
+    """Jaccard estimate (P - 2^-b) / (1 - 2^-b) from the number of agreeing b-bit values."""
+    chance = 2.0 ** -b
+    return (np.asarray(matches) / k - chance) / (1.0 - chance)
+
+
+class BBitSignatures:
+    """
+    Named b-bit signatures of MinHashSketch sketches (same k, seed and mode).
+
+    Parameters
+    ----------
+    b : int
+        Bits kept per value, one of 1, 2, 4, 8, 16.
+
+    Examples
+    --------
+    >>> db = BBitSignatures(b=8)
+    >>> db.add_many(zip(names, sketches))
+    >>> db.jaccard(q)                      # estimates by id
+    >>> db.query(q, threshold=0.5)         # [(name, estimate), ...], best first
+    >>> db.save("db.bbit.npz")
+    """
+
+    def __init__(self, b: int) -> None:
+        _check_bits(b)
+        self.b = b
+        self.k: Optional[int] = None
+        self.seed: Optional[int] = None
+        self.one_permutation: Optional[bool] = None
+
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._packed = np.empty((0, 0), dtype=np.uint64)   # N x words
+        # rows added since the last consolidation
+        self._pending: List[np.ndarray] = []
+
+    # ---------- Building ----------
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def names(self) -> List[str]:
+        """Stored signature names, by id."""
+        return list(self._names)
+
+    def add(self, name: str, sketch: MinHashSketch) -> int:
+        """Store the b-bit signature of `sketch` under `name` and return its id."""
+        self.add_many([(name, sketch)])
+        return self._ids[name]
+
+    def add_many(self, items: Iterable[Tuple[str, MinHashSketch]]) -> None:
+        """Store every (name, sketch) pair; the signatures are packed once for the whole batch."""
+        names: List[str] = []
+        rows: List[np.ndarray] = []
+        for name, sketch in items:
+            if name in self._ids or name in names:
+                raise ValueError(f"duplicate sketch name: {name}")
+            names.append(name)
+            rows.append(self._signature(sketch, adding=True))
+        if not names:
+            return
+        self._pending.append(pack_signatures(np.vstack(rows), self.b))
+        for name in names:
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+
+    def packed(self) -> np.ndarray:
+        """The (N, words) uint64 array of packed signatures; .view(np.uint8) gives the bytes."""
+        self._consolidate()
+        return self._packed
+
+    # ---------- Queries ----------
+
+    def matches(self, query: MinHashSketch) -> np.ndarray:
+        """Number of agreeing b-bit values of `query` and every stored signature (int64, by id)."""
+        q = pack_signatures(self._signature(query), self.b)
+        packed = self.packed()
+        if not len(packed):
+            return np.empty(0, dtype=np.int64)
+        block = max(1, _SCAN_BYTES // packed[0].nbytes)
+        return np.concatenate([count_matches(packed[start:start + block], q, self.k, self.b)
+                               for start in range(0, len(packed), block)])
+
+    def jaccard(self, query: MinHashSketch) -> np.ndarray:
+        """Jaccard estimates of `query` against every stored signature (float64, by id)."""
+        matches = self.matches(query)
+        if not len(matches):
+            return np.empty(0, dtype=np.float64)
+        return bbit_jaccard(matches, self.k, self.b)
+
+    def query(self, query: MinHashSketch, threshold: float = 0.0) -> List[Tuple[str, float]]:
+        """Signatures with estimate >= threshold, as (name, estimate), best first."""
+        scores = self.jaccard(query)
+        ids = np.nonzero(scores >= threshold)[0]
+        scores = scores[ids]
+        order = np.lexsort((ids, -scores))
+        return [(self._names[j], s) for j, s in zip(ids[order].tolist(), scores[order].tolist())]
+
+    # ---------- Persistence ----------
+
+    def save(self, path: str) -> None:
+        """Write the names and packed signatures to one .npz file."""
+        with open(path, "wb") as fh:
+            np.savez(
+                fh,
+                names=np.array(self._names, dtype=str),
+                packed=self.packed(),
+                # b, k, seed, one_permutation (k = 0: empty)
+                params=np.array([self.b, self.k or 0, self.seed or 0, bool(self.one_permutation)],
+                                dtype=np.int64),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> BBitSignatures:
+        """Read signatures written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            b, k, seed, one_permutation = data["params"].tolist()
+            db = cls(b)
+            if k:
+                db.k, db.seed, db.one_permutation = k, seed, bool(one_permutation)
+            db._names = data["names"].tolist()
+            db._packed = data["packed"]
+        db._ids = dict(zip(db._names, range(len(db._names))))
+        return db
+
+    def __repr__(self) -> str:
+        return f"BBitSignatures(b={self.b}, k={self.k}, signatures={len(self)})"
+
+    # ---------- Internals ----------
+
+    def _signature(self, sketch: MinHashSketch, adding: bool = False) -> np.ndarray:
+        if not isinstance(sketch, MinHashSketch):
+            raise ValueError("BBitSignatures only holds MinHashSketch signatures")
+        if self.k is None and adding:
+            self.k, self.seed, self.one_permutation = sketch.k, sketch.seed, sketch.one_permutation
+            self._packed = np.empty((0, words_per_signature(sketch.k, self.b)), dtype=np.uint64)
+        elif self.k is not None and (sketch.k != self.k or sketch.seed != self.seed
+                                     or sketch.one_permutation != self.one_permutation):
+            raise ValueError("all sketches must have the same k, seed and mode")
+        return np.asarray(sketch.signature(), dtype=np.uint64)
+
+    def _consolidate(self) -> None:
+        if self._pending:
+            self._packed = np.vstack([self._packed] + self._pending)
+            self._pending = []
+
+
+def _check_bits(b: int) -> None:
+    if b not in BITS:
+        raise ValueError(f"b must be one of {BITS}")
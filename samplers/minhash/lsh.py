@@ -0,0 +1,204 @@
+"""
+LSH banding index over MinHashSketch signatures.
+
+A signature of k minimums is cut into `bands` bands of `rows` consecutive
+minimums (bands * rows <= k). Two sketches become candidates if at least one
+band is identical, which for two sets of Jaccard index s happens with
+probability 1 - (1 - s^rows)^bands. Candidates are then re-scored exactly
+with the full signatures (the same value as MinHashSketch.jaccard_index).
+One-permutation sketches are indexed by their densified signatures.
+
+Bands are hashed to one uint64 per (sketch, band) with NumPy, and every
+band keeps its (hash, id) pairs sorted, so a query is one searchsorted per
+band. Sketches added since the last query are merged in on the next one.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .MinHash import MinHashSketch
+
+# splitmix64 / FNV-style constants for band hashing
+_PRIME = np.uint64(0x100000001B3)
+_OFFSET = np.uint64(0xCBF29CE484222325)
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+
+
+class MinHashLSH:
+    """
+    Banded LSH index of named MinHashSketch signatures (same k, seed and mode).
+
+    Parameters
+    ----------
+    bands, rows : int
+        Number of bands and minimums per band; bands * rows must not exceed
+        the k of the indexed sketches.
+
+    Examples
+    --------
+    >>> lsh = MinHashLSH(bands=32, rows=4)
+    >>> lsh.add_many(zip(names, sketches))
+    >>> lsh.expected_recall(0.5)
+    0.8844...
+    >>> lsh.query(q, threshold=0.5)        # [(name, jaccard), ...], best first
+    """
+
+    def __init__(self, bands: int, rows: int) -> None:
+        if bands <= 0 or rows <= 0:
+            raise ValueError("bands and rows must be positive")
+        self.bands = bands
+        self.rows = rows
+        self.k: Optional[int] = None
+        self.seed: Optional[int] = None
+        self.one_permutation: Optional[bool] = None
+
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._signatures = np.empty((0, 0), dtype=np.uint64)     # N x k
+        self._band_hashes = np.empty((bands, 0), dtype=np.uint64)  # sorted per band
+        self._band_ids = np.empty((bands, 0), dtype=np.int64)
+        # signatures added since the last consolidation
+        self._pending: List[np.ndarray] = []
+
+    # ---------- Building ----------
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def names(self) -> List[str]:
+        """Indexed sketch names, by id."""
+        return list(self._names)
+
+    def add(self, name: str, sketch: MinHashSketch) -> int:
+        """Index one sketch under `name` and return its id."""
+        self.add_many([(name, sketch)])
+        return self._ids[name]
+
+    def add_many(self, items: Iterable[Tuple[str, MinHashSketch]]) -> None:
+        """Index every (name, sketch) pair; the bands are hashed once for the whole batch."""
+        names: List[str] = []
+        rows: List[np.ndarray] = []
+        for name, sketch in items:
+            if name in self._ids or name in names:
+                raise ValueError(f"duplicate sketch name: {name}")
+            names.append(name)
+            rows.append(self._signature(sketch, adding=True))
+        if not names:
+            return
+        self._pending.append(np.vstack(rows))
+        for name in names:
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+
+    # ---------- Queries ----------
+
+    def expected_recall(self, similarity: float) -> float:
+        """Probability that a sketch of Jaccard index `similarity` to the query is a candidate."""
+        return 1.0 - (1.0 - similarity ** self.rows) ** self.bands
+
+    def threshold(self) -> float:
+        """Approximate Jaccard index where the recall curve is steepest, (1/bands)^(1/rows)."""
+        return (1.0 / self.bands) ** (1.0 / self.rows)
+
+    def candidates(self, query: MinHashSketch) -> np.ndarray:
+        """Ids of the sketches sharing at least one band with `query` (ascending)."""
+        return self._candidates(self._signature(query))
+
+    def scores(self, query: MinHashSketch, ids: np.ndarray) -> np.ndarray:
+        """Exact MinHash Jaccard estimates of `query` against the given ids."""
+        return self._scores(self._signature(query), ids)
+
+    def query(self, query: MinHashSketch, threshold: float = 0.0) -> List[Tuple[str, float]]:
+        """Candidates with Jaccard estimate >= threshold, as (name, score), best first."""
+        sig = self._signature(query)
+        return self._hits(sig, self._candidates(sig), threshold)
+
+    def brute_force(self, query: MinHashSketch, threshold: float = 0.0) -> List[Tuple[str, float]]:
+        """Same as query() but scoring every indexed sketch (no banding)."""
+        return self._hits(self._signature(query), np.arange(len(self)), threshold)
+
+    def __repr__(self) -> str:
+        return f"MinHashLSH(bands={self.bands}, rows={self.rows}, sketches={len(self)})"
+
+    # ---------- Internals ----------
+
+    def _candidates(self, sig: np.ndarray) -> np.ndarray:
+        self._consolidate()
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        qh = _band_hashes(sig[None, :], self.bands, self.rows)[:, 0]
+        found = []
+        for band in range(self.bands):
+            hashes = self._band_hashes[band]
+            lo = np.searchsorted(hashes, qh[band], side="left")
+            hi = np.searchsorted(hashes, qh[band], side="right")
+            if hi > lo:
+                found.append(self._band_ids[band, lo:hi])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def _scores(self, sig: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        self._consolidate()
+        return (self._signatures[ids] == sig).sum(axis=1) / self.k
+
+    def _hits(self, sig: np.ndarray, ids: np.ndarray, threshold: float) -> List[Tuple[str, float]]:
+        if not len(ids):
+            return []
+        scores = self._scores(sig, ids)
+        keep = scores >= threshold
+        ids, scores = ids[keep], scores[keep]
+        order = np.lexsort((ids, -scores))
+        return [(self._names[j], s) for j, s in zip(ids[order].tolist(), scores[order].tolist())]
+
+    def _signature(self, sketch: MinHashSketch, adding: bool = False) -> np.ndarray:
+        if not isinstance(sketch, MinHashSketch):
+            raise ValueError("MinHashLSH only holds MinHashSketch sketches")
+        if self.k is None and adding:
+            if self.bands * self.rows > sketch.k:
+                raise ValueError(f"bands * rows = {self.bands * self.rows} exceeds k = {sketch.k}")
+            self.k, self.seed, self.one_permutation = sketch.k, sketch.seed, sketch.one_permutation
+            self._signatures = np.empty((0, sketch.k), dtype=np.uint64)
+        elif self.k is not None and (sketch.k != self.k or sketch.seed != self.seed
+                                     or sketch.one_permutation != self.one_permutation):
+            raise ValueError("all sketches must have the same k, seed and mode")
+        return np.asarray(sketch.signature(), dtype=np.uint64)
+
+    def _consolidate(self) -> None:
+        """Append the pending signatures and merge their band hashes into the sorted bands."""
+        if not self._pending:
+            return
+        new = np.vstack(self._pending)
+        first_id = len(self._signatures)
+        ids = np.broadcast_to(np.arange(first_id, first_id + len(new), dtype=np.int64),
+                              (self.bands, len(new)))
+        self._signatures = np.vstack([self._signatures, new])
+        hashes = np.hstack([self._band_hashes, _band_hashes(new, self.bands, self.rows)])
+        all_ids = np.hstack([self._band_ids, ids])
+        # new ids are larger than the indexed ones: a stable sort keeps (hash, id) order
+        order = np.argsort(hashes, axis=1, kind="stable")
+        self._band_hashes = np.take_along_axis(hashes, order, axis=1)
+        self._band_ids = np.take_along_axis(all_ids, order, axis=1)
+        self._pending = []
+
+
+def _band_hashes(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """One 64-bit hash per (band, signature): shape (bands, N)."""
+    cells = signatures[:, :bands * rows].reshape(len(signatures), bands, rows)
+    h = np.full((len(signatures), bands), _OFFSET, dtype=np.uint64)
+    for r in range(rows):
+        h = (h ^ cells[:, :, r]) * _PRIME
+    # splitmix64 finalizer
+    h ^= h >> np.uint64(30)
+    h *= _M1
+    h ^= h >> np.uint64(27)
+    h *= _M2
+    h ^= h >> np.uint64(31)
+    return np.ascontiguousarray(h.T)
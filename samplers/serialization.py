@@ -0,0 +1,267 @@
+"""
+Binary on-disk format shared by all samplers.
+
+Layout (little-endian; every section starts at a multiple of 8 bytes):
+
+    header    64 bytes     magic, version, algorithm, flags, k, alpha, scale, w, seed, n_sections
+    table     8 * n        byte length of each section
+    sections               section payloads, each zero-padded to a multiple of 8
+
+Sections are packed uint64 arrays (bucket ids and sizes, h', freq, hash values)
+or an item blob. They are read back as NumPy views of the underlying buffer,
+so loading with mmap=True maps the file instead of copying it.
+"""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"MGSKETCH"
+VERSION = 1
+
+# algorithm codes
+MAXGEOM = 1
+ALPHAMAXGEOM = 2
+FRACMINHASH = 3
+MINHASH = 4
+AFFIRMATIVE = 5
+ALPHAAFFIRMATIVE = 6
+
+ALGORITHM_NAMES = {
+    MAXGEOM: "maxgeom",
+    ALPHAMAXGEOM: "alphamaxgeom",
+    FRACMINHASH: "fracminhash",
+    MINHASH: "minhash",
+    AFFIRMATIVE: "affirmative",
+    ALPHAAFFIRMATIVE: "alphaaffirmative",
+}
+
+# flag bits
+FLAG_ITEMS_STR = 1 << 0      # item side-table holds UTF-8 strings
+FLAG_ITEMS_BYTES = 1 << 1    # item side-table holds bytes
+FLAG_HASH_ONLY = 1 << 2      # keep_items=False
+FLAG_ARRAY_STORAGE = 1 << 3  # MaxGeomSample / FracMinHashSketch storage="array"
+FLAG_THRESHOLD1 = 1 << 4     # affirmative threshold1 is set
+FLAG_THRESHOLD2 = 1 << 5     # affirmative threshold2 is set
+FLAG_ONE_PERMUTATION = 1 << 6  # MinHashSketch one_permutation=True
+
+_HEADER = struct.Struct("<8sHHIQddIIQQ")
+_U64 = np.dtype("<u8")
+
+
+@dataclass
+class SketchHeader:
+    algorithm: int
+    flags: int = 0
+    k: int = 0
+    alpha: float = 0.0
+    scale: float = 0.0
+    w: int = 0
+    seed: int = 0
+
+
+def dumps(header: SketchHeader, sections: Sequence[Any]) -> bytes:
+    """Serialize a header and a list of sections (NumPy arrays or bytes)."""
+    payloads = [s.astype(_U64).tobytes() if isinstance(s, np.ndarray) else bytes(s) for s in sections]
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, header.algorithm, header.flags, header.k, header.alpha,
+                     header.scale, header.w, 0, header.seed, len(payloads)),
+        np.array([len(p) for p in payloads], dtype=_U64).tobytes(),
+    ]
+    for p in payloads:
+        parts.append(p)
+        parts.append(b"\0" * (-len(p) % 8))
+    return b"".join(parts)
+
+
+def loads(buf: Any) -> Tuple[SketchHeader, List[np.ndarray]]:
+    """
+    Parse a serialized sketch from a bytes-like object or uint8 array.
+    Returns the header and the sections as uint8 views of `buf` (no copy).
+    """
+    raw = buf if isinstance(buf, np.ndarray) else np.frombuffer(buf, dtype=np.uint8)
+    if raw.size < _HEADER.size:
+        raise ValueError("buffer too small to hold a sketch")
+    magic, version, algorithm, flags, k, alpha, scale, w, _, seed, n_sections = \
+        _HEADER.unpack(raw[:_HEADER.size].tobytes())
+    if magic != MAGIC:
+        raise ValueError("not a serialized sketch (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"unsupported sketch format version {version}")
+
+    offset = _HEADER.size
+    lengths = raw[offset:offset + 8 * n_sections].view(_U64).tolist()
+    offset += 8 * n_sections
+    sections = []
+    for length in lengths:
+        sections.append(raw[offset:offset + length])
+        offset += length + (-length % 8)
+    if offset > raw.size:
+        raise ValueError("truncated sketch")
+    header = SketchHeader(algorithm=algorithm, flags=flags, k=k, alpha=alpha,
+                          scale=scale, w=w, seed=seed)
+    return header, sections
+
+
+def read(path: str, mmap: bool = False) -> Tuple[SketchHeader, List[np.ndarray]]:
+    """Read a sketch file; with mmap=True the sections are views of a read-only memory map."""
+    if mmap:
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        with open(path, "rb") as fh:
+            raw = np.frombuffer(fh.read(), dtype=np.uint8)
+    return loads(raw)
+
+
+def as_u64(section: np.ndarray) -> np.ndarray:
+    """View a section as a uint64 array."""
+    return section.view(_U64)
+
+
+def pack_items(items: Sequence[Any]) -> Tuple[int, List[Any]]:
+    """
+    Encode an item side-table as (flag, [offsets, blob]).
+    Only str and bytes items can be stored.
+    """
+    if all(isinstance(z, str) for z in items):
+        flag = FLAG_ITEMS_STR
+        encoded = [z.encode("utf-8") for z in items]
+    elif all(isinstance(z, bytes) for z in items):
+        flag = FLAG_ITEMS_BYTES
+        encoded = list(items)
+    else:
+        raise ValueError("only str or bytes items can be serialized; use keep_items=False")
+    offsets = np.zeros(len(encoded) + 1, dtype=_U64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return flag, [offsets, b"".join(encoded)]
+
+
+def unpack_items(flags: int, offsets: np.ndarray, blob: np.ndarray) -> List[Any]:
+    """Inverse of pack_items."""
+    data = blob.tobytes()
+    bounds = as_u64(offsets).tolist()
+    items = [data[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    if flags & FLAG_ITEMS_STR:
+        return [z.decode("utf-8") for z in items]
+    return items
+
+
+def pack_buckets(rows_by_bucket: Dict[int, List[Tuple[Any, int, int]]], keep_items: bool,
+                 store_keys: bool = True) -> Tuple[int, List[Any]]:
+    """
+    Encode MaxGeom-style buckets given as i -> [(item or h, hprime, freq), ...]
+    sorted by h' ascending. Returns (flags, sections):
+      bucket ids, bucket sizes, h', freq, then either the item offsets and
+      blob, or (hash-only, if store_keys) the 64-bit hashes.
+    """
+    ids = sorted(rows_by_bucket)
+    rows = [r for i in ids for r in rows_by_bucket[i]]
+    sections: List[Any] = [
+        np.array(ids, dtype=_U64),
+        np.array([len(rows_by_bucket[i]) for i in ids], dtype=_U64),
+        np.array([r[1] for r in rows], dtype=_U64),
+        np.array([r[2] for r in rows], dtype=_U64),
+    ]
+    if keep_items:
+        flags, extra = pack_items([r[0] for r in rows])
+        return flags, sections + extra
+    if store_keys:
+        sections.append(np.array([r[0] for r in rows], dtype=_U64))
+    return FLAG_HASH_ONLY, sections
+
+
+def unpack_buckets(flags: int, sections: List[np.ndarray]
+                   ) -> Iterator[Tuple[int, np.ndarray, np.ndarray, Optional[List[Any]]]]:
+    """
+    Inverse of pack_buckets: yield (i, hprimes, freqs, items) per bucket.
+    hprimes and freqs are uint64 views of the sections; items is None when
+    neither items nor keys were stored.
+    """
+    ids, counts, hprimes, freqs = (as_u64(s) for s in sections[:4])
+    if not flags & FLAG_HASH_ONLY:
+        items = unpack_items(flags, sections[4], sections[5])
+    elif len(sections) > 4:
+        items = as_u64(sections[4]).tolist()
+    else:
+        items = None
+    start = 0
+    for i, n in zip(ids.tolist(), counts.tolist()):
+        end = start + n
+        yield i, hprimes[start:end], freqs[start:end], None if items is None else items[start:end]
+        start = end
+
+
+class SerializableSketch:
+    """
+    Mixin giving a sampler save/load and to_bytes/from_bytes.
+
+    Subclasses set _ALGORITHM and implement
+      _serial_state(self) -> (SketchHeader, sections)
+      _from_serial(cls, header, sections) -> sketch
+    """
+
+    _ALGORITHM = 0
+
+    def to_bytes(self) -> bytes:
+        """Serialize the sketch to the binary sketch format."""
+        header, sections = self._serial_state()
+        return dumps(header, sections)
+
+    @classmethod
+    def from_bytes(cls, buf: Any):
+        """Rebuild a sketch from to_bytes() output. Arrays are views of `buf` where possible."""
+        header, sections = loads(buf)
+        return cls._from_checked(header, sections)
+
+    def save(self, path: str) -> None:
+        """Write the sketch to `path`."""
+        with open(path, "wb") as fh:
+            fh.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False):
+        """Load a sketch saved with save(); with mmap=True its arrays are backed by the file."""
+        header, sections = read(path, mmap=mmap)
+        return cls._from_checked(header, sections)
+
+    @classmethod
+    def _from_checked(cls, header: SketchHeader, sections: List[np.ndarray]):
+        if header.algorithm != cls._ALGORITHM:
+            raise ValueError(
+                f"file holds a {ALGORITHM_NAMES.get(header.algorithm, header.algorithm)} sketch, "
+                f"not a {ALGORITHM_NAMES[cls._ALGORITHM]} sketch"
+            )
+        return cls._from_serial(header, sections)
+
+
+def _classes():
+    from .maxgeomsampling.MaxGeomSampling import MaxGeomSample
+    from .alphamaxgeomsampling.AlphaMaxGeomSampling import AlphaMaxGeomSample
+    from .fracminhash.FracMinHash import FracMinHashSketch
+    from .minhash.MinHash import MinHashSketch
+    from .affirmativesampling.AffirmativeSampling import AffirmativeSketch
+    from .alphaaffirmativesampling.AlphaAffirmativeSampling import AlphaAffirmativeSketch
+    return {
+        MAXGEOM: MaxGeomSample,
+        ALPHAMAXGEOM: AlphaMaxGeomSample,
+        FRACMINHASH: FracMinHashSketch,
+        MINHASH: MinHashSketch,
+        AFFIRMATIVE: AffirmativeSketch,
+        ALPHAAFFIRMATIVE: AlphaAffirmativeSketch,
+    }
+
+
+def sketch_from_bytes(buf: Any):
+    """Rebuild a sketch of any sampler type from its serialized bytes."""
+    header, sections = loads(buf)
+    return _classes()[header.algorithm]._from_serial(header, sections)
+
+
+def load_sketch(path: str, mmap: bool = False):
+    """Load a sketch of any sampler type from `path`."""
+    header, sections = read(path, mmap=mmap)
+    return _classes()[header.algorithm]._from_serial(header, sections)
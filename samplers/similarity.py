@@ -0,0 +1,532 @@
+"""
+Similarity kernels for MaxGeomSample / AlphaMaxGeomSample sketches.
+
+One pair: comparison_view() caches, per sketch, each bucket's h' in
+descending order with the aligned frequencies, and merge_stats() walks two
+views with a sorted merge. jaccard_index() and cosine_similarity() of the
+samplers use these, so comparing one sketch with many builds its view once;
+containment_stats() does the same for containment_index() and
+weighted_containment().
+
+All vs all: each sketch is converted once into a sorted uint64 array of packed keys
+(1 << (64 - i)) | h', which orders the elements by bucket and by h' within
+a bucket (bucket i occupies [2^(64-i), 2^(65-i))), plus the aligned
+frequencies. One sketch is then compared with a block of others in a single
+vectorized pass: the keys of every pair are sorted together, and ranking
+inside each (pair, bucket) group gives the top-k of the union. Results are
+bit-identical to jaccard_index() and cosine_similarity() of the samplers.
+query_scores() uses the same kernel to screen one query against many
+references by any of these scores.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures as cf
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple, Union
+
+import numpy as np
+
+from hashes.hash_utils import bit_length_many
+
+# elements (over all pairs of a block) sorted together in one kernel call
+_BLOCK_ELEMENTS = 1 << 22
+
+_ONE = np.uint64(1)
+_MAX_CAP = np.iinfo(np.int64).max
+
+_METRICS = ("jaccard", "cosine", "containment", "weighted_containment")
+
+
+class PackedSketch(NamedTuple):
+    """A sketch as sorted packed keys, aligned frequencies and a bucket bitmask."""
+    keys: np.ndarray    # uint64, ascending
+    freqs: np.ndarray   # uint64
+    mask: int           # bit i-1 set when bucket i is non-empty
+
+
+# bucket i -> (h' in descending order, aligned freqs)
+ComparisonView = Dict[int, Tuple[Tuple[int, ...], Tuple[int, ...]]]
+
+
+def comparison_view(sketch: Any) -> ComparisonView:
+    """
+    Frozen per-bucket view of a MaxGeomSample or AlphaMaxGeomSample, built on
+    first use and cached on the sketch until its next update (the samplers
+    reset `_view` whenever their buckets change).
+    """
+    view = sketch._view
+    if view is None:
+        view = {}
+        for i in sketch._buckets:
+            rows = sketch._bucket_rows(i)
+            if rows:
+                view[i] = (tuple(r[1] for r in rows), tuple(r[2] for r in rows))
+        sketch._view = view
+    return view
+
+
+def merge_stats(a: ComparisonView, b: ComparisonView,
+                cap: Callable[[int], int]) -> Tuple[int, int, int, int, int]:
+    """
+    Sorted merge of two views over their common buckets, taking the cap(i)
+    largest distinct h' of the union of bucket i. Returns (intersection,
+    union, dot, norm1, norm2): the sizes of the truncated union and of its
+    elements present in both, and the frequency dot product and squared
+    norms over it.
+    """
+    inter = union = dot = norm1 = norm2 = 0
+    for i, (ha, fa) in a.items():
+        other = b.get(i)
+        if other is None:
+            continue
+        hb, fb = other
+        la, lb = len(ha), len(hb)
+        c = cap(i)
+        p = q = taken = 0
+        while taken < c and (p < la or q < lb):
+            if q == lb or (p < la and ha[p] > hb[q]):
+                norm1 += fa[p] * fa[p]
+                p += 1
+            elif p == la or hb[q] > ha[p]:
+                norm2 += fb[q] * fb[q]
+                q += 1
+            else:
+                inter += 1
+                dot += fa[p] * fb[q]
+                norm1 += fa[p] * fa[p]
+                norm2 += fb[q] * fb[q]
+                p += 1
+                q += 1
+            taken += 1
+        union += taken
+    return inter, union, dot, norm1, norm2
+
+
+def containment_stats(a: ComparisonView, b: ComparisonView,
+                      cap: Callable[[int], int]) -> Tuple[int, int, int, int]:
+    """
+    Sorted merge over all buckets of `a`, taking the cap(i) largest distinct h'
+    of the union of bucket i. Returns (intersection, size1, min_sum, weight1):
+    the number of elements of `a` in the truncated union and how many of them
+    are also in `b`, and over the same elements the sums of min(freq_a,
+    freq_b) and of freq_a.
+    """
+    inter = size1 = min_sum = weight1 = 0
+    empty: Tuple[int, ...] = ()
+    for i, (ha, fa) in a.items():
+        hb, fb = b.get(i, (empty, empty))
+        la, lb = len(ha), len(hb)
+        c = cap(i)
+        p = q = taken = 0
+        # once `a` is exhausted, the rest of the union cannot change the counts
+        while taken < c and p < la:
+            if q == lb or ha[p] > hb[q]:
+                size1 += 1
+                weight1 += fa[p]
+                p += 1
+            elif hb[q] > ha[p]:
+                q += 1
+            else:
+                inter += 1
+                size1 += 1
+                weight1 += fa[p]
+                min_sum += min(fa[p], fb[q])
+                p += 1
+                q += 1
+            taken += 1
+    return inter, size1, min_sum, weight1
+
+
+def pack_sketch(sketch: Any) -> PackedSketch:
+    """Convert a MaxGeomSample or AlphaMaxGeomSample into a PackedSketch."""
+    keys: List[np.ndarray] = []
+    freqs: List[np.ndarray] = []
+    mask = 0
+    for i, (hprimes, fs) in comparison_view(sketch).items():
+        mask |= 1 << (i - 1)
+        keys.append(np.array(hprimes, dtype=np.uint64) | np.uint64(1 << (64 - i)))
+        freqs.append(np.array(fs, dtype=np.uint64))
+    if not keys:
+        return PackedSketch(np.empty(0, np.uint64), np.empty(0, np.uint64), 0)
+    keys_arr = np.concatenate(keys)
+    order = np.argsort(keys_arr, kind="stable")
+    return PackedSketch(keys_arr[order], np.concatenate(freqs)[order], mask)
+
+
+def bucket_capacities(sketch: Any) -> np.ndarray:
+    """Per-bucket sample size (index = bucket): k for MaxGeomSample, _k_sizes for AlphaMaxGeomSample."""
+    if hasattr(sketch, "_k_sizes"):
+        # the sizes of the first buckets can exceed int64; no bucket holds that many elements
+        caps = [min(sketch._k_sizes.get(i, 0), _MAX_CAP) for i in range(65)]
+    else:
+        caps = [sketch.k] * 65
+    return np.array(caps, dtype=np.int64)
+
+
+def check_compatible(sketches: Sequence[Any]) -> None:
+    """Raise ValueError unless all sketches have the same type, k (or alpha), w and seed."""
+    if not sketches:
+        return
+    first = sketches[0]
+    for s in sketches:
+        if type(s) is not type(first):
+            raise ValueError("all sketches must be of the same type")
+        if getattr(s, "k", None) != getattr(first, "k", None) or \
+                getattr(s, "alpha", None) != getattr(first, "alpha", None):
+            raise ValueError("all sketches must have the same k (or alpha)")
+        if s.w != first.w or s.seed != first.seed:
+            raise ValueError("all sketches must have the same w and seed")
+
+
+class PairStats(NamedTuple):
+    """Per-pair counts of one sketch against a block of others (arrays over the block)."""
+    intersection: np.ndarray
+    union: np.ndarray
+    dot: np.ndarray
+    norm1: np.ndarray
+    norm2: np.ndarray
+
+
+class ContainmentStats(NamedTuple):
+    """Per-pair containment counts of one sketch in a block of others (see containment_stats)."""
+    intersection: np.ndarray
+    size1: np.ndarray
+    min_sum: np.ndarray
+    weight1: np.ndarray
+
+
+class _Ranked(NamedTuple):
+    """A PackedSketch with its keys replaced by their ranks in the sorted union of all keys."""
+    ranks: np.ndarray   # int64, ascending
+    freqs: np.ndarray
+    mask: int
+
+
+def _rank_keys(packed: Sequence[PackedSketch]) -> Tuple[List[_Ranked], np.ndarray]:
+    """Rank the keys of all sketches in one universe; also return the bucket of every rank."""
+    universe = np.unique(np.concatenate([p.keys for p in packed]))
+    ranked = [_Ranked(np.searchsorted(universe, p.keys).astype(np.int64), p.freqs, p.mask)
+              for p in packed]
+    return ranked, 65 - bit_length_many(universe)
+
+
+def _union_top(a: _Ranked, others: Sequence[_Ranked], bucket_of: np.ndarray, caps: np.ndarray,
+               self_buckets: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray,
+                                                    np.ndarray]:
+    """
+    Top-cap union of `a` with every sketch of `others`, per bucket, over the
+    buckets common to both (or over all buckets of `a` if self_buckets).
+    Returns (in_a, in_both, freq_a, freq_b, bounds): one entry per element of
+    the truncated unions, grouped by pair; pair j is [bounds[j], bounds[j+1]).
+    """
+    m = len(others)
+    # pair j uses the value range [j*R, (j+1)*R): the copies of `a` form one
+    # ascending run and the others a second one, so the stable sort is a single merge
+    r = len(bucket_of)
+    offsets = np.arange(m, dtype=np.int64) * r
+    na = len(a.ranks)
+    vals = np.concatenate([(a.ranks[None, :] + offsets[:, None]).ravel()]
+                          + [o.ranks + off for o, off in zip(others, offsets.tolist())])
+    freqs = np.concatenate([np.tile(a.freqs, m)] + [o.freqs for o in others])
+
+    # stable: for a key present in both, the entry of `a` comes first
+    order = np.argsort(vals, kind="stable")
+    vals, freqs = vals[order], freqs[order]
+    from_b = order >= na * m
+    n = len(vals)
+    first = np.ones(n, dtype=bool)
+    first[1:] = vals[1:] != vals[:-1]
+    dup_next = np.zeros(n, dtype=bool)
+    dup_next[:-1] = ~first[1:]
+
+    u = np.nonzero(first)[0]
+    u_pair = vals[u] // r
+    u_bucket = bucket_of[vals[u] - u_pair * r]
+
+    # only buckets present in both sketches (or in `a`) count
+    if self_buckets:
+        masks = np.full(m, a.mask, dtype=np.uint64)
+    else:
+        masks = np.array([a.mask & o.mask for o in others], dtype=np.uint64)
+    in_common = ((masks[u_pair] >> (u_bucket - 1).astype(np.uint64)) & _ONE).astype(bool)
+    u, u_pair, u_bucket = u[in_common], u_pair[in_common], u_bucket[in_common]
+
+    # rank from the top inside each (pair, bucket) group; keys ascend, so the top is at the end
+    last = np.ones(len(u), dtype=bool)
+    last[:-1] = (u_pair[1:] != u_pair[:-1]) | (u_bucket[1:] != u_bucket[:-1])
+    last_idx = np.nonzero(last)[0]
+    group = np.cumsum(last) - last
+    rank = last_idx[group] - np.arange(len(u))
+    keep = rank < caps[u_bucket]
+    u, u_pair = u[keep], u_pair[keep]
+
+    in_a = ~from_b[u]
+    in_both = dup_next[u]
+    freq_a = np.where(in_a, freqs[u], np.uint64(0))
+    freq_b = np.where(in_a, np.where(in_both, freqs[np.minimum(u + 1, n - 1)], np.uint64(0)),
+                      freqs[u])
+    bounds = np.searchsorted(u_pair, np.arange(m + 1))
+    return in_a, in_both, freq_a, freq_b, bounds
+
+
+def _pair_stats(a: _Ranked, others: Sequence[_Ranked], bucket_of: np.ndarray,
+                caps: np.ndarray) -> PairStats:
+    """
+    Compare `a` with every sketch of `others` over their common buckets: size of
+    the top-cap union, of its intersection with both sketches, and the dot
+    product and squared norms of the frequencies over that union.
+    """
+    if not others:
+        empty = np.zeros(0, dtype=np.uint64)
+        return PairStats(empty, empty, empty, empty, empty)
+    _, in_both, fa, fb, bounds = _union_top(a, others, bucket_of, caps)
+    return PairStats(
+        intersection=_segment_sums(in_both.astype(np.uint64), bounds),
+        union=np.diff(bounds).astype(np.uint64),
+        dot=_segment_sums(fa * fb, bounds),
+        norm1=_segment_sums(fa * fa, bounds),
+        norm2=_segment_sums(fb * fb, bounds),
+    )
+
+
+def _containment_stats(a: _Ranked, others: Sequence[_Ranked], bucket_of: np.ndarray,
+                       caps: np.ndarray) -> ContainmentStats:
+    """Vectorized containment_stats of `a` in every sketch of `others`."""
+    if not others:
+        empty = np.zeros(0, dtype=np.uint64)
+        return ContainmentStats(empty, empty, empty, empty)
+    in_a, in_both, fa, fb, bounds = _union_top(a, others, bucket_of, caps, self_buckets=True)
+    return ContainmentStats(
+        intersection=_segment_sums(in_both.astype(np.uint64), bounds),
+        size1=_segment_sums(in_a.astype(np.uint64), bounds),
+        min_sum=_segment_sums(np.minimum(fa, fb), bounds),
+        weight1=_segment_sums(fa, bounds),
+    )
+
+
+def jaccard_from_stats(intersection: int, union: int) -> float:
+    """Same conventions as MaxGeomSample.jaccard_index (1.0 when the union is empty)."""
+    if union == 0:
+        return 1.0
+    return intersection / union
+
+
+def cosine_from_stats(dot: int, norm1: int, norm2: int) -> float:
+    """Same conventions as MaxGeomSample.cosine_similarity (0.0 when either norm is 0)."""
+    if norm1 == 0 or norm2 == 0:
+        return 0.0
+    return dot / ((norm1 ** 0.5) * (norm2 ** 0.5))
+
+
+def containment_from_stats(intersection: int, size1: int) -> float:
+    """Same conventions as FracMinHashSketch.containment_index (1.0 when self is empty)."""
+    if size1 == 0:
+        return 1.0
+    return intersection / size1
+
+
+def weighted_containment_from_stats(min_sum: int, weight1: int) -> float:
+    """Weighted containment: sum of min(freq_a, freq_b) / sum of freq_a (1.0 when self is empty)."""
+    if weight1 == 0:
+        return 1.0
+    return min_sum / weight1
+
+
+def query_scores(query: Any, references: Sequence[Any], metric: str = "containment") -> np.ndarray:
+    """
+    Scores of one query sketch against many references, as a float64 array
+    aligned with `references`. metric is "jaccard", "cosine", "containment"
+    (of the query in each reference) or "weighted_containment"; each score
+    equals the corresponding method of the query sketch.
+    """
+    check_compatible([query, *references])
+    return packed_scores(pack_sketch(query), [pack_sketch(s) for s in references],
+                         bucket_capacities(query), metric)
+
+
+def packed_scores(query: PackedSketch, references: Sequence[PackedSketch], caps: np.ndarray,
+                  metric: str = "containment") -> np.ndarray:
+    """query_scores() on sketches already converted with pack_sketch(); caps from bucket_capacities()."""
+    if metric not in _METRICS:
+        raise ValueError(f"metric must be one of {_METRICS}")
+    scores = np.empty(len(references), dtype=np.float64)
+    if not references:
+        return scores
+    ranked, bucket_of = _rank_keys([query, *references])
+    a, refs = ranked[0], ranked[1:]
+    start = 0
+    for stop in _column_blocks(a, refs, 0):
+        block = refs[start:stop]
+        if metric in ("jaccard", "cosine"):
+            stats = _pair_stats(a, block, bucket_of, caps)
+            if metric == "jaccard":
+                vals = [jaccard_from_stats(x, y) for x, y in
+                        zip(stats.intersection.tolist(), stats.union.tolist())]
+            else:
+                vals = [cosine_from_stats(x, y, z) for x, y, z in
+                        zip(stats.dot.tolist(), stats.norm1.tolist(), stats.norm2.tolist())]
+        else:
+            cstats = _containment_stats(a, block, bucket_of, caps)
+            if metric == "containment":
+                vals = [containment_from_stats(x, y) for x, y in
+                        zip(cstats.intersection.tolist(), cstats.size1.tolist())]
+            else:
+                vals = [weighted_containment_from_stats(x, y) for x, y in
+                        zip(cstats.min_sum.tolist(), cstats.weight1.tolist())]
+        scores[start:stop] = vals
+        start = stop
+    return scores
+
+
+def similarity_matrices(sketches: Sequence[Any], n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dense N x N Jaccard and cosine matrices of MaxGeomSample or
+    AlphaMaxGeomSample sketches (all with the same parameters). Row blocks
+    are computed in n_jobs processes.
+    """
+    jac, cos = _empty_matrices(len(sketches))
+    for i, js, stats in _iter_rows(sketches, n_jobs):
+        _fill_row(jac, cos, i, js, stats)
+    return jac, cos
+
+
+def jaccard_matrix(sketches: Sequence[Any], n_jobs: int = 1) -> np.ndarray:
+    """Dense N x N Jaccard matrix (see similarity_matrices)."""
+    return similarity_matrices(sketches, n_jobs)[0]
+
+
+def cosine_matrix(sketches: Sequence[Any], n_jobs: int = 1) -> np.ndarray:
+    """Dense N x N cosine matrix (see similarity_matrices)."""
+    return similarity_matrices(sketches, n_jobs)[1]
+
+
+def write_pairwise_tsv(out: Union[str, TextIO], names: Sequence[str], sketches: Sequence[Any],
+                       n_jobs: int = 1, cosine: bool = False, include_self: bool = False,
+                       return_matrices: bool = False) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream all pairs (i < j) as TSV rows
+        sketch1, sketch2, jaccard_score, intersection, size1, size2, union[, cosine_score]
+    in the format read by scripts/analyze_pw_similarity_scores.py. Rows are
+    written as row blocks finish, so the matrix is never held in memory,
+    unless return_matrices is set: then the Jaccard and cosine matrices of
+    similarity_matrices() are filled from the same pairs and returned.
+    """
+    if len(names) != len(sketches):
+        raise ValueError("names and sketches must have the same length")
+    # before opening `out`, so incompatible sketches do not leave a header-only file
+    check_compatible(sketches)
+    fh = open(out, "w") if isinstance(out, str) else out
+    try:
+        cols = ["sketch1", "sketch2", "jaccard_score", "intersection", "size1", "size2", "union"]
+        if cosine:
+            cols.append("cosine_score")
+        fh.write("\t".join(cols) + "\n")
+        sizes = [len(s) for s in sketches]
+        matrices = _empty_matrices(len(sketches)) if return_matrices else None
+        for i, js, stats in _iter_rows(sketches, n_jobs):
+            if matrices is not None:
+                _fill_row(*matrices, i, js, stats)
+            lines = []
+            for j, inter, union, dot, n1, n2 in zip(js, *(s.tolist() for s in stats)):
+                if j == i and not include_self:
+                    continue
+                row = [names[i], names[j], repr(jaccard_from_stats(inter, union)), str(inter),
+                       str(sizes[i]), str(sizes[j]), str(union)]
+                if cosine:
+                    row.append(repr(cosine_from_stats(dot, n1, n2)))
+                lines.append("\t".join(row))
+            if lines:
+                fh.write("\n".join(lines) + "\n")
+    finally:
+        if isinstance(out, str):
+            fh.close()
+    return matrices
+
+
+# ---------- Internals ----------
+
+def _empty_matrices(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    return np.ones((n, n), dtype=np.float64), np.zeros((n, n), dtype=np.float64)
+
+
+def _fill_row(jac: np.ndarray, cos: np.ndarray, i: int, js: np.ndarray, stats: PairStats) -> None:
+    """Write the scores of pairs (i, j) and (j, i) for every j of a row."""
+    for j, inter, union, dot, n1, n2 in zip(js, *(s.tolist() for s in stats)):
+        jac[i, j] = jac[j, i] = jaccard_from_stats(inter, union)
+        cos[i, j] = cosine_from_stats(dot, n1, n2)
+        cos[j, i] = cosine_from_stats(dot, n2, n1)
+
+
+def _segment_sums(values: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """Exact uint64 sums of values[bounds[j]:bounds[j+1]]."""
+    cs = np.zeros(len(values) + 1, dtype=np.uint64)
+    np.cumsum(values, dtype=np.uint64, out=cs[1:])
+    return cs[bounds[1:]] - cs[bounds[:-1]]
+
+
+class _Job(NamedTuple):
+    ranked: List[_Ranked]
+    bucket_of: np.ndarray
+    caps: np.ndarray
+
+
+# the job of the current worker process, set once by the pool initializer
+_JOB: Optional[_Job] = None
+
+
+def _init_worker(job: _Job) -> None:
+    global _JOB
+    _JOB = job
+
+
+def _rows_worker(rows: List[int]) -> List[Tuple[int, np.ndarray, PairStats]]:
+    return [_row(i, _JOB) for i in rows]
+
+
+def _column_blocks(a: _Ranked, others: Sequence[_Ranked], start: int) -> Iterator[int]:
+    """End positions of consecutive blocks of others[start:], each compared with `a` in one call."""
+    n = len(others)
+    na = len(a.ranks)
+    j = start
+    while j < n:
+        stop, size = j + 1, na + len(others[j].ranks)
+        while stop < n and size + na + len(others[stop].ranks) <= _BLOCK_ELEMENTS:
+            size += na + len(others[stop].ranks)
+            stop += 1
+        yield stop
+        j = stop
+
+
+def _row(i: int, job: _Job) -> Tuple[int, np.ndarray, PairStats]:
+    """Stats of sketch i against sketches i..N-1, in column blocks of bounded size."""
+    ranked = job.ranked
+    parts = []
+    j = i
+    for stop in _column_blocks(ranked[i], ranked, i):
+        parts.append(_pair_stats(ranked[i], ranked[j:stop], job.bucket_of, job.caps))
+        j = stop
+    stats = PairStats(*(np.concatenate(col) for col in zip(*parts)))
+    return i, np.arange(i, len(ranked)), stats
+
+
+def _iter_rows(sketches: Sequence[Any], n_jobs: int) -> Iterator[Tuple[int, np.ndarray, PairStats]]:
+    check_compatible(sketches)
+    n = len(sketches)
+    if n == 0:
+        return
+    ranked, bucket_of = _rank_keys([pack_sketch(s) for s in sketches])
+    job = _Job(ranked, bucket_of, bucket_capacities(sketches[0]))
+    if n_jobs <= 1 or n < 2:
+        for i in range(n):
+            yield _row(i, job)
+        return
+
+    # row i has n - i pairs: cut the rows into blocks of similar work
+    n_blocks = min(n, 4 * n_jobs)
+    work = np.cumsum(np.arange(n, 0, -1))
+    cuts = np.searchsorted(work, np.linspace(0, work[-1], n_blocks + 1)[1:-1])
+    blocks = [b.tolist() for b in np.split(np.arange(n), np.unique(cuts)) if len(b)]
+    with cf.ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                initargs=(job,)) as ex:
+        for rows in ex.map(_rows_worker, blocks):
+            yield from rows
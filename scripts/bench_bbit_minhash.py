@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark b-bit MinHash signatures (samplers.minhash.bbit) against full ones.
+
+Sketches `--n` random sets of `--size` items (in families of `--family` sets
+sharing a growing part of their items) with MinHashSketch(k), stores them as
+BBitSignatures for every b in --bits, and reports for each b:
+
+- bytes per signature
+- one-vs-many comparison throughput, measured on the signatures tiled to
+  `--scan` rows
+- mean error and RMSE of the b-bit estimates against the true Jaccard
+  index, next to those of the full signatures (jaccard_index)
+
+Example
+-------
+python bench_bbit_minhash.py --n 500 --k 500 --scan 1000000
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import time
+
+import numpy as np
+
+from samplers import MinHashSketch
+from samplers.minhash.bbit import BITS, BBitSignatures, bbit_jaccard, count_matches
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="b-bit MinHash accuracy and throughput benchmark.")
+    p.add_argument("--n", type=int, default=500, help="Number of sketched sets (default: 500).")
+    p.add_argument("--size", type=int, default=500, help="Items per set (default: 500).")
+    p.add_argument("--family", type=int, default=10, help="Sets per family of similar sets (default: 10).")
+    p.add_argument("--k", type=int, default=500, help="MinHash permutations (default: 500).")
+    p.add_argument("--bits", type=int, nargs="+", default=list(BITS),
+                   help=f"Values of b to test (default: {' '.join(map(str, BITS))}).")
+    p.add_argument("--scan", type=int, default=1_000_000,
+                   help="Signatures scanned per query in the throughput test (default: 1000000).")
+    p.add_argument("--one_permutation", action="store_true", help="Use one-permutation MinHash.")
+    p.add_argument("--seed", type=int, default=42, help="Random seed (default: 42).")
+    return p.parse_args()
+
+
+def make_sets(n: int, size: int, family: int, rng: random.Random):
+    """Families of sets: member j keeps a fraction j/family of the family core."""
+    sets = []
+    for f in range(0, n, family):
+        core = [f"f{f}_{x}" for x in range(size)]
+        for j in range(min(family, n - f)):
+            keep = size - (j * size) // family
+            own = [f"s{f + j}_{x}" for x in range(size - keep)]
+            sets.append(set(rng.sample(core, keep) + own))
+    return sets
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    sets = make_sets(args.n, args.size, args.family, rng)
+    sketches = []
+    for s in sets:
+        m = MinHashSketch(k=args.k, seed=args.seed, keep_items=False,
+                          one_permutation=args.one_permutation)
+        m.add_many_items(s)
+        sketches.append(m)
+
+    # every set against the first member of its family
+    pairs = [(i, i - i % args.family) for i in range(len(sets)) if i % args.family]
+    truth = np.array([len(sets[i] & sets[j]) / len(sets[i] | sets[j]) for i, j in pairs])
+    full = np.array([sketches[i].jaccard_index(sketches[j]) for i, j in pairs])
+
+    print(f"{len(sets)} sets, k={args.k}, {len(pairs)} pairs, "
+          f"{'one-permutation' if args.one_permutation else 'k-permutation'} MinHash")
+    print(f"{'b':>4} {'bytes/sig':>10} {'signatures/s':>14} {'mean error':>11} {'RMSE':>8}")
+    print(f"{'full':>4} {8 * args.k:>10} {'':>14} {np.mean(full - truth):>11.4f} "
+          f"{np.sqrt(np.mean((full - truth) ** 2)):>8.4f}")
+    for b in args.bits:
+        db = BBitSignatures(b)
+        db.add_many((str(i), m) for i, m in enumerate(sketches))
+        packed = db.packed()
+        est = np.array([db.jaccard(sketches[j])[i] for i, j in pairs])
+
+        reps = -(-args.scan // len(packed))
+        tiled = np.tile(packed, (reps, 1))[:args.scan]
+        q = packed[0]
+        # same 2 MB blocks as BBitSignatures.matches()
+        block = max(1, (1 << 21) // q.nbytes)
+        t0 = time.perf_counter()
+        for start in range(0, len(tiled), block):
+            bbit_jaccard(count_matches(tiled[start:start + block], q, args.k, b), args.k, b)
+        rate = len(tiled) / max(time.perf_counter() - t0, 1e-9)
+        print(f"{b:>4} {q.nbytes:>10} {rate:>14,.0f} {np.mean(est - truth):>11.4f} "
+              f"{np.sqrt(np.mean((est - truth) ** 2)):>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
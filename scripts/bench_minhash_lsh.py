@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark MinHashLSH against brute-force MinHash search.
+
+Builds `--n` random sets of `--size` items in families of `--family` sets
+that share a growing part of their items, sketches them with MinHashSketch,
+indexes them with MinHashLSH(bands, rows), and for `--queries` query sets
+compares the candidates of the LSH with a scan of all sketches:
+
+- query time of the LSH (banding + exact re-scoring) vs. brute force
+  (jaccard_index against every sketch, and a NumPy scan of all signatures)
+- candidates per query
+- observed recall of the sketches with estimate >= --threshold, next to the
+  expected recall 1 - (1 - s^rows)^bands at the threshold
+
+Example
+-------
+python bench_minhash_lsh.py --n 5000 --k 128 --bands 32 --rows 4 --threshold 0.5
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import time
+
+from samplers import MinHashSketch
+from samplers.minhash.lsh import MinHashLSH
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="MinHashLSH vs brute-force benchmark.")
+    p.add_argument("--n", type=int, default=2000, help="Number of indexed sets (default: 2000).")
+    p.add_argument("--size", type=int, default=300, help="Items per set (default: 300).")
+    p.add_argument("--family", type=int, default=10, help="Sets per family of similar sets (default: 10).")
+    p.add_argument("--k", type=int, default=128, help="MinHash permutations (default: 128).")
+    p.add_argument("--bands", type=int, default=32, help="LSH bands (default: 32).")
+    p.add_argument("--rows", type=int, default=4, help="Rows per band (default: 4).")
+    p.add_argument("--threshold", type=float, default=0.5, help="Jaccard threshold (default: 0.5).")
+    p.add_argument("--queries", type=int, default=100, help="Number of queries (default: 100).")
+    p.add_argument("--seed", type=int, default=42, help="Random seed (default: 42).")
+    return p.parse_args()
+
+
+def make_sets(n: int, size: int, family: int, rng: random.Random):
+    """Families of sets: member j keeps a fraction j/family of the family core."""
+    sets = []
+    for f in range(0, n, family):
+        core = [f"f{f}_{x}" for x in range(size)]
+        for j in range(min(family, n - f)):
+            keep = size - (j * size) // family
+            own = [f"s{f + j}_{x}" for x in range(size - keep)]
+            sets.append(rng.sample(core, keep) + own)
+    return sets
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    sets = make_sets(args.n, args.size, args.family, rng)
+
+    t0 = time.perf_counter()
+    sketches = []
+    for s in sets:
+        m = MinHashSketch(k=args.k, seed=args.seed, keep_items=False)
+        m.add_many_items(s)
+        sketches.append(m)
+    t_sketch = time.perf_counter() - t0
+
+    lsh = MinHashLSH(bands=args.bands, rows=args.rows)
+    t0 = time.perf_counter()
+    lsh.add_many((f"set{i}", m) for i, m in enumerate(sketches))
+    lsh.candidates(sketches[0])  # builds the band tables
+    t_index = time.perf_counter() - t0
+
+    queries = rng.sample(range(len(sketches)), min(args.queries, len(sketches)))
+    t_lsh = t_brute = t_scan = 0.0
+    n_cand = found = relevant = 0
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = lsh.query(sketches[q], args.threshold)
+        t_lsh += time.perf_counter() - t0
+        n_cand += len(lsh.candidates(sketches[q]))
+
+        t0 = time.perf_counter()
+        lsh.brute_force(sketches[q], args.threshold)
+        t_scan += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        truth = [(f"set{i}", m) for i, m in enumerate(sketches)
+                 if sketches[q].jaccard_index(m) >= args.threshold]
+        t_brute += time.perf_counter() - t0
+        relevant += len(truth)
+        found += len({name for name, _ in hits} & {name for name, _ in truth})
+
+    nq = len(queries)
+    print(f"{len(sketches)} sets, k={args.k}, bands={args.bands}, rows={args.rows}")
+    print(f"sketching: {t_sketch:.2f}s   indexing: {t_index:.3f}s")
+    print(f"query (LSH):         {1e3 * t_lsh / nq:.3f} ms/query, {n_cand / nq:.1f} candidates/query")
+    print(f"query (brute force): {1e3 * t_brute / nq:.3f} ms/query with jaccard_index, "
+          f"{1e3 * t_scan / nq:.3f} ms/query scanning all signatures with NumPy")
+    print(f"recall at J >= {args.threshold}: observed {found / max(relevant, 1):.4f}, "
+          f"expected >= {lsh.expected_recall(args.threshold):.4f} "
+          f"(LSH threshold ~ {lsh.threshold():.3f})")
+
+
+if __name__ == "__main__":
+    main()
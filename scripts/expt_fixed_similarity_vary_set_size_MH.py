@@ -29,15 +29,15 @@ def synthesize_sets_jaccard(t, n, universal_pool, rng):
 
     return A, B
 
-def estimate_with_minhash(A, B, k, seeds, metric="jaccard"):
+def estimate_with_minhash(A, B, k, seeds, metric="jaccard", one_permutation=False):
     ests = []
     a, b = len(A), len(B)
     sample_sizes_A = []
     sample_sizes_B = []
 
     for s in tqdm(seeds):
-        m1 = MinHashSketch(k=k, seed=s)
-        m2 = MinHashSketch(k=k, seed=s)
+        m1 = MinHashSketch(k=k, seed=s, keep_items=False, one_permutation=one_permutation)
+        m2 = MinHashSketch(k=k, seed=s, keep_items=False, one_permutation=one_permutation)
         m1.add_many_items(A)
         m2.add_many_items(B)
 
@@ -65,7 +65,8 @@ def run_experiment(
     steps,
     growth,
     output_file,
-    global_seed=42
+    global_seed=42,
+    one_permutation=False
 ):
     rng = random.Random(global_seed)
     metric = metric.lower()
@@ -96,7 +97,7 @@ def run_experiment(
         else:
             true_sim = len(A & B) / math.sqrt(len(A) * len(B))
 
-        ests, sample_sizes_A, sample_sizes_B = estimate_with_minhash(A, B, k, seeds, metric)
+        ests, sample_sizes_A, sample_sizes_B = estimate_with_minhash(A, B, k, seeds, metric, one_permutation)
 
         mean_est = sum(ests) / len(ests)
         mean_sample_size_A = sum(sample_sizes_A) / len(sample_sizes_A)
@@ -125,6 +126,8 @@ if __name__ == "__main__":
     parser.add_argument("--out", type=str, default="results/mgs_similarity_experiment",
                         help="Per-seed results csv path.")
     parser.add_argument("--seed", type=int, default=42, help="Global RNG seed for reproducibility.")
+    parser.add_argument("--one_permutation", action="store_true",
+                        help="Use one-permutation MinHash with densification (one hash per item).")
     args = parser.parse_args()
 
     print("Running with the following parameters:")
@@ -140,5 +143,6 @@ if __name__ == "__main__":
         steps=args.steps,
         growth=args.growth,
         output_file=args.out,
-        global_seed=args.seed
+        global_seed=args.seed,
+        one_permutation=args.one_permutation
     )
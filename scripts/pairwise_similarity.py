@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+All-vs-all similarity of MaxGeom / AlphaMaxGeom sketches.
+
+Reads either a SketchCollection directory or a filelist of sketch files
+(written by parallel_sketch_inprocess.py), computes every pairwise Jaccard
+(and cosine) score with samplers.similarity, and writes the TSV read by
+analyze_pw_similarity_scores.py:
+
+    sketch1  sketch2  jaccard_score  intersection  size1  size2  union  [cosine_score]
+
+Examples
+--------
+python pairwise_similarity.py --collection db --out pw_jaccard_maxgeom.csv --threads 8
+python pairwise_similarity.py --filelist sketches.txt --out pairs.tsv --cosine --matrix pairs.npz
+"""
+
+from __future__ import annotations
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from samplers import load_sketch
+from samplers.collection import SketchCollection
+from samplers.similarity import write_pairwise_tsv
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Pairwise Jaccard/cosine scores of MaxGeom sketches.")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--collection", type=Path, help="SketchCollection directory.")
+    src.add_argument("--filelist", type=Path, help="Text file with one sketch path per line.")
+    p.add_argument("--out", type=Path, required=True, help="Output TSV path.")
+    p.add_argument("--threads", type=int, default=1, help="Number of worker processes (default: 1).")
+    p.add_argument("--cosine", action="store_true", help="Also write a cosine_score column.")
+    p.add_argument("--matrix", type=Path, default=None,
+                   help="Also save the dense matrices (names, jaccard, cosine) to this .npz file.")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.collection is not None:
+        db = SketchCollection(str(args.collection))
+        try:
+            db.check_compatible()
+        except ValueError as ve:
+            sys.exit(f"ERROR: {ve}")
+        names = db.names()
+        sketches = [db[name] for name in names]
+    else:
+        with args.filelist.open() as fh:
+            names = [s for s in (line.strip() for line in fh) if s and not s.startswith("#")]
+        sketches = [load_sketch(name, mmap=True) for name in names]
+    if len(sketches) < 2:
+        sys.exit("ERROR: need at least two sketches.")
+
+    try:
+        # with --matrix the matrices are filled from the pairs written to the TSV
+        matrices = write_pairwise_tsv(str(args.out), names, sketches, n_jobs=args.threads,
+                                      cosine=args.cosine, return_matrices=args.matrix is not None)
+        if matrices is not None:
+            jaccard, cosine = matrices
+            np.savez(args.matrix, names=np.array(names), jaccard=jaccard, cosine=cosine)
+    except ValueError as ve:
+        sys.exit(f"ERROR: {ve}")
+    n = len(sketches)
+    print(f"Wrote {n * (n - 1) // 2} pairs of {n} sketches to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
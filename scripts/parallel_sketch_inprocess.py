@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+In-process parallel sketching runner.
+
+Same inputs and outputs as parallel_sketch.py, but the sketches are built by
+the Python samplers in a process pool instead of by the external `sketch`
+binary:
+
+- Reads a filelist (one FASTA/FASTQ path per line, optionally gzipped).
+- Schedules files largest-first so that one big genome does not finish last.
+- Each worker streams the canonical k-mers of its file into a sketch and
+  returns it to the parent in the serialized sketch format (to_bytes()).
+- The parent writes "<name>.<algo>.sketch" (loadable with
+  samplers.load_sketch) or, with --collection, appends to a SketchCollection
+  under <name>, where <name> is the input file name without .gz and its
+  extension. An input whose name is already taken in the run fails.
+- Reports per-file throughput in k-mers/s and MB/s.
+- With --shards N, each uncompressed FASTA is split into N byte ranges
+  (helpers.kmer_utils.shard_ranges) that are sketched by different workers;
+  the partial sketches are combined with merge_from, which is exact, so the
+  result equals the single-process sketch. Gzip/FASTQ inputs stay whole.
+
+With --packed (k <= 32) k-mers are hashed from their 2-bit packed form
+(helpers.kmer_utils.iter_kmer_hash_batches), which is much faster but not
+comparable with sketches of k-mer strings.
+
+Examples
+--------
+# MaxGeom with k=200 using 8 workers
+python parallel_sketch_inprocess.py filelist.txt --algo maxgeom --k 200 --threads 8
+
+# FracMinHash, packed k-mers, all sketches in one collection
+python parallel_sketch_inprocess.py filelist.txt --algo fracminhash --scale 0.001 --packed --collection db
+
+# One large genome split across 16 workers
+python parallel_sketch_inprocess.py filelist.txt --algo maxgeom --k 200 --threads 16 --shards 16
+"""
+
+from __future__ import annotations
+import argparse
+import concurrent.futures as cf
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from samplers import MaxGeomSample, AlphaMaxGeomSample, FracMinHashSketch, MinHashSketch
+from samplers.collection import SketchCollection
+from samplers.serialization import sketch_from_bytes
+from helpers.kmer_utils import sketch_file, sketch_file_packed, shard_ranges
+
+ALGOS = ["maxgeom", "alphamaxgeom", "fracminhash", "minhash"]
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        description="Build Python sketches in parallel for a list of input files."
+    )
+    p.add_argument("filelist", type=Path,
+                   help="Path to a text file containing input filenames (one per line).")
+    p.add_argument("--threads", type=int, default=os.cpu_count() or 1,
+                   help="Number of worker processes (default: number of CPU cores).")
+    p.add_argument("--algo", required=True, choices=ALGOS,
+                   help="Sketching algorithm to use.")
+    # Algo-specific params
+    p.add_argument("--k", type=int,
+                   help="Required if --algo maxgeom. Example: --k 200")
+    p.add_argument("--alpha", type=float,
+                   help="Required if --algo alphamaxgeom. Example: --alpha 0.75")
+    p.add_argument("--scale", type=float,
+                   help="Required if --algo fracminhash. Example: --scale 0.001")
+    p.add_argument("--num_permutations", type=int,
+                   help="Required if --algo minhash. Example: --num_permutations 1000")
+    # Output handling
+    p.add_argument("--outdir", type=Path, default=None,
+                   help="Directory to place output files. Defaults to the same dir as each input.")
+    p.add_argument("--collection", type=Path, default=None,
+                   help="Append all sketches to this SketchCollection directory instead of writing files.")
+    # Sketching options
+    p.add_argument("--kmer", type=int, default=31,
+                   help="k-mer size (default: 31).")
+    p.add_argument("--w", type=int, default=64,
+                   help="Number of top hash bits used for bucketing (default: 64, MaxGeom only).")
+    p.add_argument("--seed", type=int, default=42,
+                   help="Random seed (default: 42).")
+    p.add_argument("--no-canonical", action="store_true",
+                   help="Use k-mers as read instead of canonical k-mers.")
+    p.add_argument("--packed", action="store_true",
+                   help="Hash 2-bit packed k-mers (k <= 32) instead of k-mer strings.")
+    p.add_argument("--shards", type=int, default=1,
+                   help="Split each uncompressed FASTA into this many byte ranges (default: 1). "
+                        "Not supported for --algo minhash.")
+    return p.parse_args()
+
+
+def read_filelist(path: Path) -> List[Path]:
+    if not path.exists():
+        sys.exit(f"ERROR: filelist '{path}' does not exist.")
+    files: List[Path] = []
+    with path.open() as fh:
+        for line in fh:
+            s = line.strip()
+            if not s or s.startswith("#"):
+                continue
+            files.append(Path(s))
+    if not files:
+        sys.exit("ERROR: filelist is empty after filtering comments/blank lines.")
+    return files
+
+
+def sketch_name(input_path: Path) -> str:
+    """Input file name without its .gz suffix and sequence extension (x.fna.gz -> x)."""
+    name = input_path.name
+    if name.endswith(".gz"):
+        name = name[:-len(".gz")]
+    return Path(name).stem or name
+
+
+def output_for(input_path: Path, algo: str, outdir: Optional[Path]) -> Path:
+    base_dir = outdir if outdir is not None else input_path.parent
+    base_dir.mkdir(parents=True, exist_ok=True)
+    return base_dir / f"{sketch_name(input_path)}.{algo}.sketch"
+
+
+def make_sketch(algo: str, params: dict) -> Any:
+    """Create an empty sketch for `algo`; raises ValueError if a required parameter is missing."""
+    if algo == "maxgeom":
+        if params["k"] is None:
+            raise ValueError("Algorithm 'maxgeom' requires --k.")
+        return MaxGeomSample(k=params["k"], w=params["w"], seed=params["seed"],
+                             storage="array", keep_items=False)
+    if algo == "alphamaxgeom":
+        if params["alpha"] is None:
+            raise ValueError("Algorithm 'alphamaxgeom' requires --alpha.")
+        return AlphaMaxGeomSample(alpha=params["alpha"], w=params["w"], seed=params["seed"],
+                                  keep_items=False)
+    if algo == "fracminhash":
+        if params["scale"] is None:
+            raise ValueError("Algorithm 'fracminhash' requires --scale.")
+        return FracMinHashSketch(scale=params["scale"], seed=params["seed"], storage="array")
+    if algo == "minhash":
+        if params["num_permutations"] is None:
+            raise ValueError("Algorithm 'minhash' requires --num_permutations.")
+        return MinHashSketch(k=params["num_permutations"], seed=params["seed"], keep_items=False)
+    raise ValueError(f"Unknown algorithm '{algo}'.")
+
+
+def sketch_one(path: str, algo: str, params: dict, start: int = 0,
+               end: Optional[int] = None) -> Tuple[str, bytes, int, float]:
+    """
+    Worker: sketch one file, or its byte range [start, end), returning
+    (path, serialized sketch, number of k-mers, seconds).
+    """
+    t0 = time.perf_counter()
+    sketch = make_sketch(algo, params)
+    canonical = not params["no_canonical"]
+    sketcher = sketch_file_packed if params["packed"] else sketch_file
+    n_kmers = sketcher(sketch, path, params["kmer"], canonical=canonical, start=start, end=end)
+    blob = sketch.to_bytes()
+    return path, blob, n_kmers, time.perf_counter() - t0
+
+
+def report(path: Path, n_kmers: int, seconds: float, dest: str) -> None:
+    mb = path.stat().st_size / 1e6
+    seconds = max(seconds, 1e-9)
+    print(f"[OK]   {path} -> {dest}  {n_kmers} k-mers in {seconds:.2f}s "
+          f"({n_kmers / seconds:,.0f} k-mers/s, {mb / seconds:.2f} MB/s)")
+
+
+def main() -> None:
+    args = parse_args()
+    params = {
+        "k": args.k, "alpha": args.alpha, "scale": args.scale,
+        "num_permutations": args.num_permutations, "w": args.w, "seed": args.seed,
+        "kmer": args.kmer, "no_canonical": args.no_canonical, "packed": args.packed,
+    }
+    try:
+        make_sketch(args.algo, params)
+    except ValueError as ve:
+        sys.exit(f"ERROR: {ve}")
+    if args.packed and args.algo == "minhash":
+        sys.exit("ERROR: --packed is not supported for --algo minhash.")
+    if args.packed and args.kmer > 32:
+        sys.exit("ERROR: --packed requires --kmer <= 32.")
+    if args.shards > 1 and args.algo == "minhash":
+        sys.exit("ERROR: --shards is not supported for --algo minhash.")
+
+    inputs = []
+    for f in read_filelist(args.filelist):
+        if not f.exists():
+            print(f"WARNING: input not found, skipping: {f}", file=sys.stderr)
+            continue
+        inputs.append(f)
+    if not inputs:
+        sys.exit("ERROR: no valid inputs to process after checks.")
+
+    # one job per shard (a whole file unless --shards), largest first so the longest jobs start early
+    jobs: List[Tuple[Path, int, Optional[int]]] = []
+    for f in inputs:
+        jobs.extend((f, start, end) for start, end in shard_ranges(str(f), args.shards))
+    size = lambda job: (job[2] if job[2] is not None else job[0].stat().st_size) - job[1]
+    jobs.sort(key=size, reverse=True)
+    n_shards = {f: sum(1 for job in jobs if job[0] == f) for f in inputs}
+
+    collection = SketchCollection(str(args.collection), mode="a") if args.collection else None
+
+    written = set()
+
+    def store(f: Path, blob: bytes) -> str:
+        """Write one sketch; raises ValueError if its name is already taken."""
+        if collection is not None:
+            name = sketch_name(f)
+            collection.add_bytes(name, blob)
+            return f"{args.collection}:{name}"
+        out = output_for(f, args.algo, args.outdir)
+        if out in written:
+            raise ValueError(f"output {out} was already written for another input")
+        written.add(out)
+        out.write_bytes(blob)
+        return str(out)
+
+    # partial results per file: [merged sketch, shards done, k-mers]
+    partial: Dict[Path, list] = {}
+    failed = set()
+    total_kmers = 0
+
+    def collect(f: Path, blob: bytes, n_kmers: int, seconds: float) -> None:
+        nonlocal total_kmers
+        total_kmers += n_kmers
+        if n_shards[f] == 1:
+            try:
+                report(f, n_kmers, seconds, store(f, blob))
+            except ValueError as ve:
+                fail(f, str(ve))
+            return
+        if f in failed:
+            return
+        state = partial.setdefault(f, [None, 0, 0])
+        if state[0] is None:
+            state[0] = sketch_from_bytes(blob)
+        else:
+            state[0].merge_from(sketch_from_bytes(blob))
+        state[1] += 1
+        state[2] += n_kmers
+        if state[1] == n_shards[f]:
+            del partial[f]
+            try:
+                dest = store(f, state[0].to_bytes())
+            except ValueError as ve:
+                fail(f, str(ve))
+                return
+            # throughput of a sharded file: k-mers per second of wall time since the start
+            report(f, state[2], time.perf_counter() - wall, dest)
+
+    def fail(f: Path, msg: str) -> None:
+        if f not in failed:
+            failed.add(f)
+            partial.pop(f, None)
+            print(f"[FAIL] {f} : {msg}", file=sys.stderr)
+
+    wall = time.perf_counter()
+    print(f"Sketching {len(inputs)} files ({len(jobs)} jobs) with {args.threads} workers "
+          f"(algo={args.algo})...")
+    if args.threads == 1:
+        for f, start, end in jobs:
+            try:
+                _, blob, n_kmers, seconds = sketch_one(str(f), args.algo, params, start, end)
+            except Exception as e:
+                fail(f, str(e))
+                continue
+            collect(f, blob, n_kmers, seconds)
+    else:
+        with cf.ProcessPoolExecutor(max_workers=args.threads) as ex:
+            future_to_file = {ex.submit(sketch_one, str(f), args.algo, params, start, end): f
+                              for f, start, end in jobs}
+            for fut in cf.as_completed(future_to_file):
+                f = future_to_file[fut]
+                try:
+                    _, blob, n_kmers, seconds = fut.result()
+                except Exception as e:
+                    fail(f, f"crashed with exception: {e}")
+                    continue
+                collect(f, blob, n_kmers, seconds)
+    failures = len(failed)
+
+    wall = max(time.perf_counter() - wall, 1e-9)
+    print(f"Total: {total_kmers} k-mers in {wall:.2f}s ({total_kmers / wall:,.0f} k-mers/s)")
+    if failures:
+        sys.exit(f"Completed with {failures} failure(s).")
+    else:
+        print("All jobs completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from samplers import AlphaMaxGeomSample
+
+
+def _stream(n, seed=0):
+    rng = random.Random(seed)
+    return [f"item{rng.randrange(n)}" for _ in range(n)]
+
+
+def test_merge_equals_concatenated_stream():
+    left, right = _stream(4000, seed=1), _stream(4000, seed=2)
+    for keep_items in (True, False):
+        full = AlphaMaxGeomSample(alpha=0.5, w=8, keep_items=keep_items)
+        full.add_many_items(left + right)
+        a = AlphaMaxGeomSample(alpha=0.5, w=8, keep_items=keep_items)
+        b = AlphaMaxGeomSample(alpha=0.5, w=8, keep_items=keep_items)
+        a.add_many_items(left)
+        b.add_many_items(right)
+        for merged in (a.union(b), b.union(a)):
+            assert merged == full
+            for rows in merged.sample().values():
+                assert len({hprime for _, hprime, _ in rows}) == len(rows)
+
+
+def test_repr_names_the_class():
+    assert repr(AlphaMaxGeomSample(alpha=0.5)).startswith("AlphaMaxGeomSample(")
+
+
+def test_merge_with_empty_sample_and_mismatched_parameters():
+    a = AlphaMaxGeomSample(alpha=0.5, w=8)
+    a.add_many_items(_stream(2000, seed=3))
+    empty = AlphaMaxGeomSample(alpha=0.5, w=8)
+    assert a.union(empty) == a
+    assert empty.union(a) == a
+    for other in (AlphaMaxGeomSample(alpha=0.6, w=8), AlphaMaxGeomSample(alpha=0.5, w=16),
+                  AlphaMaxGeomSample(alpha=0.5, w=8, seed=1)):
+        with pytest.raises(ValueError):
+            a.merge_from(other)
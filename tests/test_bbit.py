@@ -0,0 +1,113 @@
+import random
+
+import numpy as np
+import pytest
+
+from samplers import MinHashSketch
+from samplers.minhash import bbit
+from samplers.minhash.bbit import BITS, BBitSignatures, bbit_jaccard, count_matches, pack_signatures
+
+
+def _values(rows, k, seed=0):
+    rng = np.random.default_rng(seed)
+    sig = rng.integers(0, 1 << 61, size=(rows, k), dtype=np.uint64)
+    # make a share of the values agree with row 0 on all bits
+    same = rng.random((rows, k)) < 0.4
+    return np.where(same, sig[0], sig)
+
+
+def _reference_matches(sig, q, b):
+    mask = (1 << b) - 1
+    return [sum((int(x) & mask) == (int(y) & mask) for x, y in zip(row, q)) for row in sig]
+
+
+@pytest.mark.parametrize("b", BITS)
+@pytest.mark.parametrize("k", [1, 37, 64, 500])
+def test_packing_and_counting_match_a_per_value_reference(b, k):
+    sig = _values(20, k, seed=k)
+    packed = pack_signatures(sig, b)
+    assert packed.shape == (20, bbit.words_per_signature(k, b))
+    per_word = 64 // b
+    for j in range(k):
+        field = (packed[:, j // per_word] >> np.uint64((j % per_word) * b)) & np.uint64((1 << b) - 1)
+        assert field.tolist() == (sig[:, j] & np.uint64((1 << b) - 1)).tolist()
+    assert (pack_signatures(sig[3], b) == packed[3]).all()
+    expected = _reference_matches(sig, sig[0], b)
+    assert count_matches(packed, packed[0], k, b).tolist() == expected
+
+
+@pytest.mark.parametrize("b", [1, 2, 4])
+def test_counting_without_bitwise_count(b, monkeypatch):
+    monkeypatch.setattr(bbit, "_POPCOUNT", None)
+    sig = _values(10, 100)
+    packed = pack_signatures(sig, b)
+    assert count_matches(packed, packed[0], 100, b).tolist() == _reference_matches(sig, sig[0], b)
+
+
+def test_estimate_formula():
+    assert bbit_jaccard(100, 100, 1) == 1.0
+    assert bbit_jaccard(50, 100, 1) == 0.0
+    assert bbit_jaccard(np.array([25, 100]), 100, 2).tolist() == [0.0, 1.0]
+    assert bbit_jaccard(10, 100, 1) < 0            # not clipped
+
+
+def _sketches(n=30, k=200, one_permutation=False):
+    rng = random.Random(1)
+    out = []
+    for j in range(n):
+        keep = 400 - j * 10
+        items = rng.sample([f"c{x}" for x in range(400)], keep) + [f"o{j}_{x}" for x in range(400 - keep)]
+        m = MinHashSketch(k=k, seed=4, keep_items=False, one_permutation=one_permutation)
+        m.add_many_items(items)
+        out.append(m)
+    return out
+
+
+@pytest.mark.parametrize("b", BITS)
+@pytest.mark.parametrize("one_permutation", [False, True])
+def test_signature_store(b, one_permutation, monkeypatch, tmp_path):
+    monkeypatch.setattr(bbit, "_SCAN_BYTES", 64)          # several scan blocks
+    sketches = _sketches(one_permutation=one_permutation)
+    db = BBitSignatures(b)
+    db.add_many((f"s{j}", m) for j, m in enumerate(sketches[:10]))
+    db.add_many((f"s{j}", m) for j, m in enumerate(sketches[10:], start=10))
+    q = sketches[2]
+    sig = np.vstack([np.asarray(m.signature(), dtype=np.uint64) for m in sketches])
+    expected = _reference_matches(sig, np.asarray(q.signature(), dtype=np.uint64), b)
+    assert db.matches(q).tolist() == expected
+    assert db.jaccard(q).tolist() == bbit_jaccard(np.array(expected), 200, b).tolist()
+    assert (db.packed()[5].view(np.uint8) == sketches[5].bbit_signature(b)).all()
+
+    hits = db.query(q, threshold=0.5)
+    assert hits[0] == ("s2", 1.0)
+    assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+    assert {nm for nm, _ in hits} == {f"s{j}" for j, s in enumerate(db.jaccard(q)) if s >= 0.5}
+
+    path = str(tmp_path / "db.bbit.npz")
+    db.save(path)
+    loaded = BBitSignatures.load(path)
+    assert (loaded.b, loaded.k, loaded.seed, loaded.one_permutation) == (b, 200, 4, one_permutation)
+    assert loaded.names() == db.names()
+    assert loaded.query(q, 0.5) == hits
+
+
+def test_empty_store_and_invalid_input(tmp_path):
+    with pytest.raises(ValueError):
+        BBitSignatures(3)
+    with pytest.raises(ValueError):
+        pack_signatures(np.zeros(4, dtype=np.uint64), 32)
+    m = _sketches(n=1)[0]
+    db = BBitSignatures(4)
+    assert db.query(m) == [] and len(db.jaccard(m)) == 0
+    db.save(str(tmp_path / "empty.npz"))
+    assert len(BBitSignatures.load(str(tmp_path / "empty.npz"))) == 0
+    db.add("a", m)
+    with pytest.raises(ValueError):
+        db.add("a", m)
+    for other in (MinHashSketch(k=100, seed=4), MinHashSketch(k=200, seed=5),
+                  MinHashSketch(k=200, seed=4, one_permutation=True)):
+        other.add_item("x")
+        with pytest.raises(ValueError):
+            db.add("b", other)
+        with pytest.raises(ValueError):
+            db.query(other)
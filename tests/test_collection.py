@@ -0,0 +1,90 @@
+import pytest
+
+from samplers import FracMinHashSketch, MinHashSketch
+from samplers.collection import SketchCollection
+
+
+def _minhash(items, one_permutation=False):
+    m = MinHashSketch(k=32, seed=1, keep_items=False, one_permutation=one_permutation)
+    m.add_many_items(items)
+    return m
+
+
+def test_one_permutation_mode_is_part_of_params(tmp_path):
+    items = [f"x{i}" for i in range(200)]
+    with SketchCollection(str(tmp_path / "db"), mode="w") as db:
+        db.add("k", _minhash(items))
+        db.add("k2", _minhash(items[:100]))
+        db.add("oph", _minhash(items, one_permutation=True))
+    db = SketchCollection(str(tmp_path / "db"))
+    assert db.info("k").mode == "k_permutation"
+    assert db.info("oph").mode == "one_permutation"
+    assert db.compatible("k", "k2")
+    assert not db.compatible("k", "oph")
+    with pytest.raises(ValueError):
+        db.check_compatible()
+
+
+def test_storage_is_recorded_but_does_not_affect_params(tmp_path):
+    items = [f"x{i}" for i in range(500)]
+    with SketchCollection(str(tmp_path / "db"), mode="w") as db:
+        for storage in ("set", "array"):
+            s = FracMinHashSketch(scale=4, seed=1, storage=storage)
+            s.add_many_items(items)
+            db.add(storage, s)
+    db = SketchCollection(str(tmp_path / "db"))
+    assert [r.storage for r in db.records()] == ["set", "array"]
+    assert db.compatible("set", "array")
+    assert db["set"] == db["array"]
+
+
+def test_add_reopen_and_load(tmp_path):
+    path = str(tmp_path / "db")
+    sketches = {}
+    with SketchCollection(path, mode="w") as db:
+        for j in range(5):
+            s = FracMinHashSketch(scale=2, seed=1, storage="array")
+            s.add_many_items([f"{j}_{i}" for i in range(100 * (j + 1))])
+            sketches[f"s{j}"] = s
+            rec = db.add(f"s{j}", s)
+            assert rec.offset % 8 == 0
+            assert rec.size == s.sample_size()
+    db = SketchCollection(path)
+    assert db.names() == list(sketches)
+    assert len(db) == 5 and "s3" in db and "nope" not in db
+    for name, s in db.items():
+        assert s == sketches[name]
+    assert db[2] == sketches["s2"]
+    assert bytes(db.raw("s1")) == sketches["s1"].to_bytes()
+
+
+def test_append_mode_and_add_file(tmp_path):
+    path = str(tmp_path / "db")
+    first = _minhash(["a", "b", "c"])
+    with SketchCollection(path, mode="a") as db:
+        db.add("first", first)
+    second = _minhash(["c", "d"])
+    sketch_path = str(tmp_path / "GCF_1.minhash.sketch")
+    second.save(sketch_path)
+    with SketchCollection(path, mode="a") as db:
+        assert db.add_file(sketch_path).name == "GCF_1"
+    db = SketchCollection(path)
+    assert db.names() == ["first", "GCF_1"]
+    assert db["first"] == first and db["GCF_1"] == second
+
+
+def test_invalid_adds_are_rejected(tmp_path):
+    path = str(tmp_path / "db")
+    with SketchCollection(path, mode="w") as db:
+        db.add("a", _minhash(["x"]))
+        with pytest.raises(ValueError):
+            db.add("a", _minhash(["y"]))
+        with pytest.raises(ValueError):
+            db.add("tab\tname", _minhash(["y"]))
+    db = SketchCollection(path)
+    with pytest.raises(ValueError):
+        db.add("b", _minhash(["y"]))
+    with pytest.raises(KeyError):
+        db.info("missing")
+    # a rejected add leaves the collection as it was
+    assert db.names() == ["a"]
@@ -0,0 +1,72 @@
+import heapq
+import random
+
+import pytest
+
+from samplers import AlphaMaxGeomSample, MaxGeomSample
+from samplers.similarity import comparison_view
+
+
+def _stream(n, distinct, seed=0):
+    rng = random.Random(seed)
+    return [f"item{rng.randrange(distinct)}" for _ in range(n)]
+
+
+def _reference(a, b, cap):
+    """The Jaccard index and cosine similarity as computed before the comparison view."""
+    sa, sb = a.sample(), b.sample()
+    inter = union = dot = norm1 = norm2 = 0
+    for i in set(sa) & set(sb):
+        fa = {hp: f for _, hp, f in sa[i]}
+        fb = {hp: f for _, hp, f in sb[i]}
+        top = heapq.nlargest(cap(i), set(fa) | set(fb))
+        union += len(top)
+        inter += len(set(fa) & set(fb) & set(top))
+        for hp in top:
+            dot += fa.get(hp, 0) * fb.get(hp, 0)
+            norm1 += fa.get(hp, 0) ** 2
+            norm2 += fb.get(hp, 0) ** 2
+    jaccard = inter / union if union else 1.0
+    cosine = dot / ((norm1 ** 0.5) * (norm2 ** 0.5)) if norm1 and norm2 else 0.0
+    return jaccard, cosine
+
+
+MAKERS = {
+    "maxgeom": (lambda: MaxGeomSample(k=12, w=16), lambda s: lambda i: s.k),
+    "maxgeom-array": (lambda: MaxGeomSample(k=12, w=16, storage="array"), lambda s: lambda i: s.k),
+    "alphamaxgeom": (lambda: AlphaMaxGeomSample(alpha=0.45, w=16), lambda s: lambda i: s._k_sizes[i]),
+}
+
+
+@pytest.mark.parametrize("name", sorted(MAKERS))
+def test_scores_match_the_reference(name):
+    make, cap = MAKERS[name]
+    sketches = []
+    for j in range(5):
+        s = make()
+        s.add_many_items(_stream(3000, 1000 + 300 * j, seed=j))
+        sketches.append(s)
+    sketches.append(make())
+    for a in sketches:
+        for b in sketches:
+            assert (a.jaccard_index(b), a.cosine_similarity(b)) == _reference(a, b, cap(a))
+
+
+def _fresh_view(s):
+    return {i: (tuple(r[1] for r in rows), tuple(r[2] for r in rows))
+            for i, rows in s.sample().items() if rows}
+
+
+def test_view_is_cached_and_follows_updates():
+    a, b = MaxGeomSample(k=12, w=16), MaxGeomSample(k=12, w=16)
+    a.add_many_items(_stream(2000, 800, seed=1))
+    b.add_many_items(_stream(2000, 800, seed=2))
+    view = comparison_view(a)
+    a.jaccard_index(b)
+    assert comparison_view(a) is view
+    updates = [lambda: a.add_item("new"), lambda: a.add_many_items(_stream(500, 5000, seed=3)),
+               lambda: a.add_hashes([(1 << 63) | 12345, 1 << 60]), lambda: a.merge_from(b)]
+    for update in updates:
+        update()
+        assert comparison_view(a) == _fresh_view(a)
+        assert (a.jaccard_index(b), a.cosine_similarity(b)) == _reference(a, b, lambda i: a.k)
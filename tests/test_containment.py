@@ -0,0 +1,82 @@
+import heapq
+import random
+
+import numpy as np
+import pytest
+
+from samplers import AlphaMaxGeomSample, MaxGeomSample
+from samplers.similarity import query_scores
+
+
+def _stream(n, distinct, seed=0, prefix="item"):
+    rng = random.Random(seed)
+    return [f"{prefix}{rng.randrange(distinct)}" for _ in range(n)]
+
+
+def _reference(a, b, cap):
+    """Containment and weighted containment of a in b, from the samples."""
+    sa, sb = a.sample(), b.sample()
+    inter = size1 = min_sum = weight1 = 0
+    for i, rows in sa.items():
+        fa = {hp: f for _, hp, f in rows}
+        fb = {hp: f for _, hp, f in sb.get(i, [])}
+        for hp in heapq.nlargest(cap(i), set(fa) | set(fb)):
+            if hp in fa:
+                size1 += 1
+                weight1 += fa[hp]
+                if hp in fb:
+                    inter += 1
+                    min_sum += min(fa[hp], fb[hp])
+    return (inter / size1 if size1 else 1.0), (min_sum / weight1 if weight1 else 1.0)
+
+
+MAKERS = {
+    "maxgeom": (lambda: MaxGeomSample(k=12, w=16), lambda s: lambda i: s.k),
+    "maxgeom-array": (lambda: MaxGeomSample(k=12, w=16, storage="array", keep_items=False),
+                      lambda s: lambda i: s.k),
+    "alphamaxgeom": (lambda: AlphaMaxGeomSample(alpha=0.45, w=16), lambda s: lambda i: s._k_sizes[i]),
+}
+
+
+def _sketches(make):
+    sketches = []
+    for j in range(5):
+        s = make()
+        s.add_many_items(_stream(3000, 1000 + 400 * j, seed=j))
+        sketches.append(s)
+    sketches.append(make())
+    return sketches
+
+
+@pytest.mark.parametrize("name", sorted(MAKERS))
+def test_containment_matches_the_reference(name):
+    make, cap = MAKERS[name]
+    sketches = _sketches(make)
+    for a in sketches:
+        for b in sketches:
+            assert (a.containment_index(b), a.weighted_containment(b)) == _reference(a, b, cap(a))
+
+
+@pytest.mark.parametrize("name", sorted(MAKERS))
+def test_query_scores_equal_the_methods(name):
+    sketches = _sketches(MAKERS[name][0])
+    q = sketches[1]
+    for metric, method in (("jaccard", q.jaccard_index), ("cosine", q.cosine_similarity),
+                           ("containment", q.containment_index),
+                           ("weighted_containment", q.weighted_containment)):
+        assert np.array_equal(query_scores(q, sketches, metric), [method(s) for s in sketches])
+    with pytest.raises(ValueError):
+        query_scores(q, sketches, "overlap")
+
+
+@pytest.mark.parametrize("name", sorted(MAKERS))
+def test_a_subset_is_fully_contained(name):
+    make = MAKERS[name][0]
+    small, big = make(), make()
+    items = _stream(4000, 3000, seed=7)
+    small.add_many_items(items[:1000])
+    big.add_many_items(items + _stream(4000, 3000, seed=8, prefix="extra"))
+    assert small.containment_index(big) == 1.0
+    assert small.containment_index(small) == 1.0
+    assert small.weighted_containment(small) == 1.0
+    assert big.containment_index(small) < 1.0
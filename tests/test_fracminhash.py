@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from samplers import FracMinHashSketch
+
+ITEMS = [f"item{x}" for x in range(20000)]
+
+
+def _sketch(items, storage, scale=0.1, seed=42):
+    s = FracMinHashSketch(scale=scale, seed=seed, storage=storage)
+    for x in items:
+        s.add_item(x)
+    return s
+
+
+def test_array_storage_keeps_the_same_hashes_as_the_set():
+    as_set = _sketch(ITEMS + ITEMS[:5000], "set")
+    as_array = _sketch(ITEMS + ITEMS[:5000], "array")
+    assert as_array.hashes is None
+    assert as_array.get_hashes() == as_set.hashes
+    assert as_array.hash_array().tolist() == sorted(as_set.hashes)
+    assert len(as_array) == len(as_set) and as_array == as_set
+    with pytest.raises(ValueError):
+        as_array.hash_array()[0] = 0
+
+
+def test_updates_after_a_query_are_kept():
+    s = _sketch(ITEMS[:1000], "array")
+    n = len(s)
+    s.add_item(ITEMS[0])
+    assert len(s) == n
+    for x in ITEMS[1000:]:
+        s.add_item(x)
+    assert s == _sketch(ITEMS, "set")
+
+
+@pytest.mark.parametrize("storages", [("array", "array"), ("array", "set"), ("set", "array")])
+def test_similarities_do_not_depend_on_the_storage(storages):
+    pairs = [(ITEMS[:8000], ITEMS[4000:]), (ITEMS[:100], ITEMS), ([], ITEMS[:50]), (ITEMS[:10], ITEMS[10:20])]
+    for a_items, b_items in pairs:
+        ref_a, ref_b = _sketch(a_items, "set"), _sketch(b_items, "set")
+        a, b = _sketch(a_items, storages[0]), _sketch(b_items, storages[1])
+        assert a.jaccard_index(b) == ref_a.jaccard_index(ref_b)
+        assert a.containment_index(b) == ref_a.containment_index(ref_b)
+        assert b.containment_index(a) == ref_b.containment_index(ref_a)
+        assert a.cosine_similarity(b) == ref_a.cosine_similarity(ref_b)
+
+
+@pytest.mark.parametrize("storages", [("array", "array"), ("array", "set"), ("set", "array")])
+def test_merges_do_not_depend_on_the_storage(storages):
+    a, b = _sketch(ITEMS[:12000], storages[0]), _sketch(ITEMS[8000:], storages[1])
+    expected = _sketch(ITEMS, "set")
+    union = a.union(b)
+    assert union.storage == storages[0] and union == expected
+    a.merge_from(b)
+    assert a == expected
+    with pytest.raises(ValueError):
+        a.merge_from(FracMinHashSketch(scale=0.2, storage=storages[1]))
+
+
+def test_loaded_array_sketch_copies_before_updating(tmp_path):
+    s = _sketch(ITEMS[:10000], "array")
+    path = str(tmp_path / "s.sketch")
+    s.save(path)
+    loaded = FracMinHashSketch.load(path, mmap=True)
+    assert loaded.storage == "array" and loaded == s
+    for x in ITEMS[10000:]:
+        loaded.add_item(x)
+    assert loaded == _sketch(ITEMS, "set")
+    assert FracMinHashSketch.load(path) == s
+
+
+def test_unknown_storage_is_rejected():
+    with pytest.raises(ValueError):
+        FracMinHashSketch(scale=0.1, storage="list")
+
+
+@pytest.mark.parametrize("storage", ["set", "array"])
+@pytest.mark.parametrize("scale", [0.0, 0.01, 0.5, 1.0, 4.0])
+def test_batch_update_matches_add_item(storage, scale):
+    batched = FracMinHashSketch(scale=scale, storage=storage)
+    batched.add_many_items(iter(ITEMS))
+    assert batched == _sketch(ITEMS, storage, scale=scale)
+    as_bytes = FracMinHashSketch(scale=scale, storage=storage)
+    as_bytes.add_many_items(x.encode() for x in ITEMS)
+    assert as_bytes == batched
+
+
+@pytest.mark.parametrize("storage", ["set", "array"])
+def test_precomputed_hashes(storage):
+    rng = np.random.default_rng(3)
+    hashes = rng.integers(0, 1 << 64, size=5000, dtype=np.uint64)
+    hashes = np.concatenate([hashes, hashes[:100], np.array([0, (1 << 64) - 1], dtype=np.uint64)])
+    s = FracMinHashSketch(scale=0.25, storage=storage)
+    s.add_many_items(hashes)
+    expected = sorted({h for h in hashes.tolist() if h <= s.threshold})
+    assert s.hash_array().tolist() == expected
+    t = FracMinHashSketch(scale=0.25, storage=storage)
+    t.add_hashes(hashes.tolist())
+    assert t == s
+    full = FracMinHashSketch(scale=1.0, storage=storage)
+    full.add_hashes(hashes)
+    assert len(full) == len(set(hashes.tolist()))
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from hashes.hash_utils import get_mmh3_hash
+from samplers import AlphaMaxGeomSample, MaxGeomSample
+
+
+def _stream(n, seed=0):
+    rng = random.Random(seed)
+    return [f"item{rng.randrange(n)}" for _ in range(n)]
+
+
+def _samplers(keep_items):
+    return (MaxGeomSample(k=25, w=16, keep_items=keep_items),
+            AlphaMaxGeomSample(alpha=0.5, w=16, keep_items=keep_items))
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_hash_only_keeps_the_same_entries(index):
+    items = _stream(6000)
+    full, hashed = _samplers(True)[index], _samplers(False)[index]
+    full.add_many_items(items)
+    hashed.add_many_items(items)
+    by_item = full.sample()
+    by_hash = hashed.sample()
+    assert by_hash.keys() == by_item.keys()
+    for i, rows in by_item.items():
+        assert [(hp, f) for _, hp, f in by_hash[i]] == [(hp, f) for _, hp, f in rows]
+        # the item slot holds the 64-bit hash of the item
+        assert [h for h, _, _ in by_hash[i]] == [get_mmh3_hash(z, seed=full.seed) for z, _, _ in rows]
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_hash_only_scores_match(index):
+    x, y = _stream(3000, seed=1), _stream(3000, seed=2)
+    fx, fy = _samplers(True)[index], _samplers(True)[index]
+    hx, hy = _samplers(False)[index], _samplers(False)[index]
+    for s, items in ((fx, x), (fy, y), (hx, x), (hy, y)):
+        s.add_many_items(items)
+    assert hx.jaccard_index(hy) == fx.jaccard_index(fy)
+    assert hx.cosine_similarity(hy) == fx.cosine_similarity(fy)
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_merging_hash_only_with_items_is_rejected(index):
+    full, hashed = _samplers(True)[index], _samplers(False)[index]
+    full.add_item("a")
+    hashed.add_item("a")
+    with pytest.raises(ValueError):
+        full.merge_from(hashed)
@@ -0,0 +1,37 @@
+import mmh3
+import numpy as np
+import pytest
+
+from hashes.hash_utils import get_mmh3_hash, hash_many
+from samplers import FracMinHashSketch, MaxGeomSample
+
+
+def test_hash_many_matches_mmh3():
+    items = ["ACGT", "é漢", b"\x00\xff", bytearray(b"xyz"), "a" * 40]
+    expected = [mmh3.hash64(bytes(z) if not isinstance(z, str) else z, signed=False, seed=7)[0]
+                for z in items]
+    assert hash_many(items, seed=7).tolist() == expected
+
+
+@pytest.mark.parametrize("bad", [[5], ["a", 5], [None], [1.0]])
+def test_hash_many_rejects_non_bytes_items(bad):
+    with pytest.raises(TypeError):
+        hash_many(bad)
+    with pytest.raises(TypeError):
+        FracMinHashSketch(scale=0.5).add_many_items(bad)
+    with pytest.raises(TypeError):
+        MaxGeomSample(k=4).add_many_items(bad)
+
+
+@pytest.mark.parametrize("seed", [-1, 2**32, 2**32 + 5])
+def test_hash_many_rejects_seeds_mmh3_rejects(seed):
+    with pytest.raises(ValueError, match="seed is out of range"):
+        get_mmh3_hash("a", seed=seed)
+    with pytest.raises(ValueError, match="seed is out of range"):
+        hash_many(["a"], seed=seed)
+    with pytest.raises(ValueError, match="seed is out of range"):
+        hash_many(np.zeros(8, dtype=np.uint8).tobytes(), seed=seed, width=8)
+
+
+def test_hash_many_largest_seed():
+    assert hash_many(["a"], seed=2**32 - 1)[0] == get_mmh3_hash("a", seed=2**32 - 1)
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from samplers import AlphaMaxGeomSample, MaxGeomSample
+from samplers.collection import SketchCollection
+from samplers.index import SketchIndex
+
+MAKERS = {
+    "maxgeom": lambda: MaxGeomSample(k=16, w=16),
+    "maxgeom-array": lambda: MaxGeomSample(k=16, w=16, storage="array", keep_items=False),
+    "alphamaxgeom": lambda: AlphaMaxGeomSample(alpha=0.45, w=16),
+}
+
+
+def _family(make, n=40, seed=0):
+    """Sketches drawn from a few overlapping pools, so similarities spread over [0, 1]."""
+    rng = random.Random(seed)
+    pools = [[f"p{p}_{x}" for x in range(3000)] for p in range(4)]
+    sketches = {}
+    for j in range(n):
+        pool = pools[j % 4]
+        s = make()
+        s.add_many_items(rng.sample(pool, rng.randrange(200, 3000)))
+        sketches[f"s{j}"] = s
+    return sketches
+
+
+def _brute_force(query, sketches, threshold):
+    return {(name, query.jaccard_index(s)) for name, s in sketches.items()
+            if query.jaccard_index(s) >= threshold}
+
+
+def _shared(a, b):
+    sa, sb = a.sample(), b.sample()
+    return sum(len({hp for _, hp, _ in rows} & {hp for _, hp, _ in sb.get(i, [])})
+               for i, rows in sa.items())
+
+
+@pytest.mark.parametrize("name", sorted(MAKERS))
+@pytest.mark.parametrize("threshold", [0.01, 0.2, 0.5, 0.9])
+def test_query_returns_every_hit_above_the_threshold(name, threshold):
+    sketches = _family(MAKERS[name])
+    index = SketchIndex()
+    index.add_many(sketches.items())
+    for qname in ("s0", "s1", "s6"):
+        hits = index.query(sketches[qname], threshold)
+        assert set(hits) == _brute_force(sketches[qname], sketches, threshold)
+        scores = [score for _, score in hits]
+        assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("name", sorted(MAKERS))
+def test_top_and_shared_counts(name):
+    sketches = _family(MAKERS[name], seed=1)
+    index = SketchIndex()
+    index.add_many(sketches.items())
+    q = sketches["s3"]
+    # sketches sharing no entry with the query are never ranked
+    exact = sorted((q.jaccard_index(s) for s in sketches.values() if _shared(q, s)), reverse=True)
+    for n in (1, 5, 40, 100):
+        assert [score for _, score in index.top(q, n)] == exact[:n]
+    counts = index.shared_counts(q)
+    assert counts.tolist() == [_shared(q, sketches[nm]) for nm in index.names()]
+
+
+def test_adding_after_a_query_and_save_load(tmp_path):
+    sketches = _family(MAKERS["maxgeom"], seed=2)
+    names = list(sketches)
+    index = SketchIndex()
+    index.add_many((nm, sketches[nm]) for nm in names[:20])
+    q = sketches["s4"]
+    index.query(q, 0.1)
+    index.add_many((nm, sketches[nm]) for nm in names[20:])
+    assert set(index.query(q, 0.1)) == _brute_force(q, sketches, 0.1)
+    path = str(tmp_path / "db.index.npz")
+    index.save(path)
+    loaded = SketchIndex.load(path)
+    assert loaded.names() == index.names()
+    assert loaded.query(q, 0.1) == index.query(q, 0.1)
+
+
+def test_from_collection(tmp_path):
+    sketches = _family(MAKERS["maxgeom-array"], n=12, seed=3)
+    with SketchCollection(str(tmp_path / "db"), mode="w") as db:
+        for nm, s in sketches.items():
+            db.add(nm, s)
+    index = SketchIndex.from_collection(str(tmp_path / "db"))
+    q = sketches["s5"]
+    assert set(index.query(q, 0.05)) == _brute_force(q, sketches, 0.05)
+
+
+def test_invalid_adds_are_rejected():
+    index = SketchIndex()
+    index.add("a", MaxGeomSample(k=16, w=16))
+    with pytest.raises(ValueError):
+        index.add("a", MaxGeomSample(k=16, w=16))
+    with pytest.raises(ValueError):
+        index.add("b", MaxGeomSample(k=8, w=16))
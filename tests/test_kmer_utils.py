@@ -0,0 +1,101 @@
+import gzip
+import random
+import re
+
+import pytest
+
+from helpers.kmer_utils import iter_fragments, iter_kmer_batches, iter_kmers, reverse_complement
+
+RC = str.maketrans("ACGT", "TGCA")
+
+
+def _records(seed=0, n=4):
+    rng = random.Random(seed)
+    records = []
+    for r in range(n):
+        seq = "".join(rng.choice("ACGTacgtN") if rng.random() < 0.05 else rng.choice("ACGT")
+                      for _ in range(rng.randrange(20, 400)))
+        records.append((f"r{r} description", seq))
+    return records
+
+
+def _expected(records, k, canonical=True):
+    kmers = []
+    for _, seq in records:
+        for run in re.split("[^ACGT]+", seq.upper()):
+            for i in range(len(run) - k + 1):
+                fw = run[i:i + k]
+                kmers.append(min(fw, fw.translate(RC)[::-1]) if canonical else fw)
+    return kmers
+
+
+def _write_fasta(path, records, width=60, newline="\n"):
+    with open(path, "w", newline="") as fh:
+        for name, seq in records:
+            fh.write(f">{name}{newline}")
+            for i in range(0, len(seq), width):
+                fh.write(seq[i:i + width] + newline)
+
+
+def _write_fastq(path, records):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt") as fh:
+        for name, seq in records:
+            fh.write(f"@{name}\n{seq}\n+\n{'I' * len(seq)}\n")
+
+
+@pytest.mark.parametrize("block_size", [7, 64, 1 << 20])
+@pytest.mark.parametrize("canonical", [True, False])
+def test_fasta_kmers(tmp_path, block_size, canonical):
+    records = _records()
+    path = str(tmp_path / "a.fa")
+    _write_fasta(path, records, width=37, newline="\r\n")
+    for k in (1, 5, 21):
+        got = [z for batch in iter_kmer_batches(path, k, canonical, batch_size=50,
+                                                block_size=block_size) for z in batch]
+        assert got == _expected(records, k, canonical)
+
+
+@pytest.mark.parametrize("name", ["a.fq", "a.fq.gz"])
+def test_fastq_kmers(tmp_path, name):
+    records = _records(seed=1)
+    path = str(tmp_path / name)
+    _write_fastq(path, records)
+    assert list(iter_kmers(path, 11)) == _expected(records, 11)
+
+
+def test_gzip_fasta_matches_plain(tmp_path):
+    records = _records(seed=2)
+    plain, packed = str(tmp_path / "a.fa"), str(tmp_path / "a.fa.gz")
+    _write_fasta(plain, records)
+    with open(plain, "rb") as src, gzip.open(packed, "wb") as dst:
+        dst.write(src.read())
+    assert list(iter_kmers(packed, 9)) == list(iter_kmers(plain, 9))
+
+
+def test_fragments_are_clean_and_long_enough(tmp_path):
+    path = str(tmp_path / "a.fa")
+    _write_fasta(path, _records(seed=3))
+    for fragment in iter_fragments(path, 15, block_size=32):
+        assert len(fragment) >= 15
+        assert set(fragment) <= set("ACGT")
+
+
+def test_batches_are_bounded(tmp_path):
+    path = str(tmp_path / "a.fa")
+    _write_fasta(path, [("long", "ACGT" * 5000)])
+    sizes = [len(batch) for batch in iter_kmer_batches(path, 21, batch_size=1000)]
+    assert sum(sizes) == 4 * 5000 - 20
+    assert max(sizes) < 2 * 1000
+
+
+def test_reverse_complement():
+    assert reverse_complement("AACGT") == "ACGTT"
+
+
+def test_not_a_sequence_file(tmp_path):
+    path = str(tmp_path / "x.txt")
+    with open(path, "w") as fh:
+        fh.write("hello\n")
+    with pytest.raises(ValueError):
+        list(iter_kmers(path, 3))
@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+
+from hashes.hash_utils import hash_many
+from samplers import MaxGeomSample
+
+
+def _stream(n, distinct, seed=0):
+    rng = random.Random(seed)
+    return [f"item{rng.randrange(distinct)}" for _ in range(n)]
+
+
+def _per_item(items, **kwargs):
+    s = MaxGeomSample(**kwargs)
+    for z in items:
+        s.add_item(z)
+    return s
+
+
+def test_add_many_items_equals_add_item():
+    items = _stream(20000, 8000)
+    for k, w in ((1, 64), (5, 8), (50, 16), (200, 64)):
+        batch = MaxGeomSample(k=k, w=w)
+        batch.add_many_items(items)
+        assert batch.sample() == _per_item(items, k=k, w=w).sample()
+
+
+def test_batches_continue_the_same_sample():
+    items = _stream(12000, 5000, seed=1)
+    chunked = MaxGeomSample(k=20, w=16)
+    for start in range(0, len(items), 1000):
+        chunked.add_many_items(items[start:start + 1000])
+    assert chunked.sample() == _per_item(items, k=20, w=16).sample()
+
+
+def test_add_many_items_accepts_bytes_and_generators():
+    items = [z.encode() for z in _stream(3000, 1000, seed=2)]
+    batch = MaxGeomSample(k=10, w=16)
+    batch.add_many_items(z for z in items)
+    assert batch.sample() == _per_item(items, k=10, w=16).sample()
+
+
+def test_add_hashes_equals_hash_only_add_item():
+    items = _stream(10000, 4000, seed=3)
+    hashed = MaxGeomSample(k=30, w=16, keep_items=False)
+    hashed.add_hashes(hash_many(items, seed=hashed.seed))
+    assert hashed == _per_item(items, k=30, w=16, keep_items=False)
+    # plain Python ints are accepted as well
+    ints = MaxGeomSample(k=30, w=16, keep_items=False)
+    ints.add_hashes(hash_many(items, seed=ints.seed).tolist())
+    assert ints == hashed
+
+
+def test_empty_batch_is_a_no_op():
+    s = MaxGeomSample(k=5)
+    s.add_many_items([])
+    s.add_hashes(np.empty(0, dtype=np.uint64))
+    assert s.sample() == {}
+    assert sum(s.counters().values()) == 0
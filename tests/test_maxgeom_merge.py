@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from samplers import MaxGeomSample
+
+
+def _stream(n, seed=0):
+    rng = random.Random(seed)
+    return [f"item{rng.randrange(n)}" for _ in range(n)]
+
+
+def _sketch(items, **kwargs):
+    s = MaxGeomSample(**kwargs)
+    s.add_many_items(items)
+    return s
+
+
+@pytest.mark.parametrize("storage", ["dict", "array"])
+def test_merge_equals_concatenated_stream(storage):
+    shards = [_stream(3000, seed=j) for j in range(4)]
+    full = _sketch([z for shard in shards for z in shard], k=40, w=16, storage=storage)
+    parts = [_sketch(shard, k=40, w=16, storage=storage) for shard in shards]
+    # left fold and tree reduction give the same sample
+    folded = parts[0].union(parts[1]).union(parts[2]).union(parts[3])
+    tree = parts[0].union(parts[1]).union(parts[2].union(parts[3]))
+    assert folded.sample() == full.sample()
+    assert tree.sample() == full.sample()
+
+
+def test_union_leaves_its_inputs_unchanged():
+    a = _sketch(_stream(2000, seed=1), k=20, w=16)
+    b = _sketch(_stream(2000, seed=2), k=20, w=16)
+    sa, sb = a.sample(), b.sample()
+    a.union(b)
+    assert a.sample() == sa and b.sample() == sb
+
+
+def test_merge_with_empty_sample():
+    a = _sketch(_stream(2000, seed=3), k=20, w=16)
+    empty = MaxGeomSample(k=20, w=16)
+    assert a.union(empty) == a
+    assert empty.union(a) == a
+
+
+def test_merge_requires_same_parameters():
+    a = MaxGeomSample(k=20, w=16)
+    for other in (MaxGeomSample(k=21, w=16), MaxGeomSample(k=20, w=8),
+                  MaxGeomSample(k=20, w=16, seed=1)):
+        with pytest.raises(ValueError):
+            a.merge_from(other)
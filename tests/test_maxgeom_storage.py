@@ -0,0 +1,123 @@
+import random
+
+from hashes.hash_utils import hash_many
+from samplers import MaxGeomSample, load_sketch
+from samplers.serialization import sketch_from_bytes
+
+
+def _stream(n, seed=0):
+    rng = random.Random(seed)
+    return [f"item{rng.randrange(n)}" for _ in range(n)]
+
+
+def test_dict_and_array_storage_agree_hash_only_small_w():
+    # at w=4, 1/16 of the hashes have no one-bit in their top w bits and share bucket w
+    for w in (1, 4, 8):
+        items = _stream(5000, seed=w)
+        d = MaxGeomSample(k=50, w=w, storage="dict", keep_items=False)
+        a = MaxGeomSample(k=50, w=w, storage="array", keep_items=False)
+        d.add_many_items(items)
+        a.add_many_items(items)
+        assert d.sample() == a.sample()
+        assert d == a
+        # reloaded array samples keep the hashes of bucket w
+        assert sketch_from_bytes(a.to_bytes()) == d
+
+
+def test_merge_across_storages_hash_only_small_w():
+    w = 4
+    left, right = _stream(4000, seed=1), _stream(4000, seed=2)
+    full = MaxGeomSample(k=50, w=w, storage="dict", keep_items=False)
+    full.add_many_items(left + right)
+    d = MaxGeomSample(k=50, w=w, storage="dict", keep_items=False)
+    a = MaxGeomSample(k=50, w=w, storage="array", keep_items=False)
+    d.add_many_items(left)
+    a.add_many_items(right)
+    for merged in (d.union(a), a.union(d)):
+        assert merged == full
+        for rows in merged.sample().values():
+            assert len({hprime for _, hprime, _ in rows}) == len(rows)
+
+
+def test_array_storage_save_load_hash_only(tmp_path):
+    a = MaxGeomSample(k=20, w=4, storage="array", keep_items=False)
+    a.add_many_items(_stream(3000))
+    path = str(tmp_path / "a.sketch")
+    a.save(path)
+    assert load_sketch(path, mmap=True) == a
+
+
+def test_counters_total_is_path_independent():
+    items = _stream(5000, seed=3)
+    for storage in ("dict", "array"):
+        one = MaxGeomSample(k=20, w=16, storage=storage)
+        for z in items:
+            one.add_item(z)
+        batch = MaxGeomSample(k=20, w=16, storage=storage)
+        batch.add_many_items(items)
+        hashed = MaxGeomSample(k=20, w=16, storage=storage, keep_items=False)
+        hashed.add_hashes(hash_many(items, seed=hashed.seed))
+        assert one == batch
+        # the split into accepted / rejected / duplicates may differ between
+        # paths (see MaxGeomSample.counters), but every element is counted once
+        for sample in (one, batch, hashed):
+            assert sum(sample.counters().values()) == len(items)
+
+
+def test_heaps_hold_only_live_entries():
+    s = MaxGeomSample(k=10, w=4)
+    s.add_many_items(_stream(20000, seed=4))
+    s.merge_from(MaxGeomSample(k=10, w=4))
+    for i in range(1, 5):
+        s.add_item(f"late{i}")
+    usage = s.memory_usage()
+    assert usage
+    for sizes in usage.values():
+        assert sizes["heap"] == sizes["live"] <= s.k
+
+
+def test_dict_and_array_storage_agree_with_items():
+    items = _stream(8000, seed=5)
+    for k in (1, 16, 100):
+        d = MaxGeomSample(k=k, w=64, storage="dict")
+        a = MaxGeomSample(k=k, w=64, storage="array")
+        d.add_many_items(items)
+        for z in items:
+            a.add_item(z)
+        assert a.sample() == d.sample()
+        assert all(sizes["heap"] == 0 for sizes in a.memory_usage().values())
+
+
+def test_similarities_do_not_depend_on_storage():
+    x, y = _stream(4000, seed=6), _stream(4000, seed=7)
+    by_storage = {}
+    for storage in ("dict", "array"):
+        sx = MaxGeomSample(k=30, w=16, storage=storage)
+        sy = MaxGeomSample(k=30, w=16, storage=storage)
+        sx.add_many_items(x)
+        sy.add_many_items(y)
+        by_storage[storage] = (sx, sy)
+    (dx, dy), (ax, ay) = by_storage["dict"], by_storage["array"]
+    assert ax.jaccard_index(ay) == dx.jaccard_index(dy)
+    assert ax.cosine_similarity(ay) == dx.cosine_similarity(dy)
+    assert ax.jaccard_index(dy) == dx.jaccard_index(dy)
+
+
+def test_per_item_counters_on_repeated_elements():
+    # each element twice in a row: the repeat is a duplicate iff the first copy was accepted
+    items = [z for z in dict.fromkeys(_stream(5000, seed=8)) for _ in range(2)]
+    for storage in ("dict", "array"):
+        s = MaxGeomSample(k=10, w=8, storage=storage)
+        for z in items:
+            s.add_item(z)
+        c = s.counters()
+        assert c["accepted"] == c["duplicates"]
+        assert c["rejected"] % 2 == 0
+        assert sum(c.values()) == len(items)
+        # a full bucket rejects an element just below its minimum h'
+        before = s.sample()
+        i, rows = max(before.items(), key=lambda kv: len(kv[1]))
+        assert len(rows) == s.k
+        s.add_hashes([(1 << (64 - i)) | (rows[-1][1] - 1)])
+        assert s.sample() == before
+        assert s.counters()["rejected"] == c["rejected"] + 1
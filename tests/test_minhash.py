@@ -0,0 +1,112 @@
+import random
+
+import numpy as np
+import pytest
+
+from samplers import MinHashSketch
+
+ITEMS = [f"item{x}" for x in range(3000)]
+
+
+def _sketch(items, **kw):
+    m = MinHashSketch(**kw)
+    m.add_many_items(items)
+    return m
+
+
+@pytest.mark.parametrize("one_permutation", [False, True])
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_streaming_sketch_matches_one_keeping_items(use_numpy, one_permutation):
+    kw = dict(k=50, seed=3, use_numpy=use_numpy, one_permutation=one_permutation)
+    kept = _sketch(ITEMS + ITEMS[:500], **kw)
+    streamed = MinHashSketch(keep_items=False, **kw)
+    for chunk in (ITEMS[:1000], ITEMS[500:2000], ITEMS[2000:]):
+        streamed.add_many_items(chunk)
+    streamed.add_item(ITEMS[0])
+    assert streamed.all_items is None
+    assert streamed == kept
+    assert list(streamed.signature()) == list(kept.signature())
+
+
+def test_items_are_kept_by_default():
+    m = _sketch(ITEMS[:10], k=8)
+    assert m.keep_items and m.all_items == set(ITEMS[:10])
+    before = list(m.signature())
+    m.create_minhash_sample()
+    assert list(m.signature()) == before
+
+
+def test_rebuilding_requires_the_items():
+    m = _sketch(ITEMS[:10], k=8, keep_items=False)
+    with pytest.raises(ValueError):
+        m.create_minhash_sample()
+
+
+@pytest.mark.parametrize("k,chunk_size", [(1, None), (7, 1), (50, 3), (200, None), (500, 64)])
+def test_numpy_update_matches_pure_python(k, chunk_size):
+    pure = _sketch(ITEMS, k=k, seed=11, use_numpy=False)
+    batched = _sketch(ITEMS, k=k, seed=11, use_numpy=True, chunk_size=chunk_size)
+    single = MinHashSketch(k=k, seed=11, use_numpy=True)
+    for x in ITEMS[:300]:
+        single.add_item(x)
+    assert batched._iter_hashes() == pure._iter_hashes()
+    assert single._iter_hashes() == _sketch(ITEMS[:300], k=k, seed=11, use_numpy=False)._iter_hashes()
+
+
+def test_min_affine_mod_p_is_exact_at_the_edges():
+    from samplers.minhash.MinHash import _min_affine_mod_p
+    p = (1 << 61) - 1
+    rng = random.Random(5)
+    a = [1, 2, p - 1, p - 2, (1 << 31) - 1, 1 << 31, 1 << 60] + [rng.randrange(1, p) for _ in range(25)]
+    b = [0, p - 1, 1, p - 2] + [rng.randrange(0, p) for _ in range(len(a) - 4)]
+    hs = [0, 1, p - 1, p - 2, (1 << 31) - 1, 1 << 31, (1 << 61) - 2] + [rng.randrange(0, p) for _ in range(50)]
+    a_np = np.array(a, dtype=np.uint64)
+    got = _min_affine_mod_p(np.array(hs, dtype=np.uint64), a_np >> np.uint64(31),
+                            a_np & np.uint64((1 << 31) - 1), np.array(b, dtype=np.uint64) + np.uint64(1), 4)
+    assert got.tolist() == [min((ai * h + bi) % p for h in hs) for ai, bi in zip(a, b)]
+
+
+def _oph_bins(items, k, seed):
+    from hashes.hash_utils import get_mmh3_hash
+    bins = [(1 << 64) - 1] * k
+    for x in items:
+        h = get_mmh3_hash(x, seed=seed)
+        b = (h * k) >> 64
+        bins[b] = min(bins[b], h)
+    return bins
+
+
+@pytest.mark.parametrize("n", [5, 40, 3000])
+def test_one_permutation_bins_and_densification(n):
+    k = 64
+    sketches = [_sketch(ITEMS[:n], k=k, seed=9, one_permutation=True, use_numpy=u) for u in (True, False)]
+    bins = _oph_bins(ITEMS[:n], k, 9)
+    for m in sketches:
+        assert m._iter_hashes() == bins
+    dense = [list(map(int, m.signature())) for m in sketches]
+    assert dense[0] == dense[1]
+    # every bin holds the value of a non-empty bin; non-empty bins are unchanged
+    filled = set(bins) - {(1 << 64) - 1}
+    assert set(dense[0]) <= filled
+    assert all(d == v for d, v in zip(dense[0], bins) if v != (1 << 64) - 1)
+
+
+def test_one_permutation_estimates():
+    a = _sketch(ITEMS[:2000], k=256, one_permutation=True)
+    b = _sketch(ITEMS[1000:3000], k=256, one_permutation=True)
+    assert a.jaccard_index(_sketch(reversed(ITEMS[:2000]), k=256, one_permutation=True)) == 1.0
+    assert a.jaccard_index(b) == pytest.approx(1 / 3, abs=0.1)
+    assert a.jaccard_index(b) == b.jaccard_index(a)
+
+
+def test_one_permutation_mode_is_checked_and_serialized():
+    from samplers.serialization import sketch_from_bytes
+    oph = _sketch(ITEMS[:100], k=32, one_permutation=True)
+    kperm = _sketch(ITEMS[:100], k=32)
+    with pytest.raises(ValueError):
+        oph.jaccard_index(kperm)
+    assert oph != kperm
+    loaded = sketch_from_bytes(oph.to_bytes())
+    assert loaded.one_permutation and loaded == oph
+    assert loaded.jaccard_index(oph) == 1.0
+    assert not sketch_from_bytes(kperm.to_bytes()).one_permutation
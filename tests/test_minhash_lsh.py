@@ -0,0 +1,98 @@
+import random
+
+import numpy as np
+import pytest
+
+from samplers import MinHashSketch
+from samplers.minhash.lsh import MinHashLSH
+
+K = 64
+
+
+def _family(one_permutation=False, n=40, seed=0):
+    """Sets that keep a shrinking part of a few shared cores, so similarities spread over [0, 1]."""
+    rng = random.Random(seed)
+    sketches = {}
+    for j in range(n):
+        core = [f"c{j % 4}_{x}" for x in range(400)]
+        keep = 400 - (j // 4) * 40
+        items = rng.sample(core, keep) + [f"own{j}_{x}" for x in range(400 - keep)]
+        m = MinHashSketch(k=K, seed=7, keep_items=False, one_permutation=one_permutation)
+        m.add_many_items(items)
+        sketches[f"s{j}"] = m
+    return sketches
+
+
+def _share_a_band(a, b, bands, rows):
+    sa, sb = np.asarray(a.signature()), np.asarray(b.signature())
+    return any((sa[i * rows:(i + 1) * rows] == sb[i * rows:(i + 1) * rows]).all()
+               for i in range(bands))
+
+
+@pytest.mark.parametrize("one_permutation", [False, True])
+@pytest.mark.parametrize("bands,rows", [(16, 4), (8, 8), (32, 2)])
+def test_candidates_are_exactly_the_band_collisions(one_permutation, bands, rows):
+    sketches = _family(one_permutation)
+    lsh = MinHashLSH(bands, rows)
+    lsh.add_many(sketches.items())
+    names = lsh.names()
+    for q in ("s0", "s5", "s38"):
+        expected = [i for i, nm in enumerate(names)
+                    if _share_a_band(sketches[q], sketches[nm], bands, rows)]
+        assert lsh.candidates(sketches[q]).tolist() == expected
+
+
+@pytest.mark.parametrize("one_permutation", [False, True])
+def test_query_agrees_with_brute_force_on_its_candidates(one_permutation):
+    sketches = _family(one_permutation, seed=1)
+    lsh = MinHashLSH(16, 4)
+    lsh.add_many(sketches.items())
+    for qname in ("s1", "s10"):
+        q = sketches[qname]
+        exact = dict(lsh.brute_force(q))
+        assert exact == {nm: q.jaccard_index(s) for nm, s in sketches.items()}
+        hits = lsh.query(q, threshold=0.3)
+        assert set(hits) <= set(lsh.brute_force(q, threshold=0.3))
+        assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+        # a sketch always finds itself, and near-identical ones almost surely
+        assert hits[0] == (qname, 1.0)
+        strong = {nm for nm, s in exact.items() if s >= 0.8}
+        assert strong <= {nm for nm, _ in hits}
+
+
+def test_sketches_added_after_a_query_are_found():
+    sketches = _family(seed=2)
+    names = list(sketches)
+    lsh = MinHashLSH(16, 4)
+    lsh.add_many((nm, sketches[nm]) for nm in names[:20])
+    assert lsh.query(sketches["s30"], 0.99) == []
+    lsh.add_many((nm, sketches[nm]) for nm in names[20:])
+    assert lsh.query(sketches["s30"], 0.99)[0] == ("s30", 1.0)
+    assert len(lsh) == len(names) and "s39" in lsh
+
+
+def test_recall_curve():
+    lsh = MinHashLSH(bands=32, rows=4)
+    assert lsh.expected_recall(0.0) == 0.0
+    assert lsh.expected_recall(1.0) == 1.0
+    assert lsh.expected_recall(0.5) == pytest.approx(1 - (1 - 0.5 ** 4) ** 32)
+    assert lsh.threshold() == pytest.approx((1 / 32) ** 0.25)
+
+
+def test_invalid_input_is_rejected():
+    with pytest.raises(ValueError):
+        MinHashLSH(0, 4)
+    m = MinHashSketch(k=K, seed=7)
+    m.add_item("x")
+    with pytest.raises(ValueError):
+        MinHashLSH(16, 8).add("a", m)           # bands * rows > k
+    lsh = MinHashLSH(16, 4)
+    lsh.add("a", m)
+    with pytest.raises(ValueError):
+        lsh.add("a", m)
+    for other in (MinHashSketch(k=K, seed=8), MinHashSketch(k=K, seed=7, one_permutation=True)):
+        other.add_item("x")
+        with pytest.raises(ValueError):
+            lsh.add("b", other)
+        with pytest.raises(ValueError):
+            lsh.query(other)
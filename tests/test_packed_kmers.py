@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+
+from hashes.hash_utils import hash_many
+from helpers.kmer_utils import (iter_kmer_hash_batches, iter_kmers, kmers_of, pack_kmers, sketch_file,
+                                sketch_file_packed)
+from samplers import FracMinHashSketch, MaxGeomSample
+
+CODE = {"A": 0, "C": 1, "G": 2, "T": 3}
+
+
+def _pack(kmer):
+    value = 0
+    for base in kmer:
+        value = (value << 2) | CODE[base]
+    return value
+
+
+def _fragments(seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice("ACGT") for _ in range(rng.randrange(1, 120))) for _ in range(30)]
+
+
+@pytest.mark.parametrize("k", [1, 4, 21, 31, 32])
+@pytest.mark.parametrize("canonical", [True, False])
+def test_pack_kmers_matches_the_kmer_strings(k, canonical):
+    fragments = _fragments()
+    expected = [_pack(z) for f in fragments for z in kmers_of(f, k, canonical)]
+    assert pack_kmers(fragments, k, canonical).tolist() == expected
+
+
+def test_pack_kmers_rejects_long_k():
+    with pytest.raises(ValueError):
+        pack_kmers(["ACGT" * 10], 33)
+
+
+def _fasta(tmp_path, seed=1):
+    path = str(tmp_path / "g.fa")
+    with open(path, "w") as fh:
+        for j, f in enumerate(_fragments(seed)):
+            fh.write(f">r{j}\n{f}N{f[::-1]}\n")
+    return path
+
+
+def test_hash_batches_hash_the_packed_kmers(tmp_path):
+    path = _fasta(tmp_path)
+    packed = np.array([_pack(z) for z in iter_kmers(path, 15)], dtype="<u8")
+    got = np.concatenate(list(iter_kmer_hash_batches(path, 15, seed=7, batch_size=100)))
+    assert got.tolist() == hash_many(packed.tobytes(), seed=7, width=8).tolist()
+
+
+@pytest.mark.parametrize("make", [lambda: MaxGeomSample(k=30, w=16, keep_items=False),
+                                  lambda: FracMinHashSketch(scale=2)])
+def test_sketch_file_packed_equals_add_hashes(tmp_path, make):
+    path = _fasta(tmp_path, seed=2)
+    sketch = make()
+    n = sketch_file_packed(sketch, path, 21)
+    reference = make()
+    hashes = np.concatenate(list(iter_kmer_hash_batches(path, 21, seed=reference.seed)))
+    reference.add_hashes(hashes)
+    assert n == len(hashes) == sum(1 for _ in iter_kmers(path, 21))
+    assert sketch == reference
+    # string k-mers and packed k-mers give the same number of elements
+    assert sketch_file(make(), path, 21) == n
@@ -0,0 +1,72 @@
+import os
+import random
+import subprocess
+import sys
+
+from helpers.kmer_utils import sketch_file
+from samplers import MaxGeomSample, load_sketch
+from samplers.collection import SketchCollection
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "scripts", "parallel_sketch_inprocess.py")
+
+
+def _write_fasta(path, n_records=3, length=3000, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w") as fh:
+        for r in range(n_records):
+            seq = "".join(rng.choice("ACGT") for _ in range(length))
+            fh.write(f">r{r}\n")
+            for i in range(0, len(seq), 80):
+                fh.write(seq[i:i + 80] + "\n")
+    return path
+
+
+def _run(tmp_path, inputs, *args):
+    filelist = tmp_path / "files.txt"
+    filelist.write_text("".join(f"{p}\n" for p in inputs))
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, SCRIPT, str(filelist), "--algo", "maxgeom", "--k", "20",
+                           "--kmer", "15", *args], env=env, capture_output=True, text=True)
+
+
+def _reference(path):
+    sketch = MaxGeomSample(k=20, storage="array", keep_items=False)
+    sketch_file(sketch, path, 15)
+    return sketch
+
+
+def test_sketches_match_in_process_sketching(tmp_path):
+    inputs = [_write_fasta(str(tmp_path / f"g{j}.fna"), seed=j) for j in range(3)]
+    result = _run(tmp_path, inputs, "--threads", "2", "--outdir", str(tmp_path / "out"))
+    assert result.returncode == 0, result.stderr
+    for j, path in enumerate(inputs):
+        assert load_sketch(str(tmp_path / "out" / f"g{j}.maxgeom.sketch")) == _reference(path)
+
+
+def test_collection_output(tmp_path):
+    inputs = [_write_fasta(str(tmp_path / f"g{j}.fa"), seed=j) for j in range(2)]
+    result = _run(tmp_path, inputs, "--threads", "1", "--collection", str(tmp_path / "db"))
+    assert result.returncode == 0, result.stderr
+    db = SketchCollection(str(tmp_path / "db"))
+    assert sorted(db.names()) == ["g0", "g1"]
+    assert db["g1"] == _reference(inputs[1])
+
+
+def test_name_collision_fails_only_the_second_input(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    first = _write_fasta(str(tmp_path / "a" / "x.fa"), seed=1)
+    second = _write_fasta(str(tmp_path / "b" / "x.fna"), seed=2)
+    result = _run(tmp_path, [first, second], "--threads", "1", "--outdir", str(tmp_path / "out"))
+    assert result.returncode != 0
+    assert result.stderr.count("[FAIL]") == 1
+    written = load_sketch(str(tmp_path / "out" / "x.maxgeom.sketch"))
+    assert written in (_reference(first), _reference(second))
+
+
+def test_sharded_run_equals_whole_file_sketch(tmp_path):
+    path = _write_fasta(str(tmp_path / "big.fa"), n_records=4, length=8000, seed=5)
+    result = _run(tmp_path, [path], "--threads", "2", "--shards", "4", "--outdir", str(tmp_path / "out"))
+    assert result.returncode == 0, result.stderr
+    assert load_sketch(str(tmp_path / "out" / "big.maxgeom.sketch")) == _reference(path)
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from samplers import (AffirmativeSketch, AlphaAffirmativeSketch, AlphaMaxGeomSample, FracMinHashSketch,
+                      MaxGeomSample, MinHashSketch, load_sketch)
+from samplers.serialization import sketch_from_bytes
+
+FACTORIES = {
+    "maxgeom-dict": lambda: MaxGeomSample(k=20, w=16),
+    "maxgeom-array": lambda: MaxGeomSample(k=20, w=16, storage="array"),
+    "maxgeom-hash-only": lambda: MaxGeomSample(k=20, w=4, storage="array", keep_items=False),
+    "alphamaxgeom": lambda: AlphaMaxGeomSample(alpha=0.5, w=16),
+    "alphamaxgeom-hash-only": lambda: AlphaMaxGeomSample(alpha=0.5, w=16, keep_items=False),
+    "fracminhash-set": lambda: FracMinHashSketch(scale=4),
+    "fracminhash-array": lambda: FracMinHashSketch(scale=4, storage="array"),
+    "minhash": lambda: MinHashSketch(k=64, keep_items=False),
+    "minhash-oph": lambda: MinHashSketch(k=64, keep_items=False, one_permutation=True),
+    "affirmative": lambda: AffirmativeSketch(k=20),
+    "alphaaffirmative": lambda: AlphaAffirmativeSketch(alpha=0.5),
+}
+
+
+def _stream(n, seed=0):
+    rng = random.Random(seed)
+    return [f"item{rng.randrange(n)}" for _ in range(n)]
+
+
+def _filled(name, items):
+    s = FACTORIES[name]()
+    s.add_many_items(items)
+    return s
+
+
+@pytest.mark.parametrize("name", sorted(FACTORIES))
+def test_round_trip_bytes(name):
+    s = _filled(name, _stream(3000))
+    blob = s.to_bytes()
+    assert type(s).from_bytes(blob) == s
+    assert sketch_from_bytes(blob) == s
+    # serialization is deterministic
+    assert sketch_from_bytes(blob).to_bytes() == blob
+
+
+@pytest.mark.parametrize("name", sorted(FACTORIES))
+@pytest.mark.parametrize("mmap", [False, True])
+def test_round_trip_file(name, mmap, tmp_path):
+    s = _filled(name, _stream(3000))
+    path = str(tmp_path / "s.sketch")
+    s.save(path)
+    assert type(s).load(path, mmap=mmap) == s
+    assert load_sketch(path, mmap=mmap) == s
+
+
+@pytest.mark.parametrize("name", sorted(FACTORIES))
+def test_round_trip_empty(name):
+    s = FACTORIES[name]()
+    assert sketch_from_bytes(s.to_bytes()) == s
+
+
+@pytest.mark.parametrize("name", sorted(FACTORIES))
+def test_mmap_loaded_sketch_can_be_updated(name, tmp_path):
+    first, second = _stream(2000, seed=1), _stream(2000, seed=2)
+    s = _filled(name, first)
+    path = str(tmp_path / "s.sketch")
+    s.save(path)
+    with open(path, "rb") as fh:
+        on_disk = fh.read()
+    loaded = load_sketch(path, mmap=True)
+    loaded.add_many_items(second)
+    s.add_many_items(second)
+    assert loaded == s
+    # the update copied the mapped arrays instead of writing to the file
+    with open(path, "rb") as fh:
+        assert fh.read() == on_disk
+
+
+def test_loading_the_wrong_class_is_rejected():
+    blob = _filled("minhash", _stream(100)).to_bytes()
+    with pytest.raises(ValueError):
+        MaxGeomSample.from_bytes(blob)
+    with pytest.raises(ValueError):
+        sketch_from_bytes(b"not a sketch" * 8)
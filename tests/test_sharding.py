@@ -0,0 +1,73 @@
+import gzip
+import random
+from collections import Counter
+
+import pytest
+
+from helpers.kmer_utils import iter_kmer_batches, iter_kmers, shard_ranges, sketch_file, sketch_file_packed
+from samplers import AlphaMaxGeomSample, FracMinHashSketch, MaxGeomSample
+
+
+def _write_fasta(path, seed=0, width=60):
+    rng = random.Random(seed)
+    with open(path, "w") as fh:
+        for r in range(5):
+            seq = "".join(rng.choice("ACGTN" if rng.random() < 0.01 else "ACGT")
+                          for _ in range(rng.randrange(500, 5000)))
+            fh.write(f">record {r}\n")
+            for i in range(0, len(seq), width):
+                fh.write(seq[i:i + width] + "\n")
+    return path
+
+
+@pytest.mark.parametrize("n_shards", [2, 3, 7, 50])
+@pytest.mark.parametrize("width", [7, 60, 100000])
+def test_shards_cover_every_kmer_once(tmp_path, n_shards, width):
+    path = _write_fasta(str(tmp_path / "g.fa"), width=width)
+    ranges = shard_ranges(path, n_shards)
+    assert ranges[0][0] == 0
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    sharded = Counter(z for start, end in ranges
+                      for batch in iter_kmer_batches(path, 21, start=start, end=end, block_size=64)
+                      for z in batch)
+    assert sharded == Counter(iter_kmers(path, 21))
+
+
+@pytest.mark.parametrize("make", [lambda: MaxGeomSample(k=30, w=16),
+                                  lambda: MaxGeomSample(k=30, storage="array", keep_items=False),
+                                  lambda: AlphaMaxGeomSample(alpha=0.5, w=16),
+                                  lambda: FracMinHashSketch(scale=4)])
+def test_merged_shard_sketches_equal_the_whole_file_sketch(tmp_path, make):
+    path = _write_fasta(str(tmp_path / "g.fa"), seed=1)
+    whole = make()
+    sketch_file(whole, path, 21)
+    merged = make()
+    for start, end in shard_ranges(path, 5):
+        part = make()
+        sketch_file(part, path, 21, start=start, end=end)
+        merged.merge_from(part)
+    assert merged == whole
+
+
+def test_packed_shards_equal_the_whole_file(tmp_path):
+    path = _write_fasta(str(tmp_path / "g.fa"), seed=2)
+    whole = MaxGeomSample(k=30, keep_items=False)
+    sketch_file_packed(whole, path, 21)
+    merged = MaxGeomSample(k=30, keep_items=False)
+    for start, end in shard_ranges(path, 4):
+        part = MaxGeomSample(k=30, keep_items=False)
+        sketch_file_packed(part, path, 21, start=start, end=end)
+        merged.merge_from(part)
+    assert merged == whole
+
+
+def test_unshardable_inputs_give_one_range(tmp_path):
+    path = _write_fasta(str(tmp_path / "g.fa"))
+    gz = str(tmp_path / "g.fa.gz")
+    with open(path, "rb") as src, gzip.open(gz, "wb") as dst:
+        dst.write(src.read())
+    fq = tmp_path / "r.fq"
+    fq.write_text("@r\nACGTACGT\n+\nIIIIIIII\n")
+    assert shard_ranges(gz, 4) == [(0, None)]
+    assert shard_ranges(str(fq), 4) == [(0, None)]
+    assert shard_ranges(path, 1) == [(0, None)]
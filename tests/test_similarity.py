@@ -0,0 +1,86 @@
+import io
+import random
+
+import numpy as np
+import pytest
+
+from samplers import AlphaMaxGeomSample, MaxGeomSample
+from samplers.similarity import cosine_matrix, jaccard_matrix, similarity_matrices, write_pairwise_tsv
+
+
+def _sketch(items, k=20, seed=42):
+    s = MaxGeomSample(k=k, w=16, seed=seed)
+    s.add_many_items(items)
+    return s
+
+
+def test_write_pairwise_tsv_incompatible_sketches_leave_no_file(tmp_path):
+    out = tmp_path / "pw.tsv"
+    sketches = [_sketch(["a", "b"]), _sketch(["a", "c"], seed=7)]
+    with pytest.raises(ValueError):
+        write_pairwise_tsv(str(out), ["x", "y"], sketches)
+    assert not out.exists()
+
+
+def _family(make, n=6, size=1500, seed=0):
+    """Sketches of sets sharing a shrinking part of one core, with repeated items."""
+    rng = random.Random(seed)
+    core = [f"core{x}" for x in range(size)]
+    sketches = []
+    for j in range(n):
+        items = core[:size - j * size // n] + [f"own{j}_{x}" for x in range(j * size // n)]
+        s = make()
+        s.add_many_items(items + rng.sample(items, size // 3))
+        sketches.append(s)
+    sketches.append(make())   # an empty sketch
+    return sketches
+
+
+MAKERS = {
+    "maxgeom": lambda: MaxGeomSample(k=16, w=16),
+    "maxgeom-array": lambda: MaxGeomSample(k=16, w=16, storage="array", keep_items=False),
+    "alphamaxgeom": lambda: AlphaMaxGeomSample(alpha=0.45, w=16),
+}
+
+
+@pytest.mark.parametrize("name", sorted(MAKERS))
+def test_matrices_equal_per_pair_methods(name):
+    sketches = _family(MAKERS[name])
+    jac, cos = similarity_matrices(sketches)
+    for i, a in enumerate(sketches):
+        for j, b in enumerate(sketches):
+            assert jac[i, j] == a.jaccard_index(b)
+            assert cos[i, j] == a.cosine_similarity(b)
+    assert np.array_equal(jaccard_matrix(sketches), jac)
+    assert np.array_equal(cosine_matrix(sketches), cos)
+
+
+def test_parallel_rows_equal_serial_rows():
+    sketches = _family(MAKERS["maxgeom"], n=9, seed=1)
+    jac, cos = similarity_matrices(sketches)
+    pjac, pcos = similarity_matrices(sketches, n_jobs=2)
+    assert np.array_equal(jac, pjac) and np.array_equal(cos, pcos)
+
+
+@pytest.mark.parametrize("include_self", [False, True])
+def test_pairwise_tsv_rows_match_the_matrices(include_self):
+    sketches = _family(MAKERS["maxgeom"], seed=2)
+    names = [f"s{j}" for j in range(len(sketches))]
+    out = io.StringIO()
+    jac, cos = write_pairwise_tsv(out, names, sketches, cosine=True, include_self=include_self,
+                                  return_matrices=True)
+    assert np.array_equal(jac, jaccard_matrix(sketches))
+    assert np.array_equal(cos, cosine_matrix(sketches))
+    header, *rows = out.getvalue().splitlines()
+    assert header.split("\t") == ["sketch1", "sketch2", "jaccard_score", "intersection",
+                                  "size1", "size2", "union", "cosine_score"]
+    n = len(sketches)
+    assert len(rows) == n * (n - 1) // 2 + (n if include_self else 0)
+    for row in rows:
+        a, b, score, _, size1, size2, _, cosine = row.split("\t")
+        i, j = names.index(a), names.index(b)
+        assert i <= j and (include_self or i < j)
+        assert float(score) == sketches[i].jaccard_index(sketches[j])
+        assert float(cosine) == sketches[i].cosine_similarity(sketches[j])
+        assert (int(size1), int(size2)) == (len(sketches[i]), len(sketches[j]))
+    assert write_pairwise_tsv(io.StringIO(), names, sketches) is None